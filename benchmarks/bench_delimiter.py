@@ -0,0 +1,111 @@
+"""
+Measures the throughput of the Ctrl-A delimiter translation applied to
+s3 results downloaded with get_results(delim=...).
+
+A synthetic Ctrl-A delimited file of the requested size, with some
+non-ASCII text, is written to a temporary directory and read through a
+stand-in for a boto key. The current _read_iteratively, which translates
+1MB buffers at the byte level, is compared with a replica of the previous
+code path, which decoded, replaced and re-encoded every 8KB chunk. That
+path raised UnicodeDecodeError whenever a chunk ended inside a multi-byte
+character; the replica decodes with errors="replace" so it can be timed.
+Output goes to os.devnull.
+
+Usage:
+    python benchmarks/bench_delimiter.py [size_mb] [delim]
+"""
+from __future__ import print_function
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from qds_sdk.commands import _read_iteratively
+
+ROW = u"12345\x01caf\u00e9 au lait\x01some longer free text column\x012017-01-01\x010.25\n".encode('utf8')
+
+
+class FileKey(object):
+    """Stands in for a boto key over a local file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+
+    def open_read(self):
+        if self.f is None:
+            self.f = open(self.path, 'rb')
+
+    def read(self, size):
+        return self.f.read(size)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # boto yields the body 8KB at a time
+        data = self.f.read(8192)
+        if not data:
+            self.close()
+            raise StopIteration
+        return data
+
+    next = __next__
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+def previous_read_iteratively(key_instance, fp, delim):
+    key_instance.open_read()
+    while True:
+        try:
+            data = next(key_instance)
+            fp.write(data.decode('utf8', 'replace').replace(chr(1), delim).encode('utf8'))
+        except StopIteration:
+            return
+
+
+def make_file(directory, size):
+    path = os.path.join(directory, "000000_0")
+    block = ROW * (8 * 1024 * 1024 // len(ROW))
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+    return path, written
+
+
+def measure(fn, path, delim):
+    with io.open(os.devnull, 'wb') as out:
+        start = time.time()
+        fn(FileKey(path), out, delim)
+        return time.time() - start
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    delim = sys.argv[2] if len(sys.argv) > 2 else "\t"
+    directory = tempfile.mkdtemp()
+    try:
+        path, size = make_file(directory, size_mb * 1024 * 1024)
+        mb = size / (1024.0 * 1024)
+        before = measure(previous_read_iteratively, path, delim)
+        after = measure(_read_iteratively, path, delim)
+    finally:
+        shutil.rmtree(directory)
+
+    print("%.0f MB, delimiter %r" % (mb, delim))
+    print("decode/replace/encode, 8KB chunks: %.2fs (%.0f MB/s)" % (before, mb / before))
+    print("byte translation, 1MB buffers:     %.2fs (%.0f MB/s)" % (after, mb / after))
+    print("speedup: %.1fx" % (before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Compares status poll throughput of the default requests transport with the
+HTTP/2 transport (qds_sdk.http2).
+
+Two local stub servers answer GET commands/<id> with a small JSON status
+after an artificial server-side latency: a threaded HTTP/1.1 server and an
+asyncio HTTP/2 server built on the h2 package. A thread pool polls each of
+them through Connection, and the number of TCP connections the server had
+to accept is reported next to the throughput.
+
+Needs httpx and h2 (pip install httpx[http2]); exits early without them.
+
+Usage:
+    python benchmarks/bench_http2.py [num_requests] [threads] [latency_ms]
+"""
+from __future__ import print_function
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    sys.exit("This benchmark needs python 3")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from qds_sdk.connection import Connection
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    from qds_sdk.http2 import Http2Session
+    Http2Session()
+except Exception as e:
+    sys.exit("Skipping: %s" % e)
+
+BODY = json.dumps({"id": 1, "status": "running", "progress": 50}).encode("utf8")
+
+
+class Http1Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class Http1Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency):
+        handler = type("Handler", (Http1Handler,), {"latency": latency})
+        HTTPServer.__init__(self, ("127.0.0.1", 0), handler)
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        ThreadingMixIn.process_request(self, request, client_address)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return "http://127.0.0.1:%d/api/v1.2" % self.server_address[1]
+
+
+class H2Protocol(asyncio.Protocol):
+
+    def __init__(self, server):
+        self.server = server
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+
+    def connection_made(self, transport):
+        self.server.connections += 1
+        self.transport = transport
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.DataReceived):
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                self.server.loop.call_later(self.server.latency, self.respond, event.stream_id)
+        self.transport.write(self.conn.data_to_send())
+
+    def respond(self, stream_id):
+        self.conn.send_headers(stream_id, [(":status", "200"),
+                                           ("content-type", "application/json"),
+                                           ("content-length", str(len(BODY)))])
+        self.conn.send_data(stream_id, BODY, end_stream=True)
+        self.transport.write(self.conn.data_to_send())
+
+
+class H2Server(object):
+    """Cleartext HTTP/2 server, clients must use prior knowledge"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            self.loop.create_server(lambda: H2Protocol(self), "127.0.0.1", 0))
+
+    def start(self):
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        return "http://127.0.0.1:%d/api/v1.2" % self.server.sockets[0].getsockname()[1]
+
+
+def poll(conn, count, threads):
+    pool = ThreadPool(threads)
+    start = time.time()
+    try:
+        pool.map(lambda i: conn.get("commands/%d" % i), range(count))
+    finally:
+        pool.close()
+    return time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000.0
+
+    http1 = Http1Server(latency)
+    conn = Connection(None, http1.start(), False, pool_maxsize=threads)
+    elapsed = poll(conn, count, threads)
+    print("HTTP/1.1 requests: %7.0f req/s, %d connections" % (count / elapsed, http1.connections))
+
+    h2_server = H2Server(latency)
+    conn = Connection(None, h2_server.start(), False,
+                      transport=Http2Session(pool_maxsize=2, prior_knowledge=True))
+    elapsed = poll(conn, count, threads)
+    print("HTTP/2   httpx:    %7.0f req/s, %d connections" % (count / elapsed, h2_server.connections))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Measures the client-side cost of submitting command payloads through
+Connection._api_call_raw, with the network replaced by a stub session.
+
+Runs the current Connection with the qds_connection logger at WARN (the
+default for qds.py) against a replica of the previous code path, which
+pretty-printed every payload for the log regardless of log level.
+
+Usage:
+    python benchmarks/bench_payload_logging.py [num_payloads]
+"""
+from __future__ import print_function
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from qds_sdk.connection import Connection
+from qds_sdk.commands import CompositeCommand
+from qds_sdk.commands import HiveCommand
+
+
+class StubResponse(object):
+    status_code = 200
+    text = '{"id": 1, "status": "waiting"}'
+
+    def json(self):
+        return {"id": 1, "status": "waiting"}
+
+
+class StubSession(object):
+    """Stands in for requests.Session; never touches the network."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def post(self, url, timeout=None, **kwargs):
+        self.bytes_sent += len(kwargs.get('data') or '')
+        return StubResponse()
+
+
+class EagerLoggingConnection(Connection):
+    """Connection as it behaved before payload logging was made lazy."""
+
+    def _api_call_raw(self, req_type, path, data=None, params=None):
+        log = logging.getLogger("qds_connection")
+        log.info("[%s] %s" % (req_type, self.rest_url.rstrip('/') + '/' + path))
+        log.info("Payload: %s" % json.dumps(data, indent=4))
+        log.info("Params: %s" % params)
+        return Connection._api_call_raw(self, req_type, path, data=data, params=params)
+
+
+def composite_payload():
+    sub_commands = []
+    for i in range(50):
+        sub_commands.append(HiveCommand.parse(
+            ['--query', "select col_%d, count(*) from events_%d where dt = '$dt$' group by col_%d" % (i, i, i),
+             '--macros', '[{"dt": "2017-01-01"}]']))
+    return CompositeCommand.compose(sub_commands, cluster_label="default", name="backfill")
+
+
+def make_connection(cls):
+    conn = cls(auth=None, rest_url="https://api.qubole.com/api/v1.2", skip_ssl_cert_check=False)
+    conn.session = StubSession()
+    return conn
+
+
+def submit(conn, payload, count):
+    start = time.time()
+    for _ in range(count):
+        conn._api_call("POST", "commands", data=payload)
+    return time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payload = composite_payload()
+    logger = logging.getLogger("qds_connection")
+    logger.setLevel(logging.WARN)
+
+    eager = make_connection(EagerLoggingConnection)
+    lazy = make_connection(Connection)
+    before = submit(eager, payload, count)
+    after = submit(lazy, payload, count)
+
+    print("payload size: %d bytes, %d submissions" % (lazy.session.bytes_sent // count, count))
+    print("eager logging: %.3fs (%.1f us/request)" % (before, before * 1e6 / count))
+    print("lazy logging:  %.3fs (%.1f us/request)" % (after, after * 1e6 / count))
+    print("saved: %.1f%%" % (100.0 * (before - after) / before))
+
+
+if __name__ == '__main__':
+    main()
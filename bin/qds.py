@@ -22,7 +22,10 @@ import sys
 import traceback
 import logging
 import json
+import atexit
 from optparse import OptionParser
+from qds_sdk.instrumentation import LatencyStats
+from qds_sdk import inflight
 
 log = logging.getLogger("qds")
 CommandClasses = {
@@ -137,6 +140,8 @@ def runaction(cmdclass, args):
     args = cmdclass.parse(args)
     if args is not None:
         print_logs = args.pop("print_logs") # We don't want to send this to the API.
+        # Kill the command if we are terminated while waiting for it
+        inflight.install_signal_handlers()
         cmd = cmdclass.run(**args)
         if print_logs:
             sys.stderr.write(cmd.get_log())
@@ -568,6 +573,10 @@ def main():
                          default=False,
                          help="very verbose mode - debug level logging")
 
+    optparser.add_option("--stats", dest="stats", action="store_true",
+                         default=False,
+                         help="print per endpoint api latency statistics to stderr on exit")
+
     optparser.disable_interspersed_args()
     (options, args) = optparser.parse_args()
     
@@ -606,6 +615,11 @@ def main():
                      skip_ssl_cert_check=options.skip_ssl_cert_check,
                      cloud_name=options.cloud_name)
 
+    if options.stats:
+        stats = LatencyStats()
+        stats.attach(Qubole.hooks)
+        atexit.register(lambda: sys.stderr.write(stats.report()))
+
     if len(args) < 1:
         sys.stderr.write("Missing first argument containing subcommand\n")
         usage(optparser)
@@ -0,0 +1,266 @@
+"""
+Asyncio transport for the QDS REST API.
+
+AsyncConnection mirrors Connection but issues requests through aiohttp, so a
+single event loop can keep thousands of QDS calls in flight instead of
+blocking one thread per call. The coroutine helpers at the bottom of this
+module back the `*_async` methods of Resource and Command.
+
+This module needs python 3.5+ and the optional aiohttp package; nothing
+else in qds_sdk imports it eagerly.
+"""
+import asyncio
+import json
+import logging
+import inflection
+import pkg_resources
+import time
+import requests
+
+from qds_sdk.qubole import Qubole
+from qds_sdk.connection import Connection
+from qds_sdk.exception import ConfigError
+from qds_sdk.retry import RetryPolicy
+from qds_sdk.polling import FixedPollStrategy, query_key
+from qds_sdk.instrumentation import RequestEvent, BEFORE_REQUEST, AFTER_RESPONSE, ON_RETRY, ON_ERROR
+
+log = logging.getLogger("qds_async_connection")
+
+
+class AsyncResponse(object):
+    """
+    A fully read aiohttp response. Exposes the attributes of
+    requests.Response that Connection._handle_error and the qds_sdk
+    exceptions rely upon.
+    """
+
+    def __init__(self, status_code, text, headers, url):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.url = url
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncConnection(object):
+
+    def __init__(self, auth, rest_url, skip_ssl_cert_check, limit=100, retry_policy=None, hooks=None):
+        """
+        Args:
+            `auth`: QuboleAuth object carrying the api token
+
+            `rest_url`: versioned base url of the REST api
+
+            `skip_ssl_cert_check`: skip verification of server SSL certificate
+
+            `limit`: maximum number of simultaneous connections
+
+            `retry_policy`: RetryPolicy shared with the blocking transport.
+            Defaults to RetryPolicy()
+
+            `hooks`: EventBus receiving the same request events as the
+            blocking transport
+        """
+        self.auth = auth
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hooks = hooks
+        self.rest_url = rest_url
+        self.skip_ssl_cert_check = skip_ssl_cert_check
+        self.limit = limit
+        self._headers = {'User-Agent': 'qds-sdk-py-%s' % pkg_resources.get_distribution("qds-sdk").version,
+                         'Content-Type': 'application/json',
+                         'X-AUTH-TOKEN': auth.api_token}
+        self._session = None
+        self._loop = None
+
+    async def get_raw(self, path, params=None):
+        return await self._api_call_raw("GET", path, params=params)
+
+    async def get(self, path, params=None):
+        return await self._api_call("GET", path, params=params)
+
+    async def put(self, path, data=None):
+        return await self._api_call("PUT", path, data)
+
+    async def post(self, path, data=None):
+        return await self._api_call("POST", path, data)
+
+    async def delete(self, path, data=None):
+        return await self._api_call("DELETE", path, data)
+
+    async def close(self):
+        """
+        Close the underlying aiohttp session, if one was opened
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._loop = None
+
+    async def _with_retries(self, req_type, func, *args, **kwargs):
+        # Mirrors RetryPolicy.call, sleeping on the event loop instead
+        policy = self.retry_policy
+        start = policy.clock()
+        attempt, wait = 1, None
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                wait = policy.next_delay(req_type, e, attempt, policy.clock() - start, wait)
+                if wait is None:
+                    raise
+                log.info("%s, Retrying in %d seconds..." % (e.__class__.__name__, wait))
+                if self._instrumented():
+                    event = RequestEvent(req_type, args[1], attempt)
+                    event.error, event.delay = e, wait
+                    self.hooks.emit(ON_RETRY, event)
+                await asyncio.sleep(wait)
+                attempt += 1
+
+    def _instrumented(self):
+        return self.hooks is not None and self.hooks.enabled()
+
+    async def _get_session(self):
+        # aiohttp sessions are bound to the loop they were created on
+        loop = asyncio.get_event_loop()
+        if self._session is not None and self._loop is not loop:
+            # Left over from an earlier loop, typically of a finished
+            # asyncio.run(). Close it instead of leaking its connector; the
+            # connections of a closed loop are only marked closed
+            session, self._session = self._session, None
+            try:
+                await session.close()
+            except Exception:
+                log.debug("Closing the session of a previous event loop failed", exc_info=True)
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ConfigError("AsyncConnection requires the aiohttp package")
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             ssl=False if self.skip_ssl_cert_check else None)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=300))
+            self._loop = loop
+        return self._session
+
+    async def _api_call_raw(self, req_type, path, data=None, params=None):
+        return await self._with_retries(req_type, self._request, req_type, path, data=data, params=params)
+
+    async def _request(self, req_type, path, data=None, params=None):
+        url = self.rest_url.rstrip('/') + '/' + path
+
+        if req_type not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise NotImplemented
+
+        kwargs = {'headers': self._headers}
+        body = None
+        if data:
+            body = json.dumps(data)
+            kwargs['data'] = body
+        if params:
+            kwargs['params'] = params
+
+        if log.isEnabledFor(logging.INFO):
+            log.info("[%s] %s", req_type, url)
+            log.info("Payload: %s", body)
+            log.info("Params: %s", params)
+
+        event = None
+        if self._instrumented():
+            event = RequestEvent(req_type, path)
+            self.hooks.emit(BEFORE_REQUEST, event)
+
+        session = await self._get_session()
+        try:
+            start = time.time()
+            try:
+                async with session.request(req_type, url, **kwargs) as r:
+                    text = await r.text()
+                    response = AsyncResponse(r.status, text, r.headers, str(r.url))
+            except asyncio.TimeoutError:
+                # Surface timeouts the way the blocking transport does
+                raise requests.Timeout("Timed out: [%s] %s" % (req_type, url))
+
+            if event is not None:
+                event.status, event.duration = response.status_code, time.time() - start
+                event.bytes = len(text.encode('utf-8'))
+                self.hooks.emit(AFTER_RESPONSE, event)
+
+            Connection._handle_error(response)
+        except Exception as e:
+            if event is not None:
+                event.error = e
+                self.hooks.emit(ON_ERROR, event)
+            raise
+        return response
+
+    async def _api_call(self, req_type, path, data=None, params=None):
+        response = await self._api_call_raw(req_type, path, data=data, params=params)
+        return response.json()
+
+
+async def find_resource(cls, id):
+    """
+    Coroutine variant of Resource.find
+    """
+    conn = Qubole.async_agent()
+    if id is not None:
+        return cls(await conn.get(cls.element_path(id)))
+
+
+async def list_resources(cls, page=None, per_page=None):
+    """
+    Coroutine variant of Resource.list
+    """
+    conn = Qubole.async_agent()
+    params = {}
+    if page is not None:
+        params['page'] = page
+    if per_page is not None:
+        params['per_page'] = per_page
+    resource_json = await conn.get(cls.rest_entity_path, params=params or None)
+    key = inflection.pluralize(inflection.underscore(cls.__name__))
+    return [cls(s) for s in resource_json[key]]
+
+
+async def create_command(cls, **kwargs):
+    """
+    Coroutine variant of Command.create
+    """
+    conn = Qubole.async_agent()
+    if kwargs.get('command_type') is None:
+        kwargs['command_type'] = cls.__name__
+    if kwargs.get('tags') is not None:
+        kwargs['tags'] = kwargs['tags'].split(',')
+    return cls(await conn.post(cls.rest_entity_path, data=kwargs))
+
+
+async def run_command(cls, **kwargs):
+    """
+    Coroutine variant of Command.run. Live log printing is not supported.
+    """
+    kwargs.pop("print_logs_live", None)  # We don't want to send this to the API.
+    kwargs.pop("reuse", None)
+    kwargs.pop("notifier", None)
+    poll_strategy = (kwargs.pop("poll_strategy", None) or Qubole.current().poll_strategy
+                     or FixedPollStrategy())
+    key = query_key(cls.__name__, kwargs)
+    cmd = await create_command(cls, **kwargs)
+    schedule = poll_strategy.start(key)
+    while not cls.is_done(cmd.status):
+        await asyncio.sleep(schedule.next_delay(cmd.status))
+        cmd = await find_resource(cls, cmd.id)
+    if cls.is_success(cmd.status):
+        schedule.finish()
+    return cmd
+
+
+async def cancel_command(cls, id):
+    """
+    Coroutine variant of Command.cancel_id
+    """
+    conn = Qubole.async_agent()
+    return await conn.put(cls.element_path(id), {"status": "kill"})
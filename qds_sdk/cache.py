@@ -0,0 +1,114 @@
+"""
+Persistent cache of finished QDS commands.
+
+A command in a terminal state (done, error or cancelled) never changes, so
+its metadata, logs and job information can be served locally once fetched.
+CommandCache keeps them in a SQLite file and evicts the least recently used
+entries once the file holds more than `max_bytes` of data.
+
+Enable it with Qubole.configure(command_cache=CommandCache()). Command.find,
+get_log, get_log_id and get_jobs_id then consult it. Commands that are
+still running are always fetched from QDS.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class CommandCache(object):
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".qds", "command_cache.sqlite3")
+
+    def __init__(self, path=None, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            `path`: SQLite file holding the cache, created if missing.
+            Defaults to ~/.qds/command_cache.sqlite3. ":memory:" keeps the
+            cache in memory
+
+            `max_bytes`: total size of cached values beyond which least
+            recently used entries are evicted
+        """
+        self.path = path or self.DEFAULT_PATH
+        self.max_bytes = max_bytes
+        if self.path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(self.path))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.clock = time.time
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS entries ("
+                            "key TEXT PRIMARY KEY, value TEXT, size INTEGER, accessed REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    @staticmethod
+    def key(conn, path):
+        """
+        Returns:
+            Cache key of the api resource at `path`, qualified by the api
+            url so environments and api versions do not mix, and by a
+            digest of the api token so accounts sharing a cache file do
+            not see each other's commands
+        """
+        token = getattr(conn.auth, "api_token", None) or ""
+        tenant = hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+        return "%s:%s/%s" % (tenant, conn.rest_url.rstrip('/'), path)
+
+    def get(self, key):
+        """
+        Returns:
+            The cached value of `key`, or None
+        """
+        with self.lock:
+            row = self.db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with self.db:
+                self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (self.clock(), key))
+            return row[0]
+
+    def put(self, key, value):
+        """
+        Cache the text `value` under `key`, evicting least recently used
+        entries if the cache grows beyond max_bytes
+        """
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO entries (key, value, size, accessed) "
+                                "VALUES (?, ?, ?, ?)", (key, value, size, self.clock()))
+                self._evict()
+
+    def clear(self):
+        with self.lock:
+            with self.db:
+                self.db.execute("DELETE FROM entries")
+
+    def size(self):
+        """
+        Returns:
+            Total size in bytes of the cached values
+        """
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def _evict(self):
+        excess = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.db.executemany("DELETE FROM entries WHERE key = ?", victims)
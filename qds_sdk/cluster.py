@@ -57,17 +57,26 @@ class Cluster(Resource):
         return vars(arguments)
 
     @classmethod
-    def list(cls, state=None):
+    def list(cls, state=None, stream=False):
         """
         List existing clusters present in your account.
 
         Kwargs:
             `state`: list only those clusters which are in this state
 
+            `stream`: parse the response incrementally and return an
+            iterator instead of a list
+
         Returns:
             List of clusters satisfying the given criteria
         """
         conn = Qubole.agent()
+        if stream:
+            clusters = conn.get_stream(cls.rest_entity_path)
+            if state is None:
+                return clusters
+            return (cluster for cluster in clusters
+                    if state.lower() == cluster['cluster']['state'].lower())
         if state is None:
             return conn.get(cls.rest_entity_path)
         elif state is not None:
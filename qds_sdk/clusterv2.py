@@ -581,13 +581,16 @@ class ClusterV2(Resource):
         return conn.post(cls.element_path(cluster_id_label) + '/clone', data=cluster_info)
 
     @classmethod
-    def list(cls, label=None, cluster_id=None, state=None):
+    def list(cls, label=None, cluster_id=None, state=None, stream=False):
         """
         List existing clusters present in your account.
 
         Kwargs:
             `state`: list only those clusters which are in this state
 
+            `stream`: parse the response incrementally and return an
+            iterator over the clusters instead of the full response
+
         Returns:
             List of clusters satisfying the given criteria
         """
@@ -596,6 +599,12 @@ class ClusterV2(Resource):
         if label is not None:
             return cls.show(label)
         conn = Qubole.agent(version="v2")
+        if stream:
+            clusters = conn.get_stream(cls.rest_entity_path, key='clusters')
+            if state is None:
+                return clusters
+            return (cluster for cluster in clusters
+                    if state.lower() == cluster['state'].lower())
         cluster_list = conn.get(cls.rest_entity_path)
         if state is None:
             # return the complete list since state is None
@@ -12,16 +12,24 @@ from qds_sdk.account import Account
 from qds_sdk.util import GentleOptionParser
 from qds_sdk.util import OptionParsingError
 from qds_sdk.util import OptionParsingExit
+from qds_sdk.polling import FixedPollStrategy
+from qds_sdk.polling import query_key
+from qds_sdk.notify import SleepNotifier
+from qds_sdk.reuse import fingerprint
+from qds_sdk import inflight
+from qds_sdk.export import parse_schema
 from optparse import SUPPRESS_HELP
 
 import boto
 import time
+from multiprocessing.pool import ThreadPool
 import logging
 import sys
 import re
 import pipes
 import os
 import json
+import collections
 
 log = logging.getLogger("qds_commands")
 
@@ -74,7 +82,68 @@ class Command(Resource):
         if kwargs.get('tags') is not None:
             kwargs['tags'] = kwargs['tags'].split(',')
 
-        return cls(conn.post(cls.rest_entity_path, data=kwargs))
+        cmd = cls(conn.post(cls.rest_entity_path, data=kwargs))
+        inflight.track(cmd)
+        return cmd
+
+    @classmethod
+    def find(cls, id, **kwargs):
+        """
+        Fetches the command with this id. Finished commands are served
+        from the command cache when one is configured.
+        """
+        cache = Qubole.current().command_cache
+        if cache is None or id is None:
+            return super(Command, cls).find(id, **kwargs)
+        conn = Qubole.agent()
+        path = cls.element_path(id)
+        key = cache.key(conn, path)
+        cached = cache.get(key)
+        if cached is not None:
+            return cls(json.loads(cached))
+        cmd = cls(conn.get(path))
+        if Command.is_done(cmd.status):
+            cache.put(key, json.dumps(cmd.attributes))
+        return cmd
+
+    @classmethod
+    def create_many(cls, list_of_kwargs, concurrency=8):
+        """
+        Create many commands, `concurrency` at a time, over the shared pooled
+        connection. Configured rate limits apply to every request. Keep
+        `concurrency` within the connection pool size (pool_maxsize) so
+        connections are reused.
+
+        Args:
+            `list_of_kwargs`: one dictionary of create() keyword arguments
+            per command
+
+            `concurrency`: maximum number of create requests in flight
+
+        Returns:
+            A list in the order of `list_of_kwargs` holding the created
+            Command object or, where creation failed, the exception raised.
+            Failures do not stop the remaining creations.
+        """
+        list_of_kwargs = list(list_of_kwargs)
+        if not list_of_kwargs:
+            return []
+        # Pool threads do not inherit an active QuboleClient
+        config = Qubole.current()
+
+        def create(kwargs):
+            try:
+                with config.activate():
+                    return cls.create(**kwargs)
+            except Exception as e:
+                log.warning("Failed to create %s: %s" % (cls.__name__, e))
+                return e
+
+        pool = ThreadPool(min(concurrency, len(list_of_kwargs)))
+        try:
+            return pool.map(create, [dict(kwargs) for kwargs in list_of_kwargs], chunksize=1)
+        finally:
+            pool.terminate()
 
     @classmethod
     def run(cls, **kwargs):
@@ -85,35 +154,139 @@ class Command(Resource):
         Args:
             `**kwargs`: keyword arguments specific to command type
 
+            `poll_strategy`: a qds_sdk.polling strategy deciding how long to
+            wait between polls. Defaults to the configured one
+
+            `reuse`: with result reuse configured (see qds_sdk.reuse), False
+            runs the command even if an identical one succeeded recently
+
+            `notifier`: a qds_sdk.notify notifier telling when the command
+            changed state. Defaults to the configured one
+
         Returns:
             Command object
         """
+        result_reuse = Qubole.current().result_reuse if kwargs.pop("reuse", True) else None
+        fp = fingerprint(cls.__name__, kwargs) if result_reuse is not None else None
+        if fp is None:
+            return cls._run(kwargs)
+
+        while True:
+            cmd = result_reuse.lookup(fp, cls)
+            if cmd is not None:
+                log.info("Reusing %s %s run with the same query" % (cls.__name__, cmd.id))
+                return cmd
+            running = result_reuse.claim(fp)
+            if running is None:
+                break
+            running.wait()
+        try:
+            cmd = cls._run(kwargs)
+            if Command.is_success(cmd.status):
+                result_reuse.record(fp, cmd)
+            return cmd
+        finally:
+            result_reuse.release(fp)
 
-        # vars to keep track of actual logs bytes (err, tmp) and new bytes seen in each iteration
-        err_pointer, tmp_pointer, new_bytes = 0, 0, 0
+    @classmethod
+    def _run(cls, kwargs):
         print_logs_live = kwargs.pop("print_logs_live", None) # We don't want to send this to the API.
+        poll_strategy = (kwargs.pop("poll_strategy", None) or Qubole.current().poll_strategy
+                         or FixedPollStrategy())
+        notifier = kwargs.pop("notifier", None) or Qubole.current().notifier or SleepNotifier()
 
+        key = query_key(cls.__name__, kwargs)
         cmd = cls.create(**kwargs)
-        while not Command.is_done(cmd.status):
-            time.sleep(Qubole.poll_interval)
-            cmd = cls.find(cmd.id)
-            if print_logs_live is True:
-                log, err_length, tmp_length = cmd.get_log_partial(err_pointer, tmp_pointer)
-
-                # if err length is non zero, then tmp_pointer needs to be reset to the current tmp_length as the
-                # err_length will contain the full set of logs from last seen non-zero err_length.
-                if err_length != "0":
-                    err_pointer += int(err_length)
-                    new_bytes = int(err_length) + int(tmp_length) - tmp_pointer
-                    tmp_pointer = int(tmp_length)
-                else:
-                    tmp_pointer += int(tmp_length)
-                    new_bytes = int(tmp_length)
+        schedule = poll_strategy.start(key)
+        log_cursor = _LogCursor()
+        inflight.registry.add(cls, cmd.id)
+        try:
+            while not Command.is_done(cmd.status):
+                notifier.wait(cmd.id, schedule.next_delay(cmd.status))
+                cmd = cls.find(cmd.id)
+                if print_logs_live is True:
+                    chunk = log_cursor.next_chunk(cmd)
+                    if chunk:
+                        print(chunk, file=sys.stderr)
+        finally:
+            inflight.registry.discard(cmd.id)
+
+        if Command.is_success(cmd.status):
+            schedule.finish()
+        return cmd
 
-                if len(log) > 0 and new_bytes > 0:
-                    print(log[-new_bytes:], file=sys.stderr)
+    @classmethod
+    def wait_all(cls, ids, concurrency=8, timeout=None, poll_strategy=None):
+        """
+        Wait for many commands at once, polling them together instead of
+        one loop per command. See qds_sdk.watcher.CommandWatcher
 
-        return cmd
+        Args:
+            `ids`: command ids or Command objects
+
+            `concurrency`: maximum number of status requests in flight
+
+            `timeout`: stop waiting after this many seconds
+
+            `poll_strategy`: a qds_sdk.polling strategy scheduling the polls
+            of each command. Defaults to the configured one
+
+        Returns:
+            An iterator yielding each command as soon as it completes
+        """
+        from qds_sdk.watcher import CommandWatcher
+        watcher = CommandWatcher(ids, command_class=cls, concurrency=concurrency,
+                                 poll_strategy=poll_strategy)
+        return watcher.watch(timeout)
+
+    @classmethod
+    def tracked(cls, timeout=30):
+        """
+        Context manager cancelling the commands created by the current
+        thread inside the block if it raises. See qds_sdk.inflight
+
+        Example Usage:
+            with Command.tracked():
+                cmd = HiveCommand.run(query="show tables")
+
+        Args:
+            `timeout`: seconds to wait for the cancellations
+        """
+        return inflight.tracked(timeout)
+
+    @classmethod
+    def create_async(cls, **kwargs):
+        """
+        Coroutine variant of create. Requires python 3.5+ and aiohttp.
+
+        Example Usage:
+            cmd = await HiveCommand.create_async(query="show tables")
+        """
+        from qds_sdk import async_connection
+        return async_connection.create_command(cls, **kwargs)
+
+    @classmethod
+    def run_async(cls, **kwargs):
+        """
+        Coroutine variant of run. Polls on the event loop instead of
+        blocking a thread. Requires python 3.5+ and aiohttp.
+        """
+        from qds_sdk import async_connection
+        return async_connection.run_command(cls, **kwargs)
+
+    @classmethod
+    def cancel_id_async(cls, id):
+        """
+        Coroutine variant of cancel_id. Requires python 3.5+ and aiohttp.
+        """
+        from qds_sdk import async_connection
+        return async_connection.cancel_command(cls, id)
+
+    def cancel_async(self):
+        """
+        Coroutine variant of cancel
+        """
+        return self.__class__.cancel_id_async(self.id)
 
     @classmethod
     def cancel_id(cls, id):
@@ -141,9 +314,7 @@ class Command(Resource):
         Args:
             `id`: command id
         """
-        conn = Qubole.agent()
-        r = conn.get_raw(cls.element_path(id) + "/logs")
-        return r.text
+        return cls._get_finished_text(id, cls.element_path(id) + "/logs")
 
     def get_log(self):
         """
@@ -154,8 +325,15 @@ class Command(Resource):
         """
         log_path = self.meta_data['logs_resource']
         conn = Qubole.agent()
-        r = conn.get_raw(log_path)
-        return r.text
+        cache = Qubole.current().command_cache
+        if cache is None or not Command.is_done(self.status):
+            return conn.get_raw(log_path).text
+        key = cache.key(conn, log_path)
+        text = cache.get(key)
+        if text is None:
+            text = conn.get_raw(log_path).text
+            cache.put(key, text)
+        return text
 
     def get_log_partial(self, err_pointer=0, tmp_pointer=0):
         """
@@ -168,13 +346,43 @@ class Command(Resource):
             An array where the first field is actual log (string), while 2nd & 3rd are counts of err and tmp bytes
                 which have been returned by api in addition to the given pointers.
         """
-        log_path = self.meta_data['logs_resource']
-        conn = Qubole.agent()
-        r = conn.get_raw(log_path, params={'err_file_processed':err_pointer, 'tmp_file_processed':tmp_pointer})
+        r = self._get_log_partial_raw(err_pointer, tmp_pointer)
         if 'err_length' in r.headers.keys() and 'tmp_length' in r.headers.keys():
             return [r.text, r.headers['err_length'], r.headers['tmp_length']]
         return [r.text, 0, 0]
 
+    def _get_log_partial_raw(self, err_pointer, tmp_pointer):
+        log_path = self.meta_data['logs_resource']
+        conn = Qubole.agent()
+        return conn.get_raw(log_path, params={'err_file_processed':err_pointer, 'tmp_file_processed':tmp_pointer})
+
+    def stream_logs(self, interval=None, follow=True):
+        """
+        Yields the log of the command represented by this object chunk by
+        chunk, each chunk holding only log text not yielded before.
+
+        Args:
+            `interval`: seconds between log fetches while following.
+                        Defaults to the configured poll interval
+            `follow`: keep fetching until the command is done. Otherwise
+                      only the log written so far is yielded
+
+        The status of the command is refreshed after every fetch while
+        following, and the log is read once more after completion so the
+        tail is never lost.
+        """
+        cursor = _LogCursor()
+        cmd = self
+        while True:
+            done = not follow or Command.is_done(cmd.status)
+            chunk = cursor.next_chunk(cmd)
+            if chunk:
+                yield chunk
+            if done:
+                return
+            time.sleep(interval if interval is not None else Qubole.current().poll_interval)
+            cmd = cmd.__class__.find(cmd.id)
+
     @classmethod
     def get_jobs_id(cls, id):
         """
@@ -187,12 +395,29 @@ class Command(Resource):
         Args:
             `id`: command id
         """
-        conn = Qubole.agent()
-        r = conn.get_raw(cls.element_path(id) + "/jobs")
-        return r.text
-
+        return cls._get_finished_text(id, cls.element_path(id) + "/jobs")
 
-    def get_results(self, fp=sys.stdout, inline=True, delim=None, fetch=True, qlog=None, arguments=[]):
+    @classmethod
+    def _get_finished_text(cls, id, path):
+        # With a command cache configured, text resources of finished
+        # commands are fetched once. The status is checked first so output
+        # of a command finishing meanwhile is not cached incomplete.
+        conn = Qubole.agent()
+        cache = Qubole.current().command_cache
+        if cache is None:
+            return conn.get_raw(path).text
+        key = cache.key(conn, path)
+        text = cache.get(key)
+        if text is None:
+            finished = Command.is_done(cls.find(id).status)
+            text = conn.get_raw(path).text
+            if finished:
+                cache.put(key, text)
+        return text
+
+
+    def get_results(self, fp=sys.stdout, inline=True, delim=None, fetch=True, qlog=None, arguments=[], stream=False,
+                    concurrency=1, format=None):
         """
         Fetches the result for the command represented by this object
 
@@ -207,7 +432,21 @@ class Command(Resource):
             `inline`: whether or not results are returned inline as CRLF separated string
             `fetch`: True to fetch the result even if it is greater than 20MB, False to
                      only get the result location on s3
+            `stream`: decode the response incrementally, writing inline results to
+                      `fp` as they arrive instead of buffering the whole payload
+            `concurrency`: number of result files, or 8MB byte ranges of large
+                           result files, downloaded from s3 at once. Parts
+                           downloaded ahead of the one being written are
+                           buffered in memory, at most 2 * `concurrency`
+                           parts and 128MB
+            `format`: "csv", "arrow" or "parquet" to convert the result while it is
+                      streamed, typed after the schema in `qlog`. See qds_sdk.export
         """
+        if format is not None:
+            from qds_sdk import export
+            export.write_results(self, fp, format, qlog=qlog)
+            return
+
         result_path = self.meta_data['results_resource']
 
         conn = Qubole.agent()
@@ -219,25 +458,16 @@ class Command(Resource):
                 raise ParseError("incude_header can be either true or false")
 
 
-        r = conn.get(result_path, {'inline': inline, 'include_headers': include_header})
-        if r.get('inline'):
-            if sys.version_info < (3, 0, 0):
-                fp.write(r['results'].encode('utf8'))
-            else:
-                import io
-                if isinstance(fp, io.TextIOBase):
-                    fp.buffer.write(r['results'].encode('utf8'))
-                elif isinstance(fp, io.BufferedIOBase) or isinstance(fp, io.RawIOBase):
-                    fp.write(r['results'].encode('utf8'))
-                else:
-                    # Can this happen? Don't know what's the right thing to do in this case.
-                    pass
+        if stream:
+            r = conn.get_streamed_object(result_path, {'inline': inline, 'include_headers': include_header},
+                                         sinks={'results': lambda text: _write_text(fp, text)})
         else:
+            r = conn.get(result_path, {'inline': inline, 'include_headers': include_header})
+            if r.get('inline'):
+                _write_text(fp, r['results'])
+        if not r.get('inline'):
             if fetch:
-                storage_credentials = conn.get(Account.credentials_rest_entity_path)
-                boto_conn = boto.connect_s3(aws_access_key_id=storage_credentials['storage_access_key'],
-                                            aws_secret_access_key=storage_credentials['storage_secret_key'],
-                                            security_token = storage_credentials['session_token'])
+                boto_conn = _connect_s3(conn)
 
                 log.info("Starting download from result locations: [%s]" % ",".join(r['result_location']))
                 #fetch latest value of num_result_dir
@@ -256,11 +486,78 @@ class Command(Resource):
                     # work.
 
                     _download_to_local(boto_conn, s3_path, fp, num_result_dir, delim=delim,
-                                       skip_data_avail_check=isinstance(self, PrestoCommand))
+                                       skip_data_avail_check=isinstance(self, PrestoCommand),
+                                       concurrency=concurrency)
             else:
                 fp.write(",".join(r['result_location']))
 
 
+    def iter_results(self, batch_size=1000, qlog=None):
+        """
+        Streams the result of the command as batches of rows. Results stored
+        on s3 are read file by file, so memory use does not grow with their
+        size.
+
+        Example Usage:
+            for rows in cmd.iter_results(batch_size=10000):
+                for row in rows:
+                    ...
+
+        Args:
+            `batch_size`: maximum number of rows in a batch
+            `qlog`: the qlog of the command. When it holds the result schema, rows
+                    are dictionaries keyed by column name instead of lists
+
+        Returns:
+            An iterator over lists of rows
+        """
+        columns = _parse_column_names(qlog) if qlog is not None else None
+        conn = Qubole.agent()
+        r = conn.get(self.meta_data['results_resource'], {'inline': True, 'include_headers': 'false'})
+        if r.get('inline'):
+            # Inline results separate fields with tabs
+            rows = _iter_rows([r['results'].encode('utf8')], b'\t')
+        else:
+            boto_conn = _connect_s3(conn)
+            num_result_dir = Command.find(self.id).num_result_dir
+            keys = []
+            for s3_path in r['result_location']:
+                keys.extend(_result_keys(boto_conn, s3_path, num_result_dir,
+                                         skip_data_avail_check=isinstance(self, PrestoCommand))[1])
+            rows = _iter_rows(_iter_contents(keys), b'\x01')
+
+        batch = []
+        for row in rows:
+            batch.append(dict(zip(columns, row)) if columns else row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def download_results(self, path, delim=None):
+        """
+        Downloads the result of the command from s3 to the file at `path`.
+        Progress is recorded in a manifest next to it, `path`.manifest, so
+        calling download_results again after an interrupted download skips
+        the result files already written and resumes a partially written
+        one from where it stopped. The manifest is removed once the download
+        completes.
+
+        Args:
+            `path`: destination file
+            `delim`: replacement for the Ctrl-A field separator of the result files
+        """
+        conn = Qubole.agent()
+        r = conn.get(self.meta_data['results_resource'], {'inline': False})
+        boto_conn = _connect_s3(conn)
+        num_result_dir = Command.find(self.id).num_result_dir
+        keys = []
+        for s3_path in r['result_location']:
+            keys.extend(_result_keys(boto_conn, s3_path, num_result_dir,
+                                     skip_data_avail_check=isinstance(self, PrestoCommand))[1])
+        _download_resumable(keys, path, delim=delim)
+
 
 class HiveCommand(Command):
 
@@ -1246,68 +1543,208 @@ class DbTapQueryCommand(Command):
         v["command_type"] = "DbTapQueryCommand"
         return v
 
-def _read_iteratively(key_instance, fp, delim):
-    key_instance.open_read()
-    while True:
-        try:
-            # Default buffer size is 8192 bytes
-            data = next(key_instance)
-            if sys.version_info < (3, 0, 0):
-                fp.write(str(data).replace(chr(1), delim))
-            else:
-                import io
-                if isinstance(fp, io.TextIOBase):
-                    fp.buffer.write(data.decode('utf-8').replace(chr(1), delim).encode('utf8'))
-                elif isinstance(fp, io.BufferedIOBase) or isinstance(fp, io.RawIOBase):
-                    fp.write(data.decode('utf8').replace(chr(1), delim).encode('utf8'))
-                else:
-                    # Can this happen? Don't know what's the right thing to do in this case.
-                    pass
-        except StopIteration:
-            # Stream closes itself when the exception is raised
-            return
+class _LogCursor(object):
+    """
+    Tracks how much of the err and tmp log files of a command has been
+    read, so each partial log fetch yields only new text.
+    """
 
-def write_headers(qlog,fp):
-    col_names = []
-    qlog = json.loads(qlog)
-    if qlog["QBOL-QUERY-SCHEMA"] is not None:
-        qlog_hash = qlog["QBOL-QUERY-SCHEMA"]["-1"] if qlog["QBOL-QUERY-SCHEMA"]["-1"] is not None else qlog["QBOL-QUERY-SCHEMA"][qlog["QBOL-QUERY-SCHEMA"].keys[0]]
+    def __init__(self):
+        self.err_pointer = 0
+        self.tmp_pointer = 0
+
+    def next_chunk(self, cmd):
+        r = cmd._get_log_partial_raw(self.err_pointer, self.tmp_pointer)
+        err_length = int(r.headers.get('err_length', 0))
+        tmp_length = int(r.headers.get('tmp_length', 0))
+
+        # if err length is non zero, then tmp_pointer needs to be reset to the current tmp_length as the
+        # err_length will contain the full set of logs from last seen non-zero err_length.
+        if err_length != 0:
+            self.err_pointer += err_length
+            new_bytes = err_length + tmp_length - self.tmp_pointer
+            self.tmp_pointer = tmp_length
+        else:
+            self.tmp_pointer += tmp_length
+            new_bytes = tmp_length
 
-        for qlog_item in qlog_hash:
-            col_names.append(qlog_item["ColumnName"])
+        # Lengths are in bytes, so slice the raw body rather than the text
+        content = r.content
+        if new_bytes <= 0 or not content:
+            return ""
+        return content[-new_bytes:].decode('utf-8', 'replace')
 
-        col_names = "\t".join(col_names)
-        col_names += "\n"
 
-    fp.write(col_names)
+def _connect_s3(conn):
+    storage_credentials = conn.get(Account.credentials_rest_entity_path)
+    return boto.connect_s3(aws_access_key_id=storage_credentials['storage_access_key'],
+                           aws_secret_access_key=storage_credentials['storage_secret_key'],
+                           security_token = storage_credentials['session_token'])
 
+def _write_text(fp, text):
+    if sys.version_info < (3, 0, 0):
+        fp.write(text.encode('utf8'))
+    else:
+        import io
+        if isinstance(fp, io.TextIOBase):
+            fp.buffer.write(text.encode('utf8'))
+        elif isinstance(fp, io.BufferedIOBase) or isinstance(fp, io.RawIOBase):
+            fp.write(text.encode('utf8'))
+        else:
+            # Can this happen? Don't know what's the right thing to do in this case.
+            pass
+
+def _write_bytes(fp, data):
+    if sys.version_info < (3, 0, 0):
+        fp.write(data)
+    else:
+        import io
+        if isinstance(fp, io.TextIOBase):
+            # Text written earlier, like the headers, goes out first
+            fp.flush()
+            fp.buffer.write(data)
+        else:
+            fp.write(data)
 
-def _download_to_local(boto_conn, s3_path, fp, num_result_dir, delim=None, skip_data_avail_check=False):
+def _delimiter_translator(delim):
     '''
-    Downloads the contents of all objects in s3_path into fp
+    Returns:
+        A function replacing the Ctrl-A field separators of a byte string
+        with `delim`. Ctrl-A never occurs inside a multi-byte UTF-8
+        sequence, so chunks of any size are translated independently.
+    '''
+    replacement = delim.encode('utf8')
+    if len(replacement) == 1:
+        # One pass over the bytes, without decoding them
+        table = bytearray(range(256))
+        table[1] = ord(replacement)
+        table = bytes(table)
+        return lambda data: data.translate(table)
+    return lambda data: data.replace(b'\x01', replacement)
+
+def _read_iteratively(key_instance, fp, delim, buffer_size=1024 * 1024):
+    translate = _delimiter_translator(delim)
+    key_instance.open_read()
+    try:
+        while True:
+            data = key_instance.read(buffer_size)
+            if not data:
+                return
+            _write_bytes(fp, translate(data))
+    finally:
+        key_instance.close()
+
+def _parse_column_names(qlog):
+    '''
+    Returns:
+        The column names of the result schema in `qlog`, a JSON string, or
+        None if it has no schema
+    '''
+    schema = parse_schema(qlog)
+    if schema is None:
+        return None
+    return [name for name, hive_type in schema]
+
+def write_headers(qlog,fp):
+    col_names = _parse_column_names(qlog)
+    if col_names is not None:
+        fp.write("\t".join(col_names) + "\n")
+    else:
+        fp.write("")
+
+def _iter_rows(chunks, sep):
+    '''
+    Splits a stream of bytes into rows of text fields
 
     Args:
-        `boto_conn`: S3 connection object
+        `chunks`: iterable of byte strings
 
-        `s3_path`: S3 path to be downloaded
+        `sep`: field separator, a byte string
+    '''
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf8').split(sep.decode('utf8'))
+    if pending:
+        yield pending.rstrip(b'\r').decode('utf8').split(sep.decode('utf8'))
+
+def _iter_contents(keys, buffer_size=1024 * 1024):
+    for key_instance in keys:
+        log.info("Reading file from %s" % key_instance.name)
+        key_instance.open_read()
+        try:
+            while True:
+                data = key_instance.read(buffer_size)
+                if not data:
+                    break
+                yield data
+        finally:
+            key_instance.close()
 
-        `fp`: The file object where data is to be downloaded
+
+def _download_parallel(bucket, keys, fp, delim=None, concurrency=8, part_size=8 * 1024 * 1024,
+                       max_buffer_bytes=128 * 1024 * 1024):
     '''
-    #Progress bar to display download progress
-    def _callback(downloaded, total):
-        '''
-        Call function for upload.
+    Downloads the contents of `keys` into fp in order, fetching result
+    files, and `part_size` byte ranges of larger files, `concurrency` at a
+    time. Fetched parts wait in a reorder buffer for their turn to be
+    written. It holds at most 2 * `concurrency` parts and, unless a single
+    part is larger, at most `max_buffer_bytes`, which bounds memory use.
+    '''
+    parts = []
+    for key in keys:
+        if key.size is None or key.size <= part_size:
+            parts.append((key.name, None, key.size if key.size is not None else part_size))
+        else:
+            for start in range(0, key.size, part_size):
+                end = min(start + part_size, key.size)
+                parts.append((key.name, (start, end - 1), end - start))
+    translate = _delimiter_translator(delim) if delim is not None else None
+
+    def fetch(part):
+        name, byte_range, size = part
+        headers = {'Range': 'bytes=%d-%d' % byte_range} if byte_range is not None else None
+        # A key of its own per request, boto keys are not thread safe
+        data = bucket.new_key(name).get_contents_as_string(headers=headers)
+        if translate is not None:
+            data = translate(data)
+        return data
+
+    pool = ThreadPool(concurrency)
+    try:
+        pending = collections.deque()
+        buffered = 0
+        for part in parts:
+            while pending and (len(pending) >= 2 * concurrency or
+                               buffered + part[2] > max_buffer_bytes):
+                size, result = pending.popleft()
+                _write_bytes(fp, result.get())
+                buffered -= size
+            if part[1] is None or part[1][0] == 0:
+                log.info("Downloading file from %s" % part[0])
+            pending.append((part[2], pool.apply_async(fetch, (part,))))
+            buffered += part[2]
+        while pending:
+            _write_bytes(fp, pending.popleft()[1].get())
+    finally:
+        pool.terminate()
+
+
+def _result_keys(boto_conn, s3_path, num_result_dir, skip_data_avail_check=False):
+    '''
+    Waits for the results at s3_path to be complete on s3
 
-        `downloaded`: File size already downloaded (int)
+    Args:
+        `boto_conn`: S3 connection object
 
-        `total`: Total file size to be downloaded (int)
-        '''
-        if (total is 0) or (downloaded == total):
-            return
-        progress = downloaded*100/total
-        sys.stderr.write('\r[{0}] {1}%'.format('#'*progress, progress))
-        sys.stderr.flush()
+        `s3_path`: S3 path of a result file, or of a result folder if it
+        ends with a slash
 
+    Returns:
+        The bucket and the list of keys holding the results, in order
+    '''
     def _is_complete_data_available(bucket_paths, num_result_dir):
         if num_result_dir == -1:
             return True
@@ -1348,7 +1785,62 @@ def _download_to_local(boto_conn, s3_path, fp, num_result_dir, delim=None, skip_
             key_instance = bucket.get_key(key_name)
         if key_instance is None:
             raise Exception("Results file not available on s3 yet. This can be because of s3 eventual consistency issues.")
-        log.info("Downloading file from %s" % s3_path)
+        return bucket, [key_instance]
+
+    #It is a folder
+    key_prefix = m.group(2)
+    bucket_paths = bucket.list(key_prefix)
+    if not skip_data_avail_check:
+        complete_data_available = _is_complete_data_available(bucket_paths, num_result_dir)
+        while complete_data_available is False and retries > 0:
+            retries = retries - 1
+            log.info("Results dir is not available on s3. Retry: " + str(6-retries))
+            time.sleep(10)
+            complete_data_available = _is_complete_data_available(bucket_paths, num_result_dir)
+        if complete_data_available is False:
+            raise Exception("Results file not available on s3 yet. This can be because of s3 eventual consistency issues.")
+
+    # Eliminate _tmp_ files which ends with $folder$
+    return bucket, [one_path for one_path in bucket_paths if not one_path.name.endswith('$folder$')]
+
+
+def _download_to_local(boto_conn, s3_path, fp, num_result_dir, delim=None, skip_data_avail_check=False,
+                       concurrency=1):
+    '''
+    Downloads the contents of all objects in s3_path into fp
+
+    Args:
+        `boto_conn`: S3 connection object
+
+        `s3_path`: S3 path to be downloaded
+
+        `fp`: The file object where data is to be downloaded
+
+        `concurrency`: number of objects, or byte ranges of large objects,
+        downloaded at once. 1 downloads objects one after the other
+    '''
+    #Progress bar to display download progress
+    def _callback(downloaded, total):
+        '''
+        Call function for upload.
+
+        `downloaded`: File size already downloaded (int)
+
+        `total`: Total file size to be downloaded (int)
+        '''
+        if (total is 0) or (downloaded == total):
+            return
+        progress = downloaded*100/total
+        sys.stderr.write('\r[{0}] {1}%'.format('#'*progress, progress))
+        sys.stderr.flush()
+
+    bucket, keys = _result_keys(boto_conn, s3_path, num_result_dir, skip_data_avail_check)
+    if concurrency > 1:
+        _download_parallel(bucket, keys, fp, delim=delim, concurrency=concurrency)
+        return
+
+    for key_instance in keys:
+        log.info("Downloading file from %s" % key_instance.name)
         if delim is None:
             try:
                 key_instance.get_contents_to_file(fp)  # cb=_callback
@@ -1366,29 +1858,77 @@ def _download_to_local(boto_conn, s3_path, fp, num_result_dir, delim=None, skip_
             # Get contents as string. Replace parameters and write to file.
             _read_iteratively(key_instance, fp, delim=delim)
 
-    else:
-        #It is a folder
-        key_prefix = m.group(2)
-        bucket_paths = bucket.list(key_prefix)
-        if not skip_data_avail_check:
-            complete_data_available = _is_complete_data_available(bucket_paths, num_result_dir)
-            while complete_data_available is False and retries > 0:
-                retries = retries - 1
-                log.info("Results dir is not available on s3. Retry: " + str(6-retries))
-                time.sleep(10)
-                complete_data_available = _is_complete_data_available(bucket_paths, num_result_dir)
-            if complete_data_available is False:
-                raise Exception("Results file not available on s3 yet. This can be because of s3 eventual consistency issues.")
-
-        for one_path in bucket_paths:
-            name = one_path.name
 
-            # Eliminate _tmp_ files which ends with $folder$
-            if name.endswith('$folder$'):
+def _download_resumable(keys, path, delim=None, buffer_size=1024 * 1024, checkpoint_bytes=8 * 1024 * 1024):
+    '''
+    Downloads the contents of `keys` into the file at `path`, resuming the
+    download recorded in the manifest `path`.manifest if there is one.
+
+    The manifest lists for each key its ETag, its size and how many of its
+    bytes were read, plus the size of the output file at the last
+    checkpoint. It is rewritten every `checkpoint_bytes` bytes, after the
+    output file was synced, so bytes written after the last checkpoint are
+    truncated and fetched again on resume.
+    '''
+    manifest_path = path + ".manifest"
+    translate = _delimiter_translator(delim) if delim is not None else None
+    manifest = None
+    if os.path.exists(manifest_path) and os.path.exists(path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        recorded = [(part["key"], part["etag"]) for part in manifest["parts"]]
+        if recorded != [(key.name, key.etag) for key in keys][:len(recorded)]:
+            log.info("Results changed since the download to %s started, starting over" % path)
+            manifest = None
+    if manifest is None:
+        manifest = {"parts": [], "output_size": 0}
+        open(path, "wb").close()
+    else:
+        log.info("Resuming download to %s at %d bytes" % (path, manifest["output_size"]))
+
+    def checkpoint(out):
+        out.flush()
+        os.fsync(out.fileno())
+        manifest["output_size"] = out.tell()
+        tmp = manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        if os.name == "nt" and os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        os.rename(tmp, manifest_path)
+
+    with open(path, "r+b") as out:
+        out.truncate(manifest["output_size"])
+        out.seek(manifest["output_size"])
+        for i, key_instance in enumerate(keys):
+            if i == len(manifest["parts"]):
+                manifest["parts"].append({"key": key_instance.name, "etag": key_instance.etag,
+                                          "size": key_instance.size, "read": 0, "done": False})
+            part = manifest["parts"][i]
+            if part["done"]:
                 continue
-
-            log.info("Downloading file from %s" % name)
-            if delim is None:
-                one_path.get_contents_to_file(fp)  # cb=_callback
-            else:
-                _read_iteratively(one_path, fp, delim=delim)
+            if part["size"] is None or part["read"] < part["size"]:
+                log.info("Downloading file from %s" % key_instance.name)
+                headers = {}
+                if part["read"] > 0:
+                    # If-Match fails the request should the object have changed
+                    headers = {'Range': 'bytes=%d-' % part["read"], 'If-Match': part["etag"]}
+                key_instance.open_read(headers=headers)
+                try:
+                    unsaved = 0
+                    while True:
+                        data = key_instance.read(buffer_size)
+                        if not data:
+                            break
+                        out.write(translate(data) if translate is not None else data)
+                        part["read"] += len(data)
+                        unsaved += len(data)
+                        if unsaved >= checkpoint_bytes:
+                            checkpoint(out)
+                            unsaved = 0
+                finally:
+                    key_instance.close()
+            part["done"] = True
+            checkpoint(out)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
@@ -1,4 +1,5 @@
 import sys
+import time
 import requests
 import logging
 import ssl
@@ -9,7 +10,10 @@ try:
     from requests.packages.urllib3.poolmanager import PoolManager
 except ImportError:
     from urllib3.poolmanager import PoolManager
-from qds_sdk.retry import retry
+from qds_sdk.retry import RetryPolicy
+from qds_sdk.timeouts import TimeoutPolicy
+from qds_sdk.streaming import JsonStreamReader
+from qds_sdk.instrumentation import RequestEvent, BEFORE_REQUEST, AFTER_RESPONSE, ON_RETRY, ON_ERROR
 from qds_sdk.exception import *
 
 
@@ -31,26 +35,123 @@ class MyAdapter(HTTPAdapter):
 
 class Connection:
 
-    def __init__(self, auth, rest_url, skip_ssl_cert_check, reuse=True):
+    def __init__(self, auth, rest_url, skip_ssl_cert_check, reuse=True,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 retry_policy=None, throttles=None, timeouts=None, hooks=None,
+                 transport="requests"):
+        """
+        Args:
+            `auth`: QuboleAuth object carrying the api token
+
+            `rest_url`: versioned base url of the REST api
+
+            `skip_ssl_cert_check`: skip verification of server SSL certificate
+
+            `reuse`: keep a requests.Session with pooled keep-alive connections
+
+            `pool_connections`: number of host pools to cache
+
+            `pool_maxsize`: maximum number of connections kept alive per host.
+            Should be at least the number of threads sharing this connection
+
+            `pool_block`: block when no free connection is available instead
+            of opening a throwaway one
+
+            `retry_policy`: RetryPolicy deciding which failed calls are
+            retried and how long to wait. Defaults to RetryPolicy()
+
+            `throttles`: ThrottleRegistry rate limiting requests per endpoint
+            family. Share one registry between connections to enforce limits
+            process wide. None disables client side throttling
+
+            `timeouts`: TimeoutPolicy giving connect and read timeouts per
+            call type. Defaults to TimeoutPolicy()
+
+            `hooks`: EventBus receiving before_request, after_response,
+            on_retry and on_error events for every request attempt
+
+            `transport`: "requests" for pooled HTTP/1.1 connections, "http2"
+            to multiplex requests over HTTP/2 (needs httpx, see
+            qds_sdk.http2), or any object with requests.Session style
+            get/post/put/delete methods
+        """
         self.auth = auth
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.throttles = throttles
+        self.timeouts = timeouts or TimeoutPolicy()
+        self.hooks = hooks
         self.rest_url = rest_url
         self.skip_ssl_cert_check = skip_ssl_cert_check
         self._headers = {'User-Agent': 'qds-sdk-py-%s' % pkg_resources.get_distribution("qds-sdk").version,
                          'Content-Type': 'application/json'}
 
         self.reuse = reuse
-        if reuse:
+        if transport == "http2":
+            from qds_sdk.http2 import Http2Session
+            self.session = Http2Session(pool_maxsize=pool_maxsize, verify=not skip_ssl_cert_check)
+            self.reuse = True
+        elif transport != "requests":
+            if not all(hasattr(transport, verb) for verb in ('get', 'post', 'put', 'delete')):
+                raise ConfigError("transport should be 'requests', 'http2' or a session object")
+            self.session = transport
+            self.reuse = True
+        elif reuse:
             self.session = requests.Session()
-            self.session.mount('https://', MyAdapter())
+            self.session.mount('https://', MyAdapter(pool_connections=pool_connections,
+                                                     pool_maxsize=pool_maxsize,
+                                                     pool_block=pool_block))
+            self.session.mount('http://', HTTPAdapter(pool_connections=pool_connections,
+                                                      pool_maxsize=pool_maxsize,
+                                                      pool_block=pool_block))
 
-    @retry((RetryWithDelay, requests.Timeout), tries=6, delay=30, backoff=2)
     def get_raw(self, path, params=None):
         return self._api_call_raw("GET", path, params=params)
 
-    @retry((RetryWithDelay, requests.Timeout), tries=6, delay=30, backoff=2)
     def get(self, path, params=None):
         return self._api_call("GET", path, params=params)
 
+    def get_stream(self, path, params=None, key=None):
+        """
+        Streaming variant of get for list-shaped responses. The body is
+        decompressed and parsed incrementally, so memory use does not grow
+        with the size of the list.
+
+        Args:
+            `key`: for responses wrapping the list in an object, the key
+            holding it, e.g. "clusters"
+
+        Returns:
+            An iterator over the elements of the list
+        """
+        r = self._api_call_raw("GET", path, params=params, stream=True)
+        return self._iter_items(r, key)
+
+    def get_streamed_object(self, path, params=None, sinks=None):
+        """
+        Streaming variant of get for object responses with large string
+        values, such as inline command results.
+
+        Args:
+            `sinks`: dictionary from key to a callable receiving the string
+            value of that key in slices as it is decoded
+
+        Returns:
+            Dictionary with the remaining keys of the response
+        """
+        r = self._api_call_raw("GET", path, params=params, stream=True)
+        try:
+            return JsonStreamReader.from_response(r).read_object(sinks or {})
+        finally:
+            r.close()
+
+    @staticmethod
+    def _iter_items(response, key):
+        try:
+            for item in JsonStreamReader.from_response(response).items(key):
+                yield item
+        finally:
+            response.close()
+
     def put(self, path, data=None):
         return self._api_call("PUT", path, data)
 
@@ -60,7 +161,20 @@ class Connection:
     def delete(self, path, data=None):
         return self._api_call("DELETE", path, data)
 
-    def _api_call_raw(self, req_type, path, data=None, params=None):
+    def _api_call_raw(self, req_type, path, data=None, params=None, stream=False):
+        on_retry = None
+        if self._instrumented():
+            def on_retry(error, attempt, delay):
+                event = RequestEvent(req_type, path, attempt)
+                event.error, event.delay = error, delay
+                self.hooks.emit(ON_RETRY, event)
+        return self.retry_policy.call(req_type, self._request, req_type, path,
+                                      data=data, params=params, stream=stream, on_retry=on_retry)
+
+    def _instrumented(self):
+        return self.hooks is not None and self.hooks.enabled()
+
+    def _request(self, req_type, path, data=None, params=None, stream=False):
         url = self.rest_url.rstrip('/') + '/' + path
 
         if self.reuse:
@@ -70,33 +184,77 @@ class Connection:
 
         kwargs = {'headers': self._headers, 'auth': self.auth, 'verify': not self.skip_ssl_cert_check}
 
+        # Serialize the body exactly once; the log lines below reuse it and
+        # are formatted lazily so nothing is rendered when INFO is disabled.
+        body = None
         if data:
-            kwargs['data'] = json.dumps(data)
+            body = json.dumps(data)
+            kwargs['data'] = body
         if params:
             kwargs['params'] = params
+        if stream:
+            kwargs['stream'] = True
+            kwargs['headers'] = dict(self._headers, **{'Accept-Encoding': 'gzip, deflate'})
+
+        if log.isEnabledFor(logging.INFO):
+            log.info("[%s] %s", req_type, url)
+            log.info("Payload: %s", body)
+            log.info("Params: %s", params)
+
+        call_type = self.timeouts.call_type(req_type, path)
+        kwargs['timeout'] = self.timeouts.timeout(call_type)
+
+        event = None
+        if self._instrumented():
+            event = RequestEvent(req_type, path)
+            self.hooks.emit(BEFORE_REQUEST, event)
+
+        try:
+            throttle = self.throttles.for_path(path) if self.throttles is not None else None
+            if throttle is not None:
+                with throttle:
+                    r, duration = self._send(x, req_type, url, call_type, kwargs)
+            else:
+                r, duration = self._send(x, req_type, url, call_type, kwargs)
 
-        log.info("[%s] %s" % (req_type, url))
-        log.info("Payload: %s" % json.dumps(data, indent=4))
-        log.info("Params: %s" % params)
+            if event is not None:
+                event.status, event.duration = r.status_code, duration
+                if stream:
+                    length = r.headers.get('Content-Length')
+                    event.bytes = int(length) if length is not None else None
+                else:
+                    event.bytes = len(r.content)
+                self.hooks.emit(AFTER_RESPONSE, event)
 
+            self._handle_error(r)
+        except Exception as e:
+            if event is not None:
+                event.error = e
+                self.hooks.emit(ON_ERROR, event)
+            raise
+        return r
+
+    def _send(self, x, req_type, url, call_type, kwargs):
+        start = time.time()
         if req_type == 'GET':
-            r = x.get(url, timeout=300, **kwargs)
+            r = x.get(url, **kwargs)
         elif req_type == 'POST':
-            r = x.post(url, timeout=300, **kwargs)
+            r = x.post(url, **kwargs)
         elif req_type == 'PUT':
-            r = x.put(url, timeout=300, **kwargs)
+            r = x.put(url, **kwargs)
         elif req_type == 'DELETE':
-            r = x.delete(url, timeout=300, **kwargs)
+            r = x.delete(url, **kwargs)
         else:
             raise NotImplemented
-
-        self._handle_error(r)
-        return r
+        duration = time.time() - start
+        self.timeouts.observe(call_type, duration)
+        return r, duration
 
     def _api_call(self, req_type, path, data=None, params=None):
         return self._api_call_raw(req_type, path, data=data, params=params).json()
 
-    def _handle_error(self, response):
+    @staticmethod
+    def _handle_error(response):
         """Raise exceptions in response to any http errors
 
         Args:
@@ -0,0 +1,233 @@
+"""
+Client-side runner for graphs of dependent QDS commands.
+
+CompositeCommand runs its sub commands one after the other on QDS.
+CommandDag instead submits each command as soon as the commands it depends
+on succeeded, so independent branches run in parallel, while capping how
+many commands run at once on each cluster label:
+
+    dag = CommandDag(concurrency={"etl": 2}, checkpoint="nightly.json")
+    dag.add("extract", HiveCommand, query="insert overwrite table raw ...")
+    dag.add("clean", SparkCommand, depends_on=["extract"], program=...)
+    dag.add("stats", HiveCommand, depends_on=["extract"], label="etl",
+            query=lambda upstream: "... -- extract %s" % upstream["extract"].id)
+    dag.add("publish", ShellCommand, depends_on=["clean", "stats"], inline=...)
+    for name, cmd in dag.iter_run():
+        print(name, cmd.status)
+
+A keyword argument given as a callable is evaluated right before its
+command is created, with a dictionary of the completed upstream Command
+objects by node name, so a stage can be built from what the previous
+stages produced (their ids, or results fetched with get_results).
+
+Nodes depending on a command that failed or was cancelled are skipped;
+the other branches carry on. With a checkpoint file, the id and status of
+every command is saved as the graph progresses. Running the graph again
+after a crash reuses the commands that succeeded, waits for the ones that
+were still running and reruns the failed ones. Delete the file to start
+over.
+"""
+import json
+import logging
+import os
+import time
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from qds_sdk.commands import Command
+from qds_sdk.watcher import CommandWatcher
+
+log = logging.getLogger("qds_dag")
+
+
+class DagNode(object):
+
+    def __init__(self, name, command_class, depends_on, kwargs):
+        self.name = name
+        self.command_class = command_class
+        self.depends_on = list(depends_on)
+        self.kwargs = kwargs
+
+    def resolve(self, upstream):
+        """
+        Returns:
+            The create() keyword arguments of the node, with callables
+            evaluated against the `upstream` commands
+        """
+        deps = dict((name, upstream[name]) for name in self.depends_on)
+        return dict((key, value(deps) if callable(value) else value)
+                    for key, value in self.kwargs.items())
+
+
+class CommandDag(object):
+
+    def __init__(self, concurrency=None, default_concurrency=4, checkpoint=None,
+                 poll_strategy=None, poll_concurrency=8):
+        """
+        Args:
+            `concurrency`: dictionary of the maximum number of commands
+            running at once by cluster label
+
+            `default_concurrency`: limit for labels missing from
+            `concurrency`. Commands without a label count against the
+            "default" label
+
+            `checkpoint`: path of a JSON file recording the progress of the
+            graph, from which a later run resumes
+
+            `poll_strategy`: a qds_sdk.polling strategy scheduling the polls
+            of each command. Defaults to the configured one
+
+            `poll_concurrency`: maximum number of status requests in flight
+        """
+        self.nodes = OrderedDict()
+        self.concurrency = concurrency or {}
+        self.default_concurrency = default_concurrency
+        self.checkpoint = checkpoint
+        self.poll_strategy = poll_strategy
+        self.poll_concurrency = poll_concurrency
+        self.skipped = []
+        self.sleep = time.sleep
+
+    def add(self, name, command_class, depends_on=(), **kwargs):
+        """
+        Add a node running a command of `command_class` created from
+        `kwargs` once the nodes named in `depends_on` succeeded. Nodes must
+        be added after the nodes they depend on, which keeps the graph
+        acyclic.
+
+        Returns:
+            `name`
+        """
+        if name in self.nodes:
+            raise ValueError("duplicate node %s" % name)
+        if not issubclass(command_class, Command):
+            raise ValueError("%s is not a Command class" % command_class)
+        for dep in depends_on:
+            if dep not in self.nodes:
+                raise ValueError("node %s depends on unknown node %s" % (name, dep))
+        self.nodes[name] = DagNode(name, command_class, depends_on, kwargs)
+        return name
+
+    def run(self):
+        """
+        Run the graph until every node completed or was skipped.
+
+        Returns:
+            An OrderedDict of the completed Command objects by node name.
+            Skipped nodes are listed in `skipped`
+        """
+        return OrderedDict(self.iter_run())
+
+    def iter_run(self):
+        """
+        Run the graph, yielding (node name, Command object) pairs as
+        commands complete. Nodes completed by an earlier run are yielded
+        first.
+        """
+        self.skipped = []
+        state = self._load_checkpoint()
+        completed = {}
+        running = {}
+        active = {}
+        watcher = CommandWatcher(concurrency=self.poll_concurrency,
+                                 poll_strategy=self.poll_strategy)
+        try:
+            for name, node in self.nodes.items():
+                entry = state.get(name)
+                if entry is None:
+                    continue
+                if Command.is_success(entry["status"]):
+                    cmd = node.command_class.find(entry["id"])
+                    completed[name] = cmd
+                    yield name, cmd
+                elif not Command.is_done(entry["status"]):
+                    log.info("Resuming node %s, command %s" % (name, entry["id"]))
+                    running[entry["id"]] = name
+                    self._acquire(active, entry.get("label"))
+                    watcher.add(node.command_class({"id": entry["id"], "status": entry["status"]}))
+                else:
+                    del state[name]
+
+            while True:
+                self._start_ready(state, completed, running, active, watcher)
+                if not running:
+                    break
+                done = watcher.poll_once()
+                for cmd in done:
+                    name = running.pop(cmd.id)
+                    self._release(active, state[name].get("label"))
+                    completed[name] = cmd
+                    state[name]["status"] = cmd.status
+                    self._save_checkpoint(state)
+                    if not Command.is_success(cmd.status):
+                        log.warning("Node %s, command %s ended with status %s"
+                                    % (name, cmd.id, cmd.status))
+                    yield name, cmd
+                if not done:
+                    delay = watcher.next_due() - watcher.clock()
+                    if delay > 0:
+                        self.sleep(delay)
+        finally:
+            watcher.close()
+
+    def _start_ready(self, state, completed, running, active, watcher):
+        started = set(state)
+        for name, node in self.nodes.items():
+            if name in started or name in self.skipped:
+                continue
+            deps = [completed.get(dep) for dep in node.depends_on]
+            if any(dep in self.skipped or (dep in completed and not Command.is_success(
+                    completed[dep].status)) for dep in node.depends_on):
+                log.warning("Skipping node %s, a node it depends on failed" % name)
+                self.skipped.append(name)
+                continue
+            if any(cmd is None for cmd in deps):
+                continue
+            label = node.kwargs.get("label")
+            if callable(label):
+                label = label(dict(zip(node.depends_on, deps)))
+            if not self._available(active, label):
+                continue
+            kwargs = node.resolve(completed)
+            if label is not None:
+                kwargs["label"] = label
+            cmd = node.command_class.create(**kwargs)
+            log.info("Started node %s, command %s" % (name, cmd.id))
+            state[name] = {"id": cmd.id, "status": cmd.status, "label": label}
+            self._save_checkpoint(state)
+            self._acquire(active, label)
+            running[cmd.id] = name
+            watcher.add(cmd)
+
+    def _available(self, active, label):
+        label = label or "default"
+        return active.get(label, 0) < self.concurrency.get(label, self.default_concurrency)
+
+    def _acquire(self, active, label):
+        label = label or "default"
+        active[label] = active.get(label, 0) + 1
+
+    def _release(self, active, label):
+        label = label or "default"
+        active[label] -= 1
+
+    def _load_checkpoint(self):
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return {}
+        with open(self.checkpoint) as f:
+            nodes = json.load(f)["nodes"]
+        return dict((name, entry) for name, entry in nodes.items() if name in self.nodes)
+
+    def _save_checkpoint(self, state):
+        if self.checkpoint is None:
+            return
+        # Written aside and renamed so a crash never leaves a truncated file
+        tmp = "%s.tmp" % self.checkpoint
+        with open(tmp, "w") as f:
+            json.dump({"nodes": state}, f, indent=2, sort_keys=True)
+        if os.name == "nt" and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        os.rename(tmp, self.checkpoint)
@@ -0,0 +1,212 @@
+"""
+concurrent.futures style submission of QDS commands.
+
+    with CommandExecutor() as executor:
+        futures = [executor.submit(HiveCommand, query=q) for q in queries]
+        for future in concurrent.futures.as_completed(futures):
+            cmd = future.result()
+
+Commands are created by a small pool of submitter threads and then tracked
+by a single poller thread driving a CommandWatcher, however many commands
+are in flight. A future resolves to the Command object in its final state,
+whether it succeeded or not, the same as Command.run returns it. It fails
+with the exception raised while creating the command. Polling errors are
+logged and polling is retried. Use Future.add_done_callback to be notified
+of completions.
+"""
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+
+from qds_sdk import inflight
+from qds_sdk.qubole import Qubole
+from qds_sdk.watcher import CommandWatcher
+
+log = logging.getLogger("qds_executor")
+
+
+class CommandFuture(Future):
+    """
+    Future of a QDS command. It stays pending while the command runs on
+    QDS, so cancel() succeeds until the command completed: it kills the
+    command through Command.cancel_id and marks the future cancelled.
+    """
+
+    def __init__(self, command_class, config):
+        Future.__init__(self)
+        self.command_class = command_class
+        self.command_id = None
+        self._config = config
+        self._cancel_lock = threading.Lock()
+
+    def cancel(self):
+        with self._cancel_lock:
+            if self.done():
+                return self.cancelled()
+            if self.command_id is not None:
+                try:
+                    with self._config.activate():
+                        self.command_class.cancel_id(self.command_id)
+                except Exception:
+                    log.exception("Failed to cancel command %s" % self.command_id)
+                    return False
+            return Future.cancel(self)
+
+    def _started(self, command_id):
+        # Returns False if the future was cancelled before the command was
+        # created; the caller then kills the command
+        with self._cancel_lock:
+            if self.cancelled():
+                return False
+            self.command_id = command_id
+            return True
+
+    def _resolve(self, command=None, exception=None):
+        if not self.set_running_or_notify_cancel():
+            return
+        if exception is not None:
+            self.set_exception(exception)
+        else:
+            self.set_result(command)
+
+
+class CommandExecutor(object):
+
+    def __init__(self, max_submitters=4, concurrency=8, poll_strategy=None):
+        """
+        Args:
+            `max_submitters`: threads creating commands concurrently
+
+            `concurrency`: maximum number of status requests in flight
+
+            `poll_strategy`: a qds_sdk.polling strategy scheduling the polls
+            of each command. Defaults to the configured one
+        """
+        # Commands are created and polled with the configuration active in
+        # the thread creating the executor
+        self.config = Qubole.current()
+        self.submitter = ThreadPoolExecutor(max_submitters)
+        self.watcher = CommandWatcher(concurrency=concurrency, poll_strategy=poll_strategy)
+        self.futures = set()
+        self.by_id = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.poller = threading.Thread(target=self._poll_loop, name="qds-command-poller")
+        self.poller.daemon = True
+        self.poller.start()
+
+    def submit(self, command_class, **kwargs):
+        """
+        Create a command of `command_class` from `kwargs`, as
+        command_class.run(**kwargs) would, without waiting for it
+
+        Returns:
+            A CommandFuture resolving to the completed Command object
+        """
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("cannot submit commands after shutdown")
+            future = CommandFuture(command_class, self.config)
+            self.futures.add(future)
+        self.submitter.submit(self._create, future, kwargs)
+        return future
+
+    def shutdown(self, wait=True, cancel_commands=False):
+        """
+        Stop accepting commands.
+
+        Args:
+            `wait`: block until every submitted command completed
+
+            `cancel_commands`: cancel the commands still running
+        """
+        with self.lock:
+            self.closed = True
+            futures = list(self.futures)
+        if cancel_commands:
+            for future in futures:
+                future.cancel()
+        self.submitter.shutdown(wait)
+        self.wakeup.set()
+        if wait:
+            self.poller.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+        return False
+
+    def _create(self, future, kwargs):
+        kwargs = dict(kwargs)
+        kwargs.pop("print_logs_live", None)
+        kwargs.pop("poll_strategy", None)
+        kwargs.pop("reuse", None)
+        kwargs.pop("notifier", None)
+        try:
+            with self.config.activate():
+                command = future.command_class.create(**kwargs)
+        except Exception as e:
+            self._finish(future, exception=e)
+            return
+        if not future._started(command.id):
+            try:
+                with self.config.activate():
+                    future.command_class.cancel_id(command.id)
+            except Exception:
+                log.exception("Failed to cancel command %s" % command.id)
+            self._finish(future)
+            return
+        with self.lock:
+            self.by_id[command.id] = future
+        inflight.registry.add(future.command_class, command.id, self.config)
+        self.watcher.add(command)
+        self.wakeup.set()
+
+    def _finish(self, future, command=None, exception=None):
+        with self.lock:
+            self.futures.discard(future)
+            if future.command_id is not None:
+                self.by_id.pop(future.command_id, None)
+                inflight.registry.discard(future.command_id)
+        future._resolve(command, exception)
+        self.wakeup.set()
+
+    def _poll_loop(self):
+        try:
+            self._poll_until_closed()
+        finally:
+            self.watcher.close()
+
+    def _poll_until_closed(self):
+        while True:
+            # Cleared before polling: commands added while a poll round is
+            # in flight set the event again and are picked up right away
+            self.wakeup.clear()
+            try:
+                # Futures are resolved as the round goes, so a failing
+                # status request does not hold back the commands completed
+                # in the same round
+                for command in self.watcher._poll():
+                    with self.lock:
+                        future = self.by_id.get(command.id)
+                    if future is not None:
+                        self._finish(future, command)
+            except Exception:
+                log.exception("Polling commands failed, retrying")
+                self.wakeup.wait(self.config.poll_interval)
+                continue
+
+            with self.lock:
+                if self.closed and not self.futures:
+                    return
+            due = self.watcher.next_due()
+            if due is None:
+                self.wakeup.wait()
+            else:
+                delay = due - self.watcher.clock()
+                if delay > 0:
+                    self.wakeup.wait(delay)
@@ -0,0 +1,170 @@
+"""
+Export of command results to CSV, Arrow and Parquet.
+
+Command.get_results(fp, format=...) streams the result rows through
+Command.iter_results and writes them to `fp` in batches, so results never
+have to be held in memory or re-parsed from a TSV download:
+
+    with open("result.parquet", "wb") as fp:
+        cmd.get_results(fp, format="parquet", qlog=cmd.qlog)
+
+The column names and Hive types come from the QBOL-QUERY-SCHEMA entry of
+the command's qlog. Arrow and Parquet columns are typed accordingly, the
+\\N null marker of Hive is written as null, and each batch of rows becomes
+one record batch or row group. Without a schema the columns are strings
+named _c0, _c1, ...
+
+Arrow and Parquet output needs the pyarrow package
+(pip install qds_sdk[arrow]). "arrow" writes the Arrow IPC stream format.
+"""
+import csv
+import io
+import json
+import re
+import sys
+
+from qds_sdk.exception import ConfigError
+
+FORMATS = ("csv", "arrow", "parquet")
+
+HIVE_NULL = u"\\N"
+
+_DECIMAL_RE = re.compile(r'decimal\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)')
+
+
+def parse_schema(qlog):
+    """
+    Returns:
+        List of (column name, Hive type) pairs of the result schema in
+        `qlog`, a JSON string, or None if it has no schema
+    """
+    schema = json.loads(qlog).get("QBOL-QUERY-SCHEMA")
+    if not schema:
+        return None
+    columns = schema.get("-1")
+    if columns is None:
+        columns = schema[sorted(schema)[0]]
+    return [(item["ColumnName"], (item.get("ColumnType") or "string").lower()) for item in columns]
+
+
+def arrow_type(pa, hive_type):
+    """
+    Returns:
+        The pyarrow type holding values of `hive_type`. Complex types are
+        kept as their string representation
+    """
+    simple = {
+        "tinyint": pa.int8(),
+        "smallint": pa.int16(),
+        "int": pa.int32(),
+        "integer": pa.int32(),
+        "bigint": pa.int64(),
+        "float": pa.float32(),
+        "double": pa.float64(),
+        "boolean": pa.bool_(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("ns"),
+    }
+    if hive_type in simple:
+        return simple[hive_type]
+    m = _DECIMAL_RE.match(hive_type)
+    if m:
+        return pa.decimal128(int(m.group(1)), int(m.group(2)))
+    if hive_type == "decimal":
+        return pa.decimal128(10, 0)
+    return pa.string()
+
+
+def write_results(command, fp, format, qlog=None, batch_size=65536):
+    """
+    Write the result of `command` to `fp` in `format`, one of FORMATS.
+    Arrow and Parquet need a binary file object.
+
+    Args:
+        `qlog`: the qlog of the command, holding the result schema
+
+        `batch_size`: rows per record batch or row group
+    """
+    if format not in FORMATS:
+        raise ValueError("format should be one of %s" % ", ".join(FORMATS))
+    schema = parse_schema(qlog) if qlog is not None else None
+    batches = command.iter_results(batch_size=batch_size)
+    if format == "csv":
+        _write_csv(batches, fp, schema)
+    else:
+        _write_arrow(batches, fp, schema, format)
+
+
+def _write_csv(batches, fp, schema):
+    if sys.version_info < (3, 0, 0):
+        writer = csv.writer(fp)
+
+        def write(row):
+            writer.writerow([value.encode('utf8') for value in row])
+    else:
+        out = fp
+        if isinstance(fp, (io.BufferedIOBase, io.RawIOBase)):
+            out = io.TextIOWrapper(fp, encoding='utf8', newline='')
+        writer = csv.writer(out)
+        write = writer.writerow
+
+    if schema is not None:
+        write([name for name, hive_type in schema])
+    for batch in batches:
+        for row in batch:
+            write(row)
+
+    if sys.version_info >= (3, 0, 0) and out is not fp:
+        out.flush()
+        out.detach()
+
+
+def _import_pyarrow(format):
+    try:
+        import pyarrow
+        if format == "parquet":
+            import pyarrow.parquet
+    except ImportError:
+        raise ConfigError("%s output requires the pyarrow package: pip install pyarrow" % format)
+    return pyarrow
+
+
+def _write_arrow(batches, fp, schema, format):
+    pa = _import_pyarrow(format)
+    writer = None
+    arrow_schema = None
+    try:
+        for batch in batches:
+            if arrow_schema is None:
+                if schema is None:
+                    schema = [("_c%d" % i, "string") for i in range(len(batch[0]))]
+                arrow_schema = pa.schema([(name, arrow_type(pa, hive_type)) for name, hive_type in schema])
+                if format == "parquet":
+                    writer = pa.parquet.ParquetWriter(fp, arrow_schema)
+                else:
+                    writer = pa.ipc.new_stream(fp, arrow_schema)
+            writer.write_table(_to_table(pa, batch, arrow_schema))
+        if writer is None:
+            # No rows: still write a valid, empty file
+            arrow_schema = pa.schema([(name, arrow_type(pa, hive_type))
+                                      for name, hive_type in schema or []])
+            if format == "parquet":
+                writer = pa.parquet.ParquetWriter(fp, arrow_schema)
+            else:
+                writer = pa.ipc.new_stream(fp, arrow_schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _to_table(pa, rows, arrow_schema):
+    columns = []
+    for i, field in enumerate(arrow_schema):
+        values = [row[i] if i < len(row) and row[i] != HIVE_NULL else None for row in rows]
+        column = pa.array(values, type=pa.string())
+        if not pa.types.is_string(field.type):
+            # Arrow parses numbers, booleans, dates and timestamps from
+            # their text form in one vectorized pass
+            column = column.cast(field.type)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=arrow_schema)
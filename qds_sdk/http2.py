@@ -0,0 +1,128 @@
+"""
+HTTP/2 transport for the QDS REST API.
+
+Http2Session stands in for the requests.Session used by Connection, but
+sends requests through an httpx client with HTTP/2 enabled. Concurrent
+calls from many threads, such as status polls for hundreds of commands,
+are multiplexed as streams over a few connections instead of each taking
+a pooled HTTP/1.1 connection of its own.
+
+Select it with Qubole.configure(transport="http2"). It needs the optional
+httpx package with HTTP/2 support (pip install qds_sdk[http2]); nothing
+else in qds_sdk imports this module eagerly.
+"""
+import json
+import requests
+
+from qds_sdk.exception import ConfigError
+
+
+class Http2Response(object):
+    """
+    Exposes the parts of requests.Response used by Connection, the
+    streaming decoder and the qds_sdk exceptions on top of an httpx
+    response.
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def content(self):
+        return self._response.content
+
+    @property
+    def text(self):
+        return self._response.text
+
+    @property
+    def encoding(self):
+        return self._response.encoding
+
+    @property
+    def http_version(self):
+        return self._response.http_version
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+
+class _Request(object):
+    # Lets requests auth objects such as QuboleAuth add their headers
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class Http2Session(object):
+
+    def __init__(self, pool_maxsize=10, verify=True, prior_knowledge=False):
+        """
+        Args:
+            `pool_maxsize`: maximum number of connections per host. With
+            HTTP/2 each connection carries many concurrent requests
+
+            `verify`: verify the server SSL certificate
+
+            `prior_knowledge`: speak HTTP/2 without negotiating it first.
+            Needed for cleartext http:// servers, e.g. local stubs
+        """
+        try:
+            import httpx
+        except ImportError:
+            raise ConfigError("The http2 transport requires the httpx package with "
+                              "HTTP/2 support: pip install httpx[http2]")
+        self._httpx = httpx
+        limits = httpx.Limits(max_connections=pool_maxsize,
+                              max_keepalive_connections=pool_maxsize)
+        self.client = httpx.Client(http1=not prior_knowledge, http2=True,
+                                   verify=verify, limits=limits)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def request(self, method, url, headers=None, auth=None, verify=None, data=None,
+                params=None, stream=False, timeout=None):
+        """
+        Send a request taking the keyword arguments of requests.Session.
+        Certificate verification is fixed when the session is created, so
+        `verify` is ignored here. httpx errors are raised as the equivalent
+        requests exceptions, which is what RetryPolicy and callers expect.
+        """
+        httpx = self._httpx
+        headers = dict(headers or {})
+        if auth is not None:
+            auth(_Request(headers))
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+
+        request = self.client.build_request(method, url, headers=headers, content=data,
+                                            params=params, timeout=timeout)
+        try:
+            response = self.client.send(request, stream=stream)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e))
+        return Http2Response(response)
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,195 @@
+"""
+Cancellation of QDS commands left running by a process that stops.
+
+A command keeps running on QDS when the process waiting for it dies, using
+cluster capacity for a result nobody collects. Commands being waited on by
+Command.run, and commands submitted through a CommandExecutor, are recorded
+in a process-wide registry while they are in flight. The registry cancels
+them all in parallel with a deadline:
+
+    from qds_sdk import inflight
+    inflight.install_signal_handlers()      # on SIGTERM, cancel then exit
+    inflight.registry.cancel_all(timeout=10)
+
+Command.tracked() scopes this to a block of code. Commands created in the
+block by the current thread, with create as well as run, are registered
+until the block ends, and cancelled if it ends with an exception:
+
+    with Command.tracked():
+        cmd = HiveCommand.create(query=...)
+        ...
+"""
+import collections
+import logging
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from qds_sdk.qubole import Qubole
+
+log = logging.getLogger("qds_inflight")
+
+
+class InFlightRegistry(object):
+
+    def __init__(self):
+        self.entries = {}
+        # Reentrant so a signal handler interrupting the main thread while
+        # it holds the lock can still take a snapshot
+        self.lock = threading.RLock()
+        self.clock = time.time
+
+    def add(self, command_class, id, config=None):
+        """
+        Record the command `id` of `command_class` as in flight. It is
+        cancelled with `config`, which defaults to the configuration active
+        in the calling thread.
+        """
+        with self.lock:
+            self.entries[id] = (command_class, config or Qubole.current())
+
+    def discard(self, id):
+        with self.lock:
+            self.entries.pop(id, None)
+
+    def ids(self):
+        with self.lock:
+            return list(self.entries)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def cancel_all(self, timeout=30, concurrency=16):
+        """
+        Cancel every registered command through Command.cancel_id,
+        `concurrency` at a time, waiting at most `timeout` seconds. Requests
+        still in flight at the deadline are abandoned.
+
+        Returns:
+            List of the ids of the commands that were cancelled
+        """
+        with self.lock:
+            pending = collections.deque((id, command_class, config) for id, (command_class, config)
+                                        in self.entries.items())
+        if not pending:
+            return []
+        cancelled = []
+
+        def cancel():
+            while True:
+                try:
+                    id, command_class, config = pending.popleft()
+                except IndexError:
+                    return
+                try:
+                    with config.activate():
+                        command_class.cancel_id(id)
+                except Exception as e:
+                    log.warning("Failed to cancel command %s: %s" % (id, e))
+                    continue
+                cancelled.append(id)
+                self.discard(id)
+
+        threads = []
+        for i in range(min(concurrency, len(pending))):
+            thread = threading.Thread(target=cancel, name="qds-cancel-%d" % i)
+            # Daemon threads, so requests outliving the deadline do not keep
+            # the process alive
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        deadline = self.clock() + timeout
+        for thread in threads:
+            thread.join(max(0, deadline - self.clock()))
+        if any(thread.is_alive() for thread in threads):
+            log.warning("Cancellation of in-flight commands did not complete within %s seconds"
+                        % timeout)
+        log.info("Cancelled %d in-flight commands" % len(cancelled))
+        return list(cancelled)
+
+
+# Commands in flight in this process
+registry = InFlightRegistry()
+
+_local = threading.local()
+
+
+def _scopes():
+    if not hasattr(_local, "scopes"):
+        _local.scopes = []
+    return _local.scopes
+
+
+def track(command):
+    """
+    Register `command`, just created by the calling thread, with the
+    tracked() blocks it is running in
+    """
+    scopes = _scopes()
+    if not scopes or command.is_done(command.attributes.get("status")):
+        return
+    config = Qubole.current()
+    registry.add(command.__class__, command.id, config)
+    for scope in scopes:
+        scope.add(command.__class__, command.id, config)
+
+
+@contextmanager
+def tracked(timeout=30):
+    """
+    Context manager registering the commands created by the current thread
+    inside the block. If the block raises, including KeyboardInterrupt and
+    SystemExit, the commands are cancelled before the exception propagates.
+
+    Args:
+        `timeout`: seconds to wait for the cancellations
+
+    Yields:
+        The InFlightRegistry of the block
+    """
+    scope = InFlightRegistry()
+    scopes = _scopes()
+    scopes.append(scope)
+    try:
+        yield scope
+    except BaseException:
+        for id in scope.cancel_all(timeout):
+            registry.discard(id)
+        raise
+    finally:
+        scopes.remove(scope)
+        for id in scope.ids():
+            registry.discard(id)
+
+
+def install_signal_handlers(signals=None, timeout=30):
+    """
+    Install handlers cancelling the commands of the registry when the
+    process receives one of `signals`, SIGTERM by default. Once the
+    cancellations are done, or `timeout` seconds have passed, the handler
+    that was previously installed runs. If there was none, SystemExit is
+    raised so the process exits with status 128 + signal number.
+
+    Signal handlers can only be installed from the main thread.
+
+    Returns:
+        Dictionary of the previous handlers by signal number
+    """
+    if signals is None:
+        signals = [signal.SIGTERM]
+    previous = {}
+
+    def handler(signum, frame):
+        log.warning("Received signal %d, cancelling %d in-flight commands" % (signum, len(registry)))
+        registry.cancel_all(timeout)
+        chained = previous.get(signum)
+        if callable(chained):
+            chained(signum, frame)
+        elif chained != signal.SIG_IGN:
+            raise SystemExit(128 + signum)
+
+    for signum in signals:
+        previous[signum] = signal.signal(signum, handler)
+    return previous
@@ -0,0 +1,208 @@
+"""
+Request instrumentation for the QDS REST API.
+
+Every Connection publishes events on an EventBus (Qubole.hooks by default):
+
+    before_request  a request attempt is about to be sent
+    after_response  a response was received, whatever its status
+    on_retry        a failed attempt will be retried after `delay` seconds
+    on_error        an attempt failed with an exception
+
+Handlers receive a RequestEvent. LatencyStats is a ready-made subscriber
+keeping a latency histogram per endpoint, e.g.
+
+    stats = LatencyStats()
+    stats.attach(Qubole.hooks)
+    ...
+    print(stats.report())
+"""
+import re
+import logging
+import threading
+
+log = logging.getLogger("qds_instrumentation")
+
+BEFORE_REQUEST = "before_request"
+AFTER_RESPONSE = "after_response"
+ON_RETRY = "on_retry"
+ON_ERROR = "on_error"
+
+_ID_SEGMENT = re.compile(r'^\d+$')
+
+
+def path_template(path):
+    """
+    Returns:
+        `path` with query string dropped and ids replaced by :id, so calls
+        to the same endpoint group together: commands/123/logs ->
+        commands/:id/logs. Cluster labels count as ids.
+    """
+    segments = path.split('?', 1)[0].strip('/').split('/')
+    for i, segment in enumerate(segments):
+        if _ID_SEGMENT.match(segment) or (i == 1 and segments[0] == "clusters"):
+            segments[i] = ":id"
+    return "/".join(segments)
+
+
+class RequestEvent(object):
+    """
+    Describes one request attempt. Fields not known at the time of the
+    event are None.
+    """
+
+    def __init__(self, method, path, attempt=1):
+        self.method = method
+        self.path = path
+        self.path_template = path_template(path)
+        self.attempt = attempt
+        self.status = None
+        self.bytes = None
+        self.duration = None
+        self.error = None
+        self.delay = None
+
+    @property
+    def endpoint(self):
+        return "%s %s" % (self.method, self.path_template)
+
+
+class EventBus(object):
+
+    EVENTS = (BEFORE_REQUEST, AFTER_RESPONSE, ON_RETRY, ON_ERROR)
+
+    def __init__(self):
+        self.handlers = dict((event, []) for event in self.EVENTS)
+        self.lock = threading.Lock()
+
+    def on(self, event, handler):
+        """
+        Subscribe `handler` to `event`
+        """
+        if event not in self.handlers:
+            raise ValueError("event should be one of %s" % ", ".join(self.EVENTS))
+        with self.lock:
+            self.handlers[event] = self.handlers[event] + [handler]
+
+    def off(self, event, handler):
+        """
+        Unsubscribe `handler` from `event`
+        """
+        with self.lock:
+            self.handlers[event] = [h for h in self.handlers[event] if h != handler]
+
+    def enabled(self):
+        """
+        Returns:
+            True if any handler is subscribed
+        """
+        return any(self.handlers.values())
+
+    def emit(self, event, payload):
+        # Handlers must never break the request they observe
+        for handler in self.handlers[event]:
+            try:
+                handler(payload)
+            except Exception:
+                log.exception("%s handler failed" % event)
+
+
+class LatencyHistogram(object):
+    """
+    Histogram over exponentially growing buckets: 1ms, 2ms, 4ms, ... ~17min.
+    Percentiles are accurate to within a factor of two and cost constant
+    memory however many samples are recorded.
+    """
+
+    BOUNDS = [0.001 * 2 ** i for i in range(21)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = 0
+        while index < len(self.BOUNDS) and seconds > self.BOUNDS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct):
+        """
+        Returns:
+            Upper bound of the bucket holding the `pct` percentile, capped
+            at the largest sample, or None if nothing was recorded
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, int(round(self.count * pct / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = self.BOUNDS[index] if index < len(self.BOUNDS) else self.max
+                return min(bound, self.max)
+
+
+class LatencyStats(object):
+    """
+    Collects a LatencyHistogram, request and error counts and bytes received
+    per endpoint ("METHOD path/template").
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.errors = {}
+        self.retries = {}
+        self.bytes = {}
+        self.lock = threading.Lock()
+
+    def attach(self, bus):
+        bus.on(AFTER_RESPONSE, self.on_response)
+        bus.on(ON_ERROR, self.on_error)
+        bus.on(ON_RETRY, self.on_retry)
+
+    def detach(self, bus):
+        bus.off(AFTER_RESPONSE, self.on_response)
+        bus.off(ON_ERROR, self.on_error)
+        bus.off(ON_RETRY, self.on_retry)
+
+    def on_response(self, event):
+        with self.lock:
+            histogram = self.histograms.get(event.endpoint)
+            if histogram is None:
+                histogram = self.histograms[event.endpoint] = LatencyHistogram()
+            histogram.record(event.duration)
+            self.bytes[event.endpoint] = self.bytes.get(event.endpoint, 0) + (event.bytes or 0)
+
+    def on_error(self, event):
+        with self.lock:
+            self.errors[event.endpoint] = self.errors.get(event.endpoint, 0) + 1
+
+    def on_retry(self, event):
+        with self.lock:
+            self.retries[event.endpoint] = self.retries.get(event.endpoint, 0) + 1
+
+    def report(self):
+        """
+        Returns:
+            A table of per endpoint statistics, latencies in milliseconds
+        """
+        def ms(seconds):
+            return "-" if seconds is None else "%.1f" % (seconds * 1000)
+
+        lines = ["%-40s %7s %6s %7s %10s %10s %10s %10s" %
+                 ("endpoint", "calls", "errors", "retries", "bytes", "p50(ms)", "p99(ms)", "max(ms)")]
+        with self.lock:
+            endpoints = sorted(set(self.histograms) | set(self.errors) | set(self.retries))
+            for endpoint in endpoints:
+                histogram = self.histograms.get(endpoint, LatencyHistogram())
+                lines.append("%-40s %7d %6d %7d %10d %10s %10s %10s" % (
+                    endpoint, histogram.count, self.errors.get(endpoint, 0),
+                    self.retries.get(endpoint, 0), self.bytes.get(endpoint, 0),
+                    ms(histogram.percentile(50)), ms(histogram.percentile(99)),
+                    ms(histogram.max if histogram.count else None)))
+        return "\n".join(lines) + "\n"
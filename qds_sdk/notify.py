@@ -0,0 +1,202 @@
+"""
+Completion notifications for commands being waited on.
+
+Command.run and Template.runTemplate wait for a command by fetching its
+status over and over. A notifier lets them block until they are told the
+command changed state instead, so a waiting worker spends one status
+fetch per notification rather than one per poll:
+
+    receiver = CallbackReceiver(port=8642)
+    Qubole.configure(api_token=..., notifier=receiver)
+    # have the notification service POST {"id": <command id>} to receiver.url
+    HiveCommand.run(query="...")
+
+A notifier has a single method, wait(command_id, delay), called between two
+status fetches with the delay proposed by the poll strategy. SleepNotifier
+sleeps for that delay, which is how commands have always been waited on,
+and is used when no notifier is configured. The other notifiers block until
+a notification arrives, or `fallback_interval` seconds have passed so a lost
+notification only slows the wait down.
+
+The QDS api itself neither holds requests open until a command changes
+state nor calls back on completion. LongPollNotifier and CallbackReceiver
+are meant for a relay that turns QDS notifications into either.
+"""
+import json
+import logging
+import threading
+import time
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import requests
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib.parse import parse_qs, urlparse
+
+log = logging.getLogger("qds_notify")
+
+
+class SleepNotifier(object):
+    """
+    No notifications: sleeps for the poll delay so the caller polls
+    """
+
+    def __init__(self):
+        self.sleep = time.sleep
+
+    def wait(self, command_id, delay):
+        """
+        Block until the command `command_id` may have changed state.
+
+        Args:
+            `delay`: seconds until the next poll according to the poll
+            strategy
+
+        Returns:
+            True if a notification arrived, False if the wait timed out
+        """
+        self.sleep(delay)
+        return False
+
+
+class LongPollNotifier(object):
+
+    def __init__(self, url, fallback_interval=60, headers=None, session=None):
+        """
+        Args:
+            `url`: endpoint answering GET url?command_id=<id>&timeout=<s>
+            once the command changed state, with status 200, or with 204 or
+            408 when `timeout` seconds passed first
+
+            `fallback_interval`: longest wait for a notification
+
+            `headers`: extra headers of the requests, e.g. for authorization
+
+            `session`: requests.Session to send the requests with
+        """
+        self.url = url
+        self.fallback_interval = fallback_interval
+        self.headers = headers or {}
+        self.session = session or requests.Session()
+        self.sleep = time.sleep
+
+    def wait(self, command_id, delay):
+        timeout = max(delay, self.fallback_interval)
+        try:
+            r = self.session.get(self.url, params={"command_id": command_id, "timeout": int(timeout)},
+                                 headers=self.headers, timeout=timeout + 10)
+        except requests.RequestException as e:
+            # The relay is unavailable, fall back to polling
+            log.warning("Long poll for command %s failed: %s" % (command_id, e))
+            self.sleep(delay)
+            return False
+        if r.status_code == 200:
+            return True
+        if r.status_code not in (204, 408):
+            log.warning("Long poll for command %s returned status %s" % (command_id, r.status_code))
+            self.sleep(delay)
+        return False
+
+
+class CallbackReceiver(object):
+
+    def __init__(self, host="127.0.0.1", port=0, path="/", fallback_interval=60,
+                 public_url=None, max_pending=10000):
+        """
+        Serve HTTP on `host`:`port` in a background thread, and record a
+        notification for every POST to `path` naming a command, either as
+        {"id": <id>} or {"command_id": <id>} in a JSON body or as an id
+        query parameter.
+
+        Args:
+            `port`: 0 picks a free port
+
+            `fallback_interval`: longest wait for a notification
+
+            `public_url`: url under which the notification service reaches
+            the receiver, when it differs from the address served
+
+            `max_pending`: number of notifications kept for commands nobody
+            waits on yet
+        """
+        self.path = path
+        self.fallback_interval = fallback_interval
+        self.max_pending = max_pending
+        self.notified = OrderedDict()
+        self.condition = threading.Condition()
+        self.clock = time.time
+        self.server = _CallbackServer((host, port), _CallbackHandler)
+        self.server.receiver = self
+        self.public_url = public_url
+        self.thread = threading.Thread(target=self.server.serve_forever, name="qds-callback-receiver")
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def url(self):
+        if self.public_url is not None:
+            return self.public_url
+        host, port = self.server.server_address[:2]
+        return "http://%s:%d%s" % (host, port, self.path)
+
+    def notify(self, command_id):
+        """
+        Record that the command `command_id` changed state
+        """
+        with self.condition:
+            key = str(command_id)
+            self.notified.pop(key, None)
+            self.notified[key] = True
+            while len(self.notified) > self.max_pending:
+                self.notified.popitem(last=False)
+            self.condition.notify_all()
+
+    def wait(self, command_id, delay):
+        key = str(command_id)
+        deadline = self.clock() + max(delay, self.fallback_interval)
+        with self.condition:
+            while key not in self.notified:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            del self.notified[key]
+            return True
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _CallbackServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _CallbackHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        url = urlparse(self.path)
+        if url.path != receiver.path:
+            self.send_error(404)
+            return
+        command_id = parse_qs(url.query).get("id", [None])[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        if command_id is None and length:
+            try:
+                body = json.loads(self.rfile.read(length).decode("utf-8"))
+                command_id = body.get("id", body.get("command_id"))
+            except (ValueError, AttributeError):
+                pass
+        if command_id is None:
+            self.send_error(400, "no command id")
+            return
+        receiver.notify(command_id)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        log.debug("%s - %s" % (self.address_string(), format % args))
@@ -0,0 +1,162 @@
+"""
+Poll scheduling for commands waiting to complete.
+
+A poll strategy hands out one schedule per command. The waiting code asks
+the schedule how long to sleep before each status fetch, passing the
+status it last saw, and reports the runtime once the command is done:
+
+    schedule = strategy.start(key)
+    while not Command.is_done(cmd.status):
+        time.sleep(schedule.next_delay(cmd.status))
+        cmd = cls.find(cmd.id)
+    schedule.finish()
+
+FixedPollStrategy sleeps the configured Qubole poll interval every time,
+which is how Command.run has always behaved. AdaptivePollStrategy starts
+with sub-second polls so short queries return quickly, backs off
+exponentially toward a cap for long running commands, and starts over
+whenever the status changes. It also remembers how long earlier runs of
+the same query took and skips polling until the command is expected to be
+close to done.
+"""
+import threading
+import time
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from qds_sdk.reuse import normalize_query
+
+
+def query_key(command_type, kwargs):
+    """
+    Returns:
+        A key identifying the query of a command about to be created from
+        `kwargs`, insensitive to whitespace outside quoted strings, or None
+        for commands without query text
+    """
+    query = kwargs.get('query') or kwargs.get('script_location')
+    if not query:
+        return None
+    return (kwargs.get('command_type') or command_type, normalize_query(query))
+
+
+class FixedSchedule(object):
+
+    def __init__(self, interval):
+        self.interval = interval
+
+    def next_delay(self, status):
+        return self.interval
+
+    def finish(self):
+        pass
+
+
+class FixedPollStrategy(object):
+
+    def __init__(self, interval=None):
+        """
+        Args:
+            `interval`: seconds between polls. Defaults to the configured
+            Qubole poll interval at the time a schedule is started
+        """
+        self.interval = interval
+
+    def start(self, key=None):
+        if self.interval is not None:
+            return FixedSchedule(self.interval)
+        from qds_sdk.qubole import Qubole
+        return FixedSchedule(Qubole.current().poll_interval)
+
+
+class AdaptiveSchedule(object):
+
+    def __init__(self, strategy, key, expected):
+        self.strategy = strategy
+        self.key = key
+        self.expected = expected
+        self.started = strategy.clock()
+        self.status = None
+        self.delay = None
+
+    def next_delay(self, status):
+        strategy = self.strategy
+        if status != self.status or self.delay is None:
+            self.status = status
+            self.delay = strategy.initial
+        else:
+            self.delay = min(self.delay * strategy.factor, strategy.max_interval)
+
+        if self.expected is not None:
+            remaining = self.expected * strategy.expected_fraction - self.elapsed()
+            if remaining > self.delay:
+                return min(remaining, strategy.max_interval)
+        return self.delay
+
+    def elapsed(self):
+        return self.strategy.clock() - self.started
+
+    def finish(self):
+        if self.key is not None:
+            self.strategy.record(self.key, self.elapsed())
+
+
+class AdaptivePollStrategy(object):
+
+    def __init__(self, initial=0.25, factor=1.5, max_interval=30, history_size=1000,
+                 smoothing=0.3, expected_fraction=0.8):
+        """
+        Args:
+            `initial`: seconds before the first poll, and after every status
+            change
+
+            `factor`: growth of the interval while the status stays the same
+
+            `max_interval`: upper bound of the interval
+
+            `history_size`: number of distinct queries whose runtime is
+            remembered. 0 disables seeding polls from history
+
+            `smoothing`: weight of the latest run in the moving average of
+            runtimes
+
+            `expected_fraction`: polling resumes at this fraction of the
+            expected runtime
+        """
+        if initial <= 0 or factor < 1:
+            raise ValueError("initial should be positive and factor at least 1")
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.history_size = history_size
+        self.smoothing = smoothing
+        self.expected_fraction = expected_fraction
+        self.runtimes = OrderedDict()
+        self.lock = threading.Lock()
+        self.clock = time.time
+
+    def start(self, key=None):
+        return AdaptiveSchedule(self, key, self.expected_runtime(key))
+
+    def expected_runtime(self, key):
+        """
+        Returns:
+            Moving average of the runtimes of `key`, or None if unknown
+        """
+        if key is None:
+            return None
+        with self.lock:
+            return self.runtimes.get(key)
+
+    def record(self, key, seconds):
+        if self.history_size <= 0:
+            return
+        with self.lock:
+            previous = self.runtimes.pop(key, None)
+            if previous is not None:
+                seconds = previous + self.smoothing * (seconds - previous)
+            self.runtimes[key] = seconds
+            while len(self.runtimes) > self.history_size:
+                self.runtimes.popitem(last=False)
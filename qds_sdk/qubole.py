@@ -1,7 +1,15 @@
 import requests
 import logging
+import threading
+import functools
+import inspect
+import types
+from contextlib import contextmanager
 from qds_sdk.connection import Connection
 from qds_sdk.exception import ConfigError
+from qds_sdk.throttle import ThrottleRegistry
+from qds_sdk.timeouts import TimeoutPolicy
+from qds_sdk.instrumentation import EventBus
 
 log = logging.getLogger("qds_qubole")
 
@@ -29,11 +37,29 @@ class Qubole:
     poll_interval = None
     skip_ssl_cert_check = None
     cloud_name = None
+    pool_connections = 10
+    pool_maxsize = 10
+    pool_block = False
+    retry_policy = None
+    throttles = None
+    timeouts = None
+    transport = "requests"
+    poll_strategy = None
+    command_cache = None
+    result_reuse = None
+    notifier = None
+
+    # Request events of every connection in the process, see
+    # qds_sdk.instrumentation. Survives re-configuration.
+    hooks = EventBus()
 
     @classmethod
     def configure(cls, api_token,
                   api_url="https://api.qubole.com/api/", version="v1.2",
-                  poll_interval=5, skip_ssl_cert_check=False, cloud_name="AWS"):
+                  poll_interval=5, skip_ssl_cert_check=False, cloud_name="AWS",
+                  pool_connections=10, pool_maxsize=10, pool_block=False,
+                  retry_policy=None, rate_limits=None, timeouts=None, transport="requests",
+                  poll_strategy=None, command_cache=None, result_reuse=None, notifier=None):
         """
         Set parameters governing interaction with QDS
 
@@ -45,6 +71,46 @@ class Qubole:
             `version`: QDS REST api version. Will be used throughout unless overridden in Qubole.agent(..)
 
             `poll_interval`: interval in secs when polling QDS for events
+
+            `pool_connections`: number of host pools each connection caches
+
+            `pool_maxsize`: maximum keep-alive connections per host. Raise this
+            to the number of threads making concurrent calls
+
+            `pool_block`: block a thread when the pool is exhausted instead of
+            opening a throwaway connection
+
+            `retry_policy`: a qds_sdk.retry.RetryPolicy governing backoff,
+            jitter, time budget and which verbs are retried. Defaults to
+            RetryPolicy()
+
+            `rate_limits`: client side rate limits per endpoint family, e.g.
+            {"commands": {"rate": 10, "burst": 20, "max_in_flight": 8},
+             "default": {"rate": 5}}. See qds_sdk.throttle.ThrottleRegistry.
+            The limits are shared by every connection in the process
+
+            `timeouts`: a qds_sdk.timeouts.TimeoutPolicy with connect and
+            read timeouts per call type (status polls, log fetches, result
+            fetches, cluster mutations), optionally adaptive. Defaults to
+            TimeoutPolicy()
+
+            `transport`: "requests" (HTTP/1.1, the default) or "http2" to
+            multiplex concurrent calls over a few HTTP/2 connections. The
+            latter needs the httpx package, see qds_sdk.http2
+
+            `poll_strategy`: a qds_sdk.polling strategy used when waiting
+            for commands, e.g. AdaptivePollStrategy(). None polls every
+            `poll_interval` seconds
+
+            `command_cache`: a qds_sdk.cache.CommandCache serving finished
+            commands, their logs and job information locally
+
+            `result_reuse`: a qds_sdk.reuse.ResultReuse letting run() return
+            a recent successful command with the same query instead of
+            running it again
+
+            `notifier`: a qds_sdk.notify notifier telling run() when the
+            command it waits for changed state. None polls
         """
 
         cls._auth = QuboleAuth(api_token)
@@ -58,13 +124,55 @@ class Qubole:
             cls.poll_interval = poll_interval
         cls.skip_ssl_cert_check = skip_ssl_cert_check
         cls.cloud_name = cloud_name.lower()
+        cls.pool_connections = pool_connections
+        cls.pool_maxsize = pool_maxsize
+        cls.pool_block = pool_block
+        cls.retry_policy = retry_policy
+        cls.throttles = ThrottleRegistry(rate_limits) if rate_limits else None
+        cls.timeouts = timeouts or TimeoutPolicy()
+        cls.transport = transport
+        cls.poll_strategy = poll_strategy
+        cls.command_cache = command_cache
+        cls.result_reuse = result_reuse
+        cls.notifier = notifier
+        cls.cached_agents = {}
+        cls.cached_async_agents = {}
 
 
 
-    cached_agent = None
+    cached_agents = {}
+    cached_async_agents = {}
+    _agent_lock = threading.Lock()
     cloud = None
 
 
+    @classmethod
+    def current(cls):
+        """
+        Returns:
+           the QuboleClient activated in the calling thread, or Qubole itself
+           when none is. Both carry the same settings (poll_interval,
+           version, ...)
+        """
+        return getattr(_active, "client", None) or cls
+
+    @classmethod
+    @contextmanager
+    def activate(cls):
+        """
+        Use the process wide configuration in this thread for the duration
+        of the with block, even inside QuboleClient.activate(). Together
+        with current() this lets work handed to other threads run with the
+        configuration of the thread that created it:
+
+            config = Qubole.current()
+            ...
+            with config.activate():
+                ...
+        """
+        with _activated(None):
+            yield cls
+
     @classmethod
     def agent(cls, version=None):
         """
@@ -75,36 +183,28 @@ class Qubole:
            features available only in the newer version of the API available
            for certain resource end points eg: /v1.3/cluster. When version is
            None we default to v1.2
-        """
-        reuse_cached_agent = True
-        if version:
-          log.debug("api version changed to %s" % version)
-          cls.rest_url = '/'.join([cls.baseurl.rstrip('/'), version])
-          reuse_cached_agent = False
-        else:
-          cls.rest_url = '/'.join([cls.baseurl.rstrip('/'), cls.version])
-        if cls.api_token is None:
-            raise ConfigError("No API Token specified - please supply one via Qubole.configure()")
 
-        if not reuse_cached_agent:
-          uncached_agent = Connection(cls._auth, cls.rest_url, cls.skip_ssl_cert_check)
-          return uncached_agent
-        if cls.cached_agent is None:
-          cls.cached_agent = Connection(cls._auth, cls.rest_url, cls.skip_ssl_cert_check)
+           One pooled connection is cached per api version and shared by all
+           threads, so keep-alive connections stay warm across calls.
 
-        return cls.cached_agent
+           Inside QuboleClient.activate() the connection of that client is
+           returned instead.
+        """
+        return _agent(cls.current(), version)
 
     @classmethod
-    def get_cloud(cls, cloud_name=None):
-        if cloud_name and cloud_name.lower() not in ["aws", "oracle_bmc", "azure", "oracle_opc"]:
-            raise Exception("cloud should be 'aws', 'oracle_bmc', 'azure' or 'oracle_opc'")
+    def async_agent(cls, version=None):
+        """
+        Returns:
+           an AsyncConnection object to make REST calls to QDS from asyncio
+           code. One connection is cached per api version. Requires python
+           3.5+ and the aiohttp package.
+        """
+        return _async_agent(cls.current(), version)
 
-        if cloud_name:
-            return Qubole.get_cloud_object(cloud_name)
-        else:
-            if cls.cloud is None:
-                cls.cloud = cls.get_cloud_object(cls.cloud_name)
-            return cls.cloud
+    @classmethod
+    def get_cloud(cls, cloud_name=None):
+        return _get_cloud(cls.current(), cloud_name)
 
     @classmethod
     def get_cloud_object(cls, cloud_name):
@@ -119,4 +219,211 @@ class Qubole:
             return qds_sdk.cloud.azure_cloud.AzureCloud()
         elif cloud_name.lower()  == "oracle_opc":
             import qds_sdk.cloud.oracle_opc_cloud
-            return qds_sdk.cloud.oracle_opc_cloud.OracleOpcCloud()   
\ No newline at end of file
+            return qds_sdk.cloud.oracle_opc_cloud.OracleOpcCloud()
+
+
+class QuboleClient(object):
+    """
+    Credentials, connections and cloud settings of a single QDS account.
+
+    Unlike the process wide Qubole configuration, any number of clients can
+    be used side by side, e.g. one per tenant in a multi-tenant service:
+
+        client = QuboleClient(api_token="...")
+        with client.activate():
+            cmd = HiveCommand.run(query="show tables")
+
+        ClientHiveCommand = client.bind(HiveCommand)
+        cmd = ClientHiveCommand.run(query="show tables")
+
+    Activation is per thread: threads started inside activate() do not
+    inherit it, and asyncio code should use client.async_agent() directly.
+    """
+
+    def __init__(self, api_token,
+                 api_url="https://api.qubole.com/api/", version="v1.2",
+                 poll_interval=5, skip_ssl_cert_check=False, cloud_name="AWS",
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 retry_policy=None, rate_limits=None, timeouts=None, hooks=None,
+                 transport="requests", poll_strategy=None, command_cache=None,
+                 result_reuse=None, notifier=None):
+        """
+        Args:
+            Same as Qubole.configure, plus
+
+            `hooks`: EventBus for the request events of this client.
+            Defaults to the process wide Qubole.hooks
+        """
+        if api_token is None:
+            raise ConfigError("No API Token specified")
+        self._auth = QuboleAuth(api_token)
+        self.api_token = api_token
+        self.version = version
+        self.baseurl = api_url
+        self.poll_interval = max(poll_interval, Qubole.MIN_POLL_INTERVAL)
+        self.skip_ssl_cert_check = skip_ssl_cert_check
+        self.cloud_name = cloud_name.lower()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.retry_policy = retry_policy
+        self.throttles = ThrottleRegistry(rate_limits) if rate_limits else None
+        self.timeouts = timeouts or TimeoutPolicy()
+        self.hooks = hooks if hooks is not None else Qubole.hooks
+        self.transport = transport
+        self.poll_strategy = poll_strategy
+        self.command_cache = command_cache
+        self.result_reuse = result_reuse
+        self.notifier = notifier
+        self.cached_agents = {}
+        self.cached_async_agents = {}
+        self._agent_lock = threading.Lock()
+        self.cloud = None
+
+    def agent(self, version=None):
+        """
+        Returns:
+           the pooled connection of this client for `version`
+        """
+        return _agent(self, version)
+
+    def async_agent(self, version=None):
+        """
+        Returns:
+           the AsyncConnection of this client for `version`
+        """
+        return _async_agent(self, version)
+
+    def get_cloud(self, cloud_name=None):
+        return _get_cloud(self, cloud_name)
+
+    @contextmanager
+    def activate(self):
+        """
+        Route Qubole.agent(), and so every Resource call, made by this thread
+        to this client for the duration of the with block. Activations nest.
+        """
+        with _activated(self):
+            yield self
+
+    def bind(self, resource_cls):
+        """
+        Returns:
+            a subclass of `resource_cls` whose class and instance methods run
+            inside activate(). Objects it creates, such as the result of
+            find() or run(), are bound as well.
+        """
+        # Resource metaclasses derive rest_entity_path from the class name
+        # unless it is set explicitly
+        attrs = {'rest_entity_path': resource_cls.rest_entity_path}
+        for name in dir(resource_cls):
+            if name.startswith('_'):
+                continue
+            for klass in resource_cls.__mro__:
+                if name in klass.__dict__:
+                    raw = klass.__dict__[name]
+                    break
+            if isinstance(raw, classmethod):
+                attrs[name] = classmethod(self._activating(raw.__func__))
+            elif isinstance(raw, staticmethod):
+                attrs[name] = staticmethod(self._activating(raw.__func__))
+            elif isinstance(raw, types.FunctionType):
+                attrs[name] = self._activating(raw)
+        return type(resource_cls.__name__, (resource_cls,), attrs)
+
+    def _activating(self, func):
+        if inspect.isgeneratorfunction(func):
+            # The body of a generator runs as it is iterated, not when it
+            # is called: activate around every step, but not while the
+            # caller holds an item
+            @functools.wraps(func)
+            def generator(*args, **kwargs):
+                gen = func(*args, **kwargs)
+                try:
+                    while True:
+                        with self.activate():
+                            try:
+                                item = next(gen)
+                            except StopIteration:
+                                return
+                        yield item
+                finally:
+                    with self.activate():
+                        gen.close()
+            return generator
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.activate():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+# The QuboleClient each thread is bound to, see QuboleClient.activate
+_active = threading.local()
+
+
+@contextmanager
+def _activated(client):
+    previous = getattr(_active, "client", None)
+    _active.client = client
+    try:
+        yield
+    finally:
+        _active.client = previous
+
+
+# Qubole (the class) and QuboleClient instances expose the same settings and
+# caches, so the functions below serve both.
+
+def _agent(config, version):
+    if config.api_token is None:
+        raise ConfigError("No API Token specified - please supply one via Qubole.configure()")
+    if version:
+        log.debug("api version changed to %s" % version)
+    else:
+        version = config.version
+
+    agent = config.cached_agents.get(version)
+    if agent is None:
+        with config._agent_lock:
+            agent = config.cached_agents.get(version)
+            if agent is None:
+                rest_url = '/'.join([config.baseurl.rstrip('/'), version])
+                agent = Connection(config._auth, rest_url, config.skip_ssl_cert_check,
+                                   pool_connections=config.pool_connections,
+                                   pool_maxsize=config.pool_maxsize,
+                                   pool_block=config.pool_block,
+                                   retry_policy=config.retry_policy,
+                                   throttles=config.throttles,
+                                   timeouts=config.timeouts,
+                                   hooks=config.hooks,
+                                   transport=config.transport)
+                config.cached_agents[version] = agent
+    return agent
+
+
+def _async_agent(config, version):
+    if config.api_token is None:
+        raise ConfigError("No API Token specified - please supply one via Qubole.configure()")
+    version = version or config.version
+    if version not in config.cached_async_agents:
+        from qds_sdk.async_connection import AsyncConnection
+        rest_url = '/'.join([config.baseurl.rstrip('/'), version])
+        config.cached_async_agents[version] = AsyncConnection(config._auth, rest_url,
+                                                              config.skip_ssl_cert_check,
+                                                              retry_policy=config.retry_policy,
+                                                              hooks=config.hooks)
+    return config.cached_async_agents[version]
+
+
+def _get_cloud(config, cloud_name):
+    if cloud_name and cloud_name.lower() not in ["aws", "oracle_bmc", "azure", "oracle_opc"]:
+        raise Exception("cloud should be 'aws', 'oracle_bmc', 'azure' or 'oracle_opc'")
+
+    if cloud_name:
+        return Qubole.get_cloud_object(cloud_name)
+    else:
+        if config.cloud is None:
+            config.cloud = Qubole.get_cloud_object(config.cloud_name)
+        return config.cloud
@@ -142,7 +142,7 @@ class Report(Resource):
     rest_entity_path = "reports"
 
     @classmethod
-    def show(cls, report_name, data):
+    def show(cls, report_name, data, stream_key=None):
         """
         Shows a report by issuing a GET request to the /reports/report_name
         endpoint.
@@ -151,8 +151,14 @@ class Report(Resource):
             `report_name`: the name of the report to show
 
             `data`: the parameters for the report
+
+            `stream_key`: parse the report incrementally and return an
+            iterator over the list stored under this key, e.g. "commands"
+            for the all_commands report
         """
         conn = Qubole.agent()
+        if stream_key is not None:
+            return conn.get_stream(cls.element_path(report_name), data, key=stream_key)
         return conn.get(cls.element_path(report_name), data)
 
     @classmethod
@@ -98,6 +98,14 @@ class Resource(BaseResource):
         if id is not None:
             return cls(conn.get(cls.element_path(id)))
 
+    @classmethod
+    def find_async(cls, id, **kwargs):
+        """
+        Coroutine variant of find. Requires python 3.5+ and aiohttp.
+        """
+        from qds_sdk import async_connection
+        return async_connection.find_resource(cls, id)
+
     @classmethod
     def create(cls, **kwargs):
         conn = Qubole.agent()
@@ -129,6 +137,14 @@ class Resource(BaseResource):
             resource_list.append(cls(s))
         return resource_list
 
+    @classmethod
+    def list_async(cls, page=None, per_page=None):
+        """
+        Coroutine variant of list. Requires python 3.5+ and aiohttp.
+        """
+        from qds_sdk import async_connection
+        return async_connection.list_resources(cls, page=page, per_page=per_page)
+
     @classmethod
     def update(cls, id, **kwargs):
         conn = Qubole.agent()
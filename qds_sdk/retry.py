@@ -1,7 +1,12 @@
 import time
+import random
 import logging
+from email.utils import parsedate_tz, mktime_tz
 from functools import wraps
 
+import requests
+from qds_sdk.exception import RetryWithDelay
+
 log = logging.getLogger("retry")
 
 
@@ -22,3 +27,155 @@ def retry(ExceptionToCheck, tries=4, delay=3, backoff=2):
             return f(*args, **kwargs)
         return f_retry  # true decorator
     return deco_retry
+
+
+class RetryPolicy(object):
+    """
+    Decides whether a failed QDS api call is retried and how long to wait
+    first. Connection consults its policy for every request.
+
+    Waits grow geometrically from `delay` by `backoff`, capped at
+    `max_delay`, and are randomized according to `jitter` so that many
+    clients throttled at the same moment do not retry in lockstep:
+
+        None            exact geometric schedule
+        "full"          uniform between 0 and the geometric delay
+        "equal"         half the geometric delay plus up to as much again
+        "decorrelated"  uniform between `delay` and three times the last wait
+
+    A `Retry-After` header on a throttling response overrides the computed
+    wait when `honor_retry_after` is set.
+    """
+
+    JITTER_MODES = (None, "full", "equal", "decorrelated")
+
+    def __init__(self, tries=6, delay=30, backoff=2, max_delay=960,
+                 jitter="decorrelated", max_elapsed=None,
+                 retry_on=(RetryWithDelay, requests.Timeout),
+                 retry_methods=("GET",), honor_retry_after=True):
+        """
+        Args:
+            `tries`: total number of attempts, including the first one
+
+            `delay`: base wait in seconds before the first retry
+
+            `backoff`: multiplier applied to the wait after every retry
+
+            `max_delay`: upper bound in seconds for a single wait
+
+            `jitter`: one of None, "full", "equal" or "decorrelated"
+
+            `max_elapsed`: give up once this many seconds have passed since
+            the first attempt. None means no budget
+
+            `retry_on`: exception classes that may be retried
+
+            `retry_methods`: HTTP verbs that are safe to retry. Only GET is
+            retried by default; add PUT and DELETE for idempotent updates.
+            POST is never idempotent for QDS and should not be added
+
+            `honor_retry_after`: wait as long as the server asks via the
+            Retry-After header
+        """
+        if jitter not in self.JITTER_MODES:
+            raise ValueError("jitter should be one of %s" % ", ".join(str(m) for m in self.JITTER_MODES))
+        self.tries = tries
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.retry_on = tuple(retry_on)
+        self.retry_methods = set(m.upper() for m in retry_methods)
+        self.honor_retry_after = honor_retry_after
+        self.sleep = time.sleep
+        self.clock = time.time
+
+    def is_retryable(self, method, exception):
+        return method.upper() in self.retry_methods and isinstance(exception, self.retry_on)
+
+    def next_delay(self, method, exception, attempt, elapsed, previous_delay=None):
+        """
+        Args:
+            `method`: HTTP verb of the failed call
+
+            `exception`: the exception raised by the failed call
+
+            `attempt`: number of attempts made so far, starting at 1
+
+            `elapsed`: seconds since the first attempt started
+
+            `previous_delay`: the wait returned for the previous attempt
+
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        if attempt >= self.tries or not self.is_retryable(method, exception):
+            return None
+
+        wait = None
+        if self.honor_retry_after:
+            wait = self.retry_after(exception)
+        if wait is None:
+            wait = self._backoff(attempt, previous_delay)
+
+        if self.max_elapsed is not None and elapsed + wait > self.max_elapsed:
+            return None
+        return wait
+
+    def call(self, method, func, *args, **kwargs):
+        """
+        Invoke `func` until it succeeds or the policy gives up, re-raising
+        the last exception in that case.
+
+        An `on_retry` keyword argument, if given, is not passed to `func`
+        but called as on_retry(exception, attempt, delay) before each wait.
+        """
+        on_retry = kwargs.pop("on_retry", None)
+        start = self.clock()
+        attempt, wait = 1, None
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                wait = self.next_delay(method, e, attempt, self.clock() - start, wait)
+                if wait is None:
+                    raise
+                log.info("%s, Retrying in %d seconds..." % (e.__class__.__name__, wait))
+                if on_retry is not None:
+                    on_retry(e, attempt, wait)
+                self.sleep(wait)
+                attempt += 1
+
+    def _backoff(self, attempt, previous_delay):
+        expo = min(self.max_delay, self.delay * self.backoff ** (attempt - 1))
+        if self.jitter == "full":
+            return random.uniform(0, expo)
+        if self.jitter == "equal":
+            return expo / 2.0 + random.uniform(0, expo / 2.0)
+        if self.jitter == "decorrelated":
+            previous = previous_delay or self.delay
+            return min(self.max_delay, random.uniform(self.delay, previous * 3))
+        return expo
+
+    @staticmethod
+    def retry_after(exception):
+        """
+        Returns:
+            The wait in seconds requested by the Retry-After header of the
+            response carried by `exception`, or None if there is none
+        """
+        response = getattr(exception, "request", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        value = headers.get("Retry-After")
+        if value is None:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0, mktime_tz(parsed) - time.time())
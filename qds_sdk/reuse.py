@@ -0,0 +1,158 @@
+"""
+Client-side reuse of recent command results.
+
+Pipelines often submit the same query several times within minutes.
+With a ResultReuse configured, Command.run first looks for a command with
+the same fingerprint that succeeded less than `ttl` seconds ago and
+returns it instead of running the query again. Its results are fetched
+with get_results as usual. Identical commands submitted concurrently in
+one process are run once: later callers wait for the first one.
+
+    Qubole.configure(api_token=..., result_reuse=ResultReuse(ttl=600))
+    HiveCommand.run(query="select count(*) from events")   # runs
+    HiveCommand.run(query="select count(*)  from events")  # reused
+    HiveCommand.run(query="...", reuse=False)              # always runs
+
+The fingerprint covers the command type, the query text with whitespace
+outside quotes normalized, and every other option except the ones that
+do not change the result (name, tags, notifications, log printing and
+retries), so the macros, cluster label, engine version, sample size or
+db tap all tell commands apart. Only commands with query text are
+eligible.
+"""
+import hashlib
+import json
+import threading
+import time
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import six
+
+# Options that do not change what a command computes
+_NOT_FINGERPRINTED = frozenset(["name", "tags", "can_notify", "print_logs", "print_logs_live",
+                                "retry", "poll_strategy", "notifier", "reuse"])
+
+
+def normalize_query(query):
+    """
+    Returns:
+        `query` with runs of whitespace outside quoted strings collapsed
+        to one space, and surrounding whitespace and semicolons removed
+    """
+    out = []
+    quote = None
+    pending_space = False
+    i = 0
+    while i < len(query):
+        c = query[i]
+        if quote is not None:
+            out.append(c)
+            if c == '\\' and i + 1 < len(query):
+                out.append(query[i + 1])
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c.isspace():
+            pending_space = True
+        else:
+            if pending_space and out:
+                out.append(' ')
+            pending_space = False
+            out.append(c)
+            if c in "'\"`":
+                quote = c
+        i += 1
+    return "".join(out).rstrip("; ")
+
+
+def fingerprint(command_type, kwargs):
+    """
+    Returns:
+        Hex digest identifying what the command built from `kwargs` would
+        compute, or None if it has no query text
+    """
+    query = kwargs.get('query')
+    if not query:
+        return None
+    options = dict((k, v) for k, v in kwargs.items()
+                   if v is not None and k not in _NOT_FINGERPRINTED)
+    options['command_type'] = kwargs.get('command_type') or command_type
+    options['query'] = normalize_query(query)
+    options['label'] = kwargs.get('label') or "default"
+    macros = options.get('macros')
+    if isinstance(macros, six.string_types):
+        try:
+            options['macros'] = json.loads(macros)
+        except ValueError:
+            pass
+    key = json.dumps(options, sort_keys=True, default=repr)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class ResultReuse(object):
+
+    def __init__(self, ttl=600, max_entries=10000):
+        """
+        Args:
+            `ttl`: seconds after completion during which a successful
+            command is reused
+
+            `max_entries`: number of fingerprints remembered
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.clock = time.time
+
+    def lookup(self, fp, command_class):
+        """
+        Returns:
+            A fresh successful command with fingerprint `fp`, or None
+        """
+        with self.lock:
+            entry = self.entries.get(fp)
+            if entry is not None and self.clock() - entry[1] > self.ttl:
+                del self.entries[fp]
+                entry = None
+        if entry is None:
+            return None
+        cmd = command_class.find(entry[0])
+        if cmd is None or not command_class.is_success(cmd.status):
+            return None
+        return cmd
+
+    def record(self, fp, cmd):
+        """
+        Remember `cmd`, which just succeeded, under fingerprint `fp`
+        """
+        with self.lock:
+            self.entries.pop(fp, None)
+            self.entries[fp] = (cmd.id, self.clock())
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def claim(self, fp):
+        """
+        Mark `fp` as being run by the caller.
+
+        Returns:
+            None if the caller should run the command and later call
+            release(fp), otherwise an Event set once the command already
+            running for `fp` finished
+        """
+        with self.lock:
+            event = self.in_flight.get(fp)
+            if event is None:
+                self.in_flight[fp] = threading.Event()
+            return event
+
+    def release(self, fp):
+        with self.lock:
+            event = self.in_flight.pop(fp, None)
+        if event is not None:
+            event.set()
@@ -0,0 +1,212 @@
+"""
+Incremental JSON decoding for large QDS api responses.
+
+JsonStreamReader consumes a JSON document as a sequence of text chunks and
+hands back the pieces callers care about without holding the whole document
+in memory: the elements of a list-shaped response one at a time, or the
+contents of a large string value (such as inline command results) in
+slices.
+"""
+import codecs
+import json
+import re
+
+_WHITESPACE = " \t\n\r"
+
+_HIGH_SURROGATE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}$')
+
+# Longest escape that must not be split: a \uXXXX\uXXXX surrogate pair
+_MAX_ESCAPE = 12
+
+
+class JsonStreamReader(object):
+
+    def __init__(self, chunks):
+        """
+        Args:
+            `chunks`: iterable of text chunks making up one JSON document
+        """
+        self.chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    @classmethod
+    def from_response(cls, response, chunk_size=65536):
+        """
+        Build a reader over a streamed requests.Response. Content encodings
+        such as gzip are undone on the fly by iter_content.
+        """
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+
+        def chunks():
+            for chunk in response.iter_content(chunk_size):
+                yield decoder.decode(chunk)
+            yield decoder.decode(b'', True)
+
+        return cls(chunks())
+
+    def items(self, key=None):
+        """
+        Yield the elements of the top-level array or, if `key` is given, of
+        the array stored under `key` in the top-level object. Yields nothing
+        if `key` is missing or null.
+        """
+        c = self._next_token()
+        if c == '[' and key is None:
+            for item in self._array_items():
+                yield item
+            return
+        if c != '{' or key is None:
+            raise ValueError("Expected a JSON %s" % ("object" if key else "array"))
+        for name in self._object_keys():
+            if name == key:
+                if self._peek() == '[':
+                    self.pos += 1
+                    for item in self._array_items():
+                        yield item
+                    return
+                self._value()
+                return
+            self._value()
+
+    def read_object(self, sinks):
+        """
+        Parse the top-level object. String values of keys in `sinks` are
+        passed to sinks[key] slice by slice instead of being kept.
+
+        Returns:
+            Dictionary with all the other keys of the object
+        """
+        if self._next_token() != '{':
+            raise ValueError("Expected a JSON object")
+        result = {}
+        for name in self._object_keys():
+            if name in sinks and self._peek() == '"':
+                self.pos += 1
+                self._stream_string(sinks[name])
+            else:
+                result[name] = self._value()
+        return result
+
+    def _fill(self):
+        # Drop the consumed prefix before appending the next chunk
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _next_token(self):
+        c = self._peek()
+        self.pos += 1
+        return c
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may continue in the
+                # next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def _array_items(self):
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            c = self._next_token()
+            if c == ']':
+                return
+            if c != ',':
+                raise ValueError("Expected ',' or ']' in JSON array")
+
+    def _object_keys(self):
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            name = self._value()
+            if self._next_token() != ':':
+                raise ValueError("Expected ':' in JSON object")
+            yield name
+            c = self._next_token()
+            if c == '}':
+                return
+            if c != ',':
+                raise ValueError("Expected ',' or '}' in JSON object")
+
+    def _stream_string(self, sink):
+        # self.pos is just past the opening quote
+        while True:
+            end = self._closing_quote()
+            cut = end if end is not None else self._safe_cut()
+            if cut > self.pos:
+                sink(json.loads('"%s"' % self.buf[self.pos:cut]))
+            self.pos = cut
+            if end is not None:
+                self.pos += 1
+                return
+            if not self._fill():
+                raise ValueError("Unterminated JSON string")
+
+    def _closing_quote(self):
+        start = self.pos
+        while True:
+            end = self.buf.find('"', start)
+            if end == -1:
+                return None
+            if self._backslashes_before(end) % 2 == 0:
+                return end
+            start = end + 1
+
+    def _safe_cut(self):
+        # Index up to which the buffered part of the string can be decoded
+        # on its own: never inside an escape, nor between the two halves of
+        # a surrogate pair
+        cut = len(self.buf)
+        while True:
+            start = self._last_escape(cut)
+            if start is None:
+                return cut
+            escape = self.buf[start:cut]
+            if (len(escape) < 2 or (escape[1] == 'u' and len(escape) < 6)
+                    or (len(escape) == 6 and _HIGH_SURROGATE.match(escape))):
+                cut = start
+            else:
+                return cut
+
+    def _last_escape(self, cut):
+        i = self.buf.rfind('\\', max(self.pos, cut - _MAX_ESCAPE), cut)
+        if i == -1:
+            return None
+        # In a run of backslashes every other one starts an escape
+        if self._backslashes_before(i) % 2 == 0:
+            return i
+        return i - 1
+
+    def _backslashes_before(self, index):
+        count = 0
+        while index - count - 1 >= self.pos and self.buf[index - count - 1] == '\\':
+            count += 1
+        return count
@@ -8,6 +8,8 @@ import os
 from argparse import ArgumentParser
 from qds_sdk.qubole import Qubole
 from qds_sdk.resource import Resource
+from qds_sdk.polling import FixedPollStrategy
+from qds_sdk.notify import SleepNotifier
 
 log = logging.getLogger("qds_template")
 
@@ -236,9 +238,13 @@ class Template(Resource):
         cmdId = res['id']
         cmdClass = eval(cmdType)
         cmd = cmdClass.find(cmdId)
+        schedule = (Qubole.current().poll_strategy or FixedPollStrategy()).start(("template", id))
+        notifier = Qubole.current().notifier or SleepNotifier()
         while not Command.is_done(cmd.status):
-            time.sleep(Qubole.poll_interval)
+            notifier.wait(cmd.id, schedule.next_delay(cmd.status))
             cmd = cmdClass.find(cmd.id)
+        if Command.is_success(cmd.status):
+            schedule.finish()
         return Template.getResult(cmdClass, cmd)
     
     @staticmethod
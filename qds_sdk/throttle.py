@@ -0,0 +1,133 @@
+"""
+Client side rate limiting for the QDS REST API.
+
+A Throttle combines a token bucket, capping the sustained request rate, with
+a semaphore capping the number of requests in flight. ThrottleRegistry keeps
+one Throttle per endpoint family (the first segment of the request path,
+e.g. `commands`, `clusters`, `scheduler`) and is shared by every Connection
+in the process, so many threads polling QDS stay under the account quota
+instead of tripping server side throttling.
+"""
+import time
+import threading
+import logging
+
+log = logging.getLogger("qds_throttle")
+
+
+class TokenBucket(object):
+    """
+    Allows `rate` acquisitions per second on average, with bursts of up to
+    `burst` acquisitions.
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate should be positive")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.lock = threading.Lock()
+        self.sleep = time.sleep
+        self.clock = time.time
+
+    def acquire(self):
+        """
+        Take one token, blocking until it is due. Tokens are reserved in
+        arrival order: the balance may go negative, and each caller sleeps
+        for however long it takes the bucket to pay back its reservation.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            self.sleep(wait)
+
+
+class Throttle(object):
+    """
+    Context manager guarding a single request: waits for a token and for a
+    free in-flight slot before the request, and frees the slot afterwards.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """
+        Args:
+            `rate`: sustained requests per second. None means unlimited
+
+            `burst`: requests allowed back to back before `rate` applies
+
+            `max_in_flight`: maximum concurrent requests. None means unlimited
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def __enter__(self):
+        if self.slots is not None:
+            self.slots.acquire()
+        if self.bucket is not None:
+            try:
+                self.bucket.acquire()
+            except BaseException:
+                if self.slots is not None:
+                    self.slots.release()
+                raise
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.slots is not None:
+            self.slots.release()
+        return False
+
+
+class ThrottleRegistry(object):
+    """
+    Maps endpoint families to Throttles. The `default` entry, if present,
+    governs every family without an entry of its own. When given as a
+    dictionary each such family gets a separate Throttle built from it; a
+    Throttle instance is shared by all the families it covers.
+    """
+
+    DEFAULT = "default"
+
+    def __init__(self, limits=None):
+        """
+        Args:
+            `limits`: dictionary from endpoint family to either a Throttle or
+            a dictionary of Throttle arguments, e.g.
+            {"commands": {"rate": 10, "burst": 20, "max_in_flight": 8},
+             "default": {"rate": 5}}
+        """
+        self.limits = dict(limits or {})
+        self.throttles = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def family(path):
+        """
+        Returns:
+            The endpoint family of a request path: commands/123/logs -> commands
+        """
+        return path.lstrip('/').split('?', 1)[0].split('/', 1)[0]
+
+    def for_path(self, path):
+        """
+        Returns:
+            The Throttle governing `path`, or None if it is not rate limited
+        """
+        family = self.family(path)
+        throttle = self.throttles.get(family)
+        if throttle is None:
+            limit = self.limits.get(family, self.limits.get(self.DEFAULT))
+            if limit is None:
+                return None
+            with self.lock:
+                throttle = self.throttles.get(family)
+                if throttle is None:
+                    throttle = limit if isinstance(limit, Throttle) else Throttle(**limit)
+                    self.throttles[family] = throttle
+        return throttle
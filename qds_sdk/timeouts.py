@@ -0,0 +1,119 @@
+"""
+Connect and read timeouts for QDS api calls.
+
+Calls are grouped into call types with very different latency profiles:
+status polls are tiny and should fail fast when a load balancer node dies,
+while log and result fetches can legitimately take minutes. TimeoutPolicy
+assigns each call type its own (connect, read) timeout pair and, in
+adaptive mode, shortens read timeouts to a multiple of the observed p99
+latency of that call type.
+"""
+import threading
+from collections import deque
+
+STATUS = "status"
+LOGS = "logs"
+RESULTS = "results"
+CLUSTER_MUTATION = "cluster_mutation"
+DEFAULT = "default"
+
+
+class TimeoutPolicy(object):
+
+    CALL_TYPES = (STATUS, LOGS, RESULTS, CLUSTER_MUTATION, DEFAULT)
+
+    DEFAULT_READ_TIMEOUTS = {
+        STATUS: 60,
+        LOGS: 300,
+        RESULTS: 300,
+        CLUSTER_MUTATION: 300,
+        DEFAULT: 300,
+    }
+
+    def __init__(self, connect_timeout=10, read_timeouts=None, adaptive=False,
+                 multiplier=4, min_read_timeout=5, min_samples=20, window=200):
+        """
+        Args:
+            `connect_timeout`: seconds allowed to establish a connection
+
+            `read_timeouts`: dictionary from call type to read timeout in
+            seconds, overriding DEFAULT_READ_TIMEOUTS. Call types are
+            status, logs, results, cluster_mutation and default
+
+            `adaptive`: derive read timeouts from observed latencies. The
+            configured read timeout remains the upper bound
+
+            `multiplier`: adaptive read timeout as a multiple of the p99
+            latency of the call type
+
+            `min_read_timeout`: lower bound for adaptive read timeouts
+
+            `min_samples`: latencies to observe before adapting
+
+            `window`: number of recent latencies kept per call type
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeouts = dict(self.DEFAULT_READ_TIMEOUTS)
+        for call_type, timeout in (read_timeouts or {}).items():
+            if call_type not in self.CALL_TYPES:
+                raise ValueError("call type should be one of %s" % ", ".join(self.CALL_TYPES))
+            self.read_timeouts[call_type] = timeout
+        self.adaptive = adaptive
+        self.multiplier = multiplier
+        self.min_read_timeout = min_read_timeout
+        self.min_samples = min_samples
+        self.latencies = dict((call_type, deque(maxlen=window)) for call_type in self.CALL_TYPES)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def call_type(req_type, path):
+        """
+        Returns:
+            The call type of a request, e.g. GET commands/123 -> status
+        """
+        segments = path.split('?', 1)[0].strip('/').split('/')
+        if segments[-1] == "logs":
+            return LOGS
+        if "results" in segments:
+            return RESULTS
+        if req_type == "GET":
+            if segments[0] == "commands" and len(segments) == 2:
+                return STATUS
+            if segments[0] == "clusters" and segments[-1] == "state":
+                return STATUS
+        elif segments[0] == "clusters":
+            return CLUSTER_MUTATION
+        return DEFAULT
+
+    def timeout(self, call_type):
+        """
+        Returns:
+            (connect, read) timeout tuple as accepted by requests
+        """
+        read = self.read_timeouts[call_type]
+        if self.adaptive:
+            p99 = self.percentile(call_type, 99)
+            if p99 is not None:
+                read = min(read, max(self.min_read_timeout, p99 * self.multiplier))
+        return (self.connect_timeout, read)
+
+    def observe(self, call_type, seconds):
+        """
+        Record the latency of a successful call
+        """
+        if self.adaptive:
+            with self.lock:
+                self.latencies[call_type].append(seconds)
+
+    def percentile(self, call_type, pct):
+        """
+        Returns:
+            The `pct` percentile of recent latencies of `call_type`, or None
+            until `min_samples` latencies have been observed
+        """
+        with self.lock:
+            samples = sorted(self.latencies[call_type])
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100.0))
+        return samples[index]
@@ -0,0 +1,201 @@
+"""
+Tracks many QDS commands at once.
+
+Command.run keeps one polling loop per command. CommandWatcher instead
+keeps a set of pending command ids and refreshes the ones that are due
+with a bounded number of concurrent requests, yielding every command as
+soon as it is seen in a terminal state. When each command is due is
+decided by a poll strategy (see qds_sdk.polling):
+
+    watcher = CommandWatcher([cmd1.id, cmd2.id, ...], concurrency=16)
+    for cmd in watcher.watch():
+        print(cmd.id, cmd.status)
+
+The QDS api has no endpoint returning the status of an arbitrary set of
+commands, so a poll round is a fan-out of GET commands/<id> requests over
+the shared pooled connection, subject to the configured rate limits.
+"""
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import Command
+from qds_sdk.polling import FixedPollStrategy
+
+
+class CommandWatcher(object):
+
+    def __init__(self, commands=None, command_class=Command, concurrency=8, poll_interval=None,
+                 poll_strategy=None):
+        """
+        Args:
+            `commands`: command ids or Command objects to track
+
+            `command_class`: Command subclass used to fetch commands given
+            by id. Command objects are fetched with their own class
+
+            `concurrency`: maximum number of status requests in flight
+
+            `poll_interval`: seconds between polls of a command, shorthand
+            for poll_strategy=FixedPollStrategy(poll_interval)
+
+            `poll_strategy`: strategy scheduling the polls of each command.
+            Defaults to the configured one
+        """
+        self.command_class = command_class
+        self.concurrency = concurrency
+        self.sleep = time.sleep
+        self.clock = time.time
+        # Worker threads do not inherit QuboleClient.activate(), carry the
+        # configuration of the creating thread over explicitly
+        self.config = Qubole.current()
+        if poll_strategy is None and poll_interval is not None:
+            poll_strategy = FixedPollStrategy(poll_interval)
+        self.poll_strategy = poll_strategy or self.config.poll_strategy or FixedPollStrategy()
+        self.schedules = {}
+        self.due = {}
+        self.classes = {}
+        self.pending = []
+        self.completed = []
+        self.lock = threading.Lock()
+        self.pool = None
+        for command in commands or []:
+            self.add(command)
+
+    def add(self, command):
+        """
+        Start tracking `command`, a command id or Command object. Commands
+        already in a terminal state are reported by the next poll without
+        being fetched again.
+        """
+        with self.lock:
+            command_class = self.command_class
+            if isinstance(command, Command):
+                if Command.is_done(command.status):
+                    self.completed.append(command)
+                    return
+                command_class = command.__class__
+                command = command.id
+            if command not in self.pending:
+                self.pending.append(command)
+                self.classes[command] = command_class
+                self.schedules[command] = self.poll_strategy.start()
+                self.due[command] = self.clock()
+
+    def poll_once(self):
+        """
+        Refresh every pending command that is due.
+
+        A status request failing after the retry policy gave up is raised
+        once the other commands of the round were refreshed. The commands
+        that completed in that round are reported by the next call.
+
+        The status requests are sent by threads kept from one call to the
+        next; call close() once done polling.
+
+        Returns:
+            List of the commands that reached a terminal state
+        """
+        completed = []
+        try:
+            for command in self._poll():
+                completed.append(command)
+        except Exception:
+            with self.lock:
+                self.completed[:0] = completed
+            raise
+        return completed
+
+    def watch(self, timeout=None):
+        """
+        Poll until all tracked commands are done, or `timeout` seconds have
+        passed, yielding each command as it completes. Commands added
+        meanwhile are picked up by the next poll round.
+
+        A status request failing after the retry policy gave up ends the
+        watch with that exception, after the commands completed in the same
+        round were yielded; the failed command stays pending.
+        """
+        deadline = self.clock() + timeout if timeout is not None else None
+        try:
+            while True:
+                for command in self._poll():
+                    yield command
+                wake = self.next_due()
+                if wake is None:
+                    return
+                now = self.clock()
+                if deadline is not None:
+                    if now >= deadline:
+                        return
+                    wake = min(wake, deadline)
+                if wake > now:
+                    self.sleep(wake - now)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stop the threads fetching statuses. They are started again by the
+        next poll.
+        """
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.terminate()
+
+    def next_due(self):
+        """
+        Returns:
+            The time, on the watcher's clock, at which the next command is
+            due to be polled, or None if nothing is being tracked
+        """
+        with self.lock:
+            if self.completed:
+                return self.clock()
+            if not self.due:
+                return None
+            return min(self.due.values())
+
+    def _poll(self):
+        now = self.clock()
+        with self.lock:
+            completed, self.completed = self.completed, []
+            ids = [id for id in self.pending if self.due[id] <= now]
+        for command in completed:
+            yield command
+        if not ids:
+            return
+
+        error = None
+        with self.lock:
+            if self.pool is None:
+                # Kept across rounds, until close()
+                self.pool = ThreadPool(self.concurrency)
+            pool = self.pool
+        for id, command, e in pool.imap_unordered(self._find, ids):
+            if e is not None:
+                # The command stays pending and due; keep refreshing
+                # the others and raise once they were reported
+                error = error or e
+                continue
+            with self.lock:
+                schedule = self.schedules[id]
+                if not Command.is_done(command.status):
+                    self.due[id] = self.clock() + schedule.next_delay(command.status)
+                    continue
+                self.pending.remove(id)
+                del self.schedules[id], self.due[id], self.classes[id]
+            if Command.is_success(command.status):
+                schedule.finish()
+            yield command
+        if error is not None:
+            raise error
+
+    def _find(self, id):
+        try:
+            with self.config.activate():
+                return id, self.classes[id].find(id), None
+        except Exception as e:
+            return id, None, e
@@ -5,6 +5,9 @@ from setuptools import setup
 INSTALL_REQUIRES = ['requests >=1.0.3', 'boto >=2.1.1', 'six >=1.2.0', 'urllib3 >= 1.0.2', 'inflection >= 0.3.1']
 if sys.version_info < (2, 7, 0):
     INSTALL_REQUIRES.append('argparse>=1.1')
+    INSTALL_REQUIRES.append('ordereddict>=1.1')
+if sys.version_info < (3, 2, 0):
+    INSTALL_REQUIRES.append('futures>=3.0')
 
 
 def read(fname):
@@ -22,6 +25,9 @@ setup(
     packages=['qds_sdk', 'qds_sdk/cloud'],
     scripts=['bin/qds.py'],
     install_requires=INSTALL_REQUIRES,
+    extras_require={'async': ['aiohttp >= 3.0'],
+                    'http2': ['httpx[http2] >= 0.18'],
+                    'arrow': ['pyarrow >= 1.0']},
     long_description=read('README.rst'),
     classifiers=[
         "Environment :: Console",
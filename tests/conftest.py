@@ -0,0 +1,6 @@
+import sys
+
+# async/await is a syntax error before Python 3.5
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append("test_async_connection.py")
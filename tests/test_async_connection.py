@@ -0,0 +1,141 @@
+from __future__ import print_function
+import sys
+import os
+import asyncio
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import HiveCommand
+from qds_sdk.exception import ResourceNotFound
+from qds_sdk.exception import RetryWithDelay
+from qds_sdk.async_connection import AsyncConnection
+
+
+class FakeResponse(object):
+    def __init__(self, status, text):
+        self.status = status
+        self._text = text
+        self.headers = {}
+        self.url = "https://qds.example/api/v1.2/commands"
+
+    async def text(self):
+        return self._text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeSession(object):
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return FakeResponse(*self.responses.pop(0))
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestAsyncConnection(unittest.TestCase):
+    def setUp(self):
+        Qubole.configure(api_token='dummy_token', poll_interval=1)
+
+    def tearDown(self):
+        Qubole.cached_async_agents = {}
+
+    def test_async_agent_cached_per_version(self):
+        self.assertIs(Qubole.async_agent(), Qubole.async_agent())
+        self.assertIsNot(Qubole.async_agent(), Qubole.async_agent(version="v2"))
+        self.assertTrue(Qubole.async_agent(version="v2").rest_url.endswith("/v2"))
+
+    def test_post(self):
+        session = FakeSession([(200, '{"id": 123, "status": "waiting"}')])
+        with patch.object(AsyncConnection, '_get_session', return_value=session):
+            cmd = run(HiveCommand.create_async(query="show tables"))
+        self.assertEqual(cmd.id, 123)
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(method, "POST")
+        self.assertEqual(url, "https://api.qubole.com/api/v1.2/commands")
+        self.assertEqual(kwargs['headers']['X-AUTH-TOKEN'], 'dummy_token')
+
+    def test_error_mapping(self):
+        session = FakeSession([(404, 'not found')])
+        with patch.object(AsyncConnection, '_get_session', return_value=session):
+            with self.assertRaises(ResourceNotFound):
+                run(HiveCommand.cancel_id_async(123))
+
+    def test_get_retries(self):
+        session = FakeSession([(503, 'busy'), (200, '{"id": 123, "status": "done"}')])
+
+        async def no_sleep(delay):
+            pass
+
+        with patch.object(AsyncConnection, '_get_session', return_value=session):
+            with patch('asyncio.sleep', no_sleep):
+                cmd = run(HiveCommand.find_async(123))
+        self.assertEqual(cmd.status, "done")
+        self.assertEqual(len(session.calls), 2)
+
+    def test_put_does_not_retry(self):
+        session = FakeSession([(503, 'busy')])
+        with patch.object(AsyncConnection, '_get_session', return_value=session):
+            with self.assertRaises(RetryWithDelay):
+                run(HiveCommand.cancel_id_async(123))
+
+    def test_run(self):
+        statuses = ["waiting", "running", "done"]
+        calls = []
+
+        async def api_call(req_type, path, data=None, params=None):
+            calls.append((req_type, path, data))
+            return {"id": 123, "status": statuses.pop(0)}
+
+        async def no_sleep(delay):
+            pass
+
+        conn = Qubole.async_agent()
+        with patch.object(conn, '_api_call', api_call):
+            with patch('asyncio.sleep', no_sleep):
+                cmd = run(HiveCommand.run_async(query="show tables", print_logs_live=True))
+        self.assertEqual(cmd.status, "done")
+        self.assertEqual(calls[0], ("POST", "commands", {"query": "show tables", "command_type": "HiveCommand"}))
+        self.assertEqual(calls[-1], ("GET", "commands/123", None))
+
+    def test_session_of_previous_loop_closed(self):
+        closed = []
+
+        class ClientSession(object):
+            def __init__(self, **kwargs):
+                pass
+
+            async def close(self):
+                closed.append(self)
+
+        aiohttp = Mock(ClientSession=ClientSession)
+        conn = Qubole.async_agent()
+        with patch.dict(sys.modules, {"aiohttp": aiohttp}):
+            first = run(conn._get_session())
+
+            async def twice():
+                return await conn._get_session(), await conn._get_session()
+            second, again = run(twice())
+        self.assertIsNot(first, second)
+        self.assertIs(second, again)
+        self.assertEqual(closed, [first])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import print_function
+import sys
+import os
+import shutil
+import tempfile
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.qubole import QuboleAuth
+from qds_sdk.commands import HiveCommand
+from qds_sdk.cache import CommandCache
+from test_connection import StubResponse
+from test_connection import stub_connection
+
+
+class TestCommandCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "cache", "commands.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_persistent(self):
+        cache = CommandCache(self.path)
+        cache.put("a", u"caf\u00e9")
+        cache.close()
+        cache = CommandCache(self.path)
+        self.assertEqual(cache.get("a"), u"caf\u00e9")
+        self.assertEqual(cache.size(), 5)
+        self.assertIsNone(cache.get("b"))
+        cache.clear()
+        self.assertIsNone(cache.get("a"))
+
+    def test_lru_eviction(self):
+        cache = CommandCache(self.path, max_bytes=10)
+        ticks = [0]
+
+        def clock():
+            ticks[0] += 1
+            return ticks[0]
+        cache.clock = clock
+        cache.put("a", "1234")
+        cache.put("b", "1234")
+        cache.get("a")
+        cache.put("c", "1234")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1234")
+        self.assertEqual(cache.get("c"), "1234")
+        cache.put("d", "x" * 11)
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.size(), 8)
+
+
+class TestCachedCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CommandCache(":memory:")
+        Qubole.configure(api_token="dummy_token", command_cache=self.cache)
+
+    def tearDown(self):
+        Qubole.configure(api_token="dummy_token")
+
+    def fetch(self, responses, func):
+        conn = stub_connection(responses)
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            result = func()
+        return result, [url.rsplit("/", 2)[-2:] for method, url, kwargs in conn.session.calls]
+
+    def test_find(self):
+        running = StubResponse(body={"id": 1, "status": "running"})
+        done = StubResponse(body={"id": 1, "status": "done"})
+        cmd, calls = self.fetch([running, done], lambda: [HiveCommand.find(1), HiveCommand.find(1)])
+        self.assertEqual([c.status for c in cmd], ["running", "done"])
+        cmd, calls = self.fetch([], lambda: HiveCommand.find(1))
+        self.assertEqual((cmd.status, calls), ("done", []))
+        self.assertIsInstance(cmd, HiveCommand)
+
+    def test_log_id(self):
+        responses = [StubResponse(body={"id": 2, "status": "running"}), StubResponse(text="partial"),
+                     StubResponse(body={"id": 2, "status": "done"}), StubResponse(text="full log")]
+        logs, calls = self.fetch(responses, lambda: [HiveCommand.get_log_id(2), HiveCommand.get_log_id(2)])
+        self.assertEqual(logs, ["partial", "full log"])
+        self.assertEqual(calls, [["commands", "2"], ["2", "logs"], ["commands", "2"], ["2", "logs"]])
+        logs, calls = self.fetch([], lambda: [HiveCommand.get_log_id(2), HiveCommand.get_jobs_id(2)][0])
+        self.assertEqual(logs, "full log")
+        self.assertEqual(calls, [["2", "jobs"]])
+
+    def test_get_log(self):
+        cmd = HiveCommand({"id": 3, "status": "error", "meta_data": {"logs_resource": "commands/3/logs"}})
+        log, calls = self.fetch([StubResponse(text="log")], lambda: [cmd.get_log(), cmd.get_log()])
+        self.assertEqual((log, len(calls)), (["log", "log"], 1))
+        cmd.attributes["status"] = "running"
+        log, calls = self.fetch([StubResponse(text="other")], cmd.get_log)
+        self.assertEqual(log, "other")
+
+    def test_tenants_do_not_share_entries(self):
+        done = StubResponse(body={"id": 4, "status": "done"})
+        conn = stub_connection([done])
+        conn.auth = QuboleAuth("tenant_a")
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            HiveCommand.find(4)
+        other = stub_connection([StubResponse(body={"id": 4, "status": "error"})])
+        other.auth = QuboleAuth("tenant_b")
+        with patch("qds_sdk.commands.Qubole.agent", return_value=other):
+            self.assertEqual(HiveCommand.find(4).status, "error")
+        self.assertEqual(len(other.session.calls), 1)
+        self.assertNotEqual(CommandCache.key(conn, "commands/4"), CommandCache.key(other, "commands/4"))
+
+
+if __name__ == '__main__':
+    unittest.main()
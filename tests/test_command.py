@@ -13,6 +13,14 @@ import qds_sdk
 from qds_sdk.connection import Connection
 from test_base import print_command
 from test_base import QdsCliTestCase
+from test_connection import StubResponse
+from test_connection import stub_connection
+import json
+import time
+import threading
+import io
+import shutil
+import tempfile
 
 
 class TestCommandCheck(QdsCliTestCase):
@@ -1701,5 +1709,422 @@ class TestGetResultsCommand(QdsCliTestCase):
             qds.main()
 
 
+class TestCreateMany(unittest.TestCase):
+
+    def setUp(self):
+        qds_sdk.qubole.Qubole.configure(api_token='dummy_token')
+        self.conn = stub_connection()
+        self.conn.session.post = self.post
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = 0
+
+    def post(self, url, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        data = json.loads(kwargs['data'])
+        if data['query'] == 'bad':
+            return StubResponse(422, {"error": "bad query"})
+        return StubResponse(body={"id": int(data['query'].split()[-1]), "status": "waiting"})
+
+    def test_order_and_failures(self):
+        batch = [{"query": "select %d" % i} for i in range(20)]
+        batch[5] = {"query": "bad"}
+        with patch("qds_sdk.commands.Qubole.agent", return_value=self.conn):
+            cmds = qds_sdk.commands.HiveCommand.create_many(batch, concurrency=4)
+        self.assertEqual(len(cmds), 20)
+        self.assertIsInstance(cmds[5], qds_sdk.exception.ResourceInvalid)
+        self.assertEqual([c.id for i, c in enumerate(cmds) if i != 5], [i for i in range(20) if i != 5])
+        self.assertLessEqual(self.peak, 4)
+        self.assertGreater(self.peak, 1)
+        self.assertEqual(batch[0], {"query": "select 0"})
+
+    def test_empty(self):
+        self.assertEqual(qds_sdk.commands.HiveCommand.create_many([]), [])
+
+
+class TestStreamLogs(unittest.TestCase):
+
+    def setUp(self):
+        qds_sdk.qubole.Qubole.configure(api_token='dummy_token')
+
+    def log_response(self, text, err_length, tmp_length):
+        return StubResponse(headers={'err_length': str(err_length), 'tmp_length': str(tmp_length)},
+                            text=text)
+
+    def command(self, status):
+        return qds_sdk.commands.HiveCommand({"id": 123, "status": status,
+                                             "meta_data": {"logs_resource": "commands/123/logs"}})
+
+    def test_only_new_bytes(self):
+        # Once the err file grows, the whole tmp file is returned ahead of
+        # the new err bytes
+        responses = [self.log_response(u"caf\u00e9 1\n", 0, 8),
+                     self.log_response(u"stage 2\n", 0, 8),
+                     self.log_response(u"caf\u00e9 1\nstage 2\nstage 3\nE1\n", 3, 24),
+                     self.log_response(u"", 0, 0)]
+        conn = stub_connection(responses)
+        finds = [self.command("running"), self.command("running"), self.command("done")]
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            with patch.object(qds_sdk.commands.HiveCommand, "find", side_effect=finds):
+                with patch("qds_sdk.commands.time.sleep") as sleep:
+                    chunks = list(self.command("running").stream_logs(interval=2))
+        self.assertEqual(chunks, [u"caf\u00e9 1\n", u"stage 2\n", u"stage 3\nE1\n"])
+        sleep.assert_called_with(2)
+        params = [kwargs['params'] for method, url, kwargs in conn.session.calls]
+        self.assertEqual(params, [{'err_file_processed': 0, 'tmp_file_processed': 0},
+                                  {'err_file_processed': 0, 'tmp_file_processed': 8},
+                                  {'err_file_processed': 0, 'tmp_file_processed': 16},
+                                  {'err_file_processed': 3, 'tmp_file_processed': 24}])
+
+    def test_no_follow(self):
+        conn = stub_connection([self.log_response(u"line\n", 0, 5)])
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            self.assertEqual(list(self.command("running").stream_logs(follow=False)), [u"line\n"])
+        self.assertEqual(len(conn.session.calls), 1)
+
+    def test_missing_length_headers(self):
+        conn = stub_connection([StubResponse(text=u"full log")])
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            self.assertEqual(list(self.command("done").stream_logs()), [])
+
+
+class FakeKey(object):
+
+    def __init__(self, bucket, name, data):
+        self.bucket = bucket
+        self.name = name
+        self.data = data
+        self.size = len(data)
+        self.etag = '"%x"' % (hash(data) & 0xffffffff)
+        self.offset = None
+
+    def get_contents_as_string(self, headers=None):
+        self.bucket.started += 1
+        data = self.data
+        if headers is not None:
+            start, end = headers['Range'][len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+            self.bucket.ranges.append((self.name, int(start), int(end)))
+        delay = self.bucket.delays.get(self.name)
+        if delay:
+            time.sleep(delay)
+        return data
+
+    def get_contents_to_file(self, fp):
+        fp.write(self.data)
+
+    def open_read(self, headers=None):
+        self.offset = 0
+        if headers:
+            self.bucket.requests.append((self.name, headers))
+            self.offset = int(headers['Range'][len('bytes='):].rstrip('-'))
+
+    def read(self, size):
+        if self.bucket.fail_after.get(self.name) == 0:
+            del self.bucket.fail_after[self.name]
+            raise IOError("connection reset")
+        if self.name in self.bucket.fail_after:
+            self.bucket.fail_after[self.name] -= 1
+        data = self.data[self.offset:self.offset + size]
+        self.offset += len(data)
+        return data
+
+    def close(self):
+        self.bucket.closed += 1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.offset >= len(self.data):
+            raise StopIteration
+        chunk = self.data[self.offset:self.offset + 8192]
+        self.offset += 8192
+        return chunk
+
+    next = __next__
+
+
+class FakeBucket(object):
+
+    def __init__(self, files):
+        self.files = files
+        self.ranges = []
+        self.delays = {}
+        self.started = 0
+        self.closed = 0
+        self.requests = []
+        self.fail_after = {}
+
+    def list(self, prefix):
+        return [FakeKey(self, name, self.files[name]) for name in sorted(self.files)
+                if name.startswith(prefix)]
+
+    def get_key(self, name):
+        return FakeKey(self, name, self.files[name]) if name in self.files else None
+
+    def new_key(self, name):
+        return FakeKey(self, name, self.files[name])
+
+
+class TestDownloadToLocal(unittest.TestCase):
+
+    def setUp(self):
+        self.files = {"res/": b"",
+                      "res/000000_0": b"a\x01" * 5000 + b"\n",
+                      "res/000001_0": b"",
+                      "res/000002_0": u"caf\u00e9\x01na\u00efve\n".encode('utf8') * 3000,
+                      "res/_tmp_$folder$": b"junk"}
+        self.bucket = FakeBucket(self.files)
+        self.boto_conn = Mock()
+        self.boto_conn.get_bucket.return_value = self.bucket
+
+    def download(self, path, **kwargs):
+        fp = io.BytesIO()
+        qds_sdk.commands._download_to_local(self.boto_conn, path, fp, -1, **kwargs)
+        return fp.getvalue()
+
+    def test_parallel_matches_serial(self):
+        self.bucket.delays = {"res/000000_0": 0.05}
+        serial = self.download("s3://bucket/res/")
+        self.assertEqual(self.download("s3://bucket/res/", concurrency=4), serial)
+        self.assertNotIn(b"junk", serial)
+
+    def test_parallel_with_delim(self):
+        expected = b"".join(self.files[name] for name in ("res/000000_0", "res/000002_0"))
+        parallel = self.download("s3://bucket/res/", delim="\t", concurrency=4)
+        self.assertEqual(parallel, expected.replace(b"\x01", b"\t"))
+
+    def test_serial_with_delim(self):
+        expected = b"".join(self.files[name] for name in ("res/000000_0", "res/000002_0"))
+        self.assertEqual(self.download("s3://bucket/res/", delim=","), expected.replace(b"\x01", b","))
+        self.assertEqual(self.bucket.closed, 4)
+
+    def test_read_iteratively_small_buffers(self):
+        # Buffer boundaries fall inside multi-byte characters
+        key = self.bucket.get_key("res/000002_0")
+        raw = io.BytesIO()
+        fp = io.TextIOWrapper(raw, encoding='utf8')
+        qds_sdk.commands._read_iteratively(key, fp, u"\u00a6", buffer_size=7)
+        fp.flush()
+        self.assertEqual(raw.getvalue().decode('utf8'),
+                         self.files["res/000002_0"].decode('utf8').replace(u"\x01", u"\u00a6"))
+
+    def test_delimiter_translator(self):
+        data = b"a\x01b\x01\xc3\xa9\n"
+        self.assertEqual(qds_sdk.commands._delimiter_translator("\t")(data), b"a\tb\t\xc3\xa9\n")
+        self.assertEqual(qds_sdk.commands._delimiter_translator("||")(data), b"a||b||\xc3\xa9\n")
+
+    def test_single_file(self):
+        self.assertEqual(self.download("s3://bucket/res/000002_0", concurrency=3),
+                         self.files["res/000002_0"])
+
+    def test_byte_ranges(self):
+        # Range boundaries fall inside multi-byte characters
+        data = self.files["res/000002_0"]
+        fp = io.BytesIO()
+        qds_sdk.commands._download_parallel(self.bucket, [self.bucket.get_key("res/000002_0")],
+                                            fp, delim=",", concurrency=3, part_size=1001)
+        self.assertEqual(fp.getvalue().decode('utf8'),
+                         data.decode('utf8').replace(u"\x01", u","))
+        self.assertEqual(len(self.bucket.ranges), (len(data) + 1000) // 1001)
+        self.assertEqual(self.bucket.ranges[-1][2], len(data) - 1)
+
+    def test_text_file_object(self):
+        raw = io.BytesIO()
+        fp = io.TextIOWrapper(raw, encoding='utf8')
+        fp.write(u"col1\tcol2\n")
+        keys = self.bucket.list("res/0")
+        qds_sdk.commands._download_parallel(self.bucket, keys, fp, delim="\t", concurrency=2)
+        fp.flush()
+        self.assertTrue(raw.getvalue().startswith(b"col1\tcol2\na\ta\t"))
+
+    def test_reorder_buffer_is_bounded(self):
+        files = dict(("res/%06d_0" % i, b"%d\n" % i) for i in range(20))
+        bucket = FakeBucket(files)
+        bucket.delays = {"res/000000_0": 0.2}
+        started_at_first_write = []
+
+        class Output(io.BytesIO):
+            def write(self, data):
+                if not started_at_first_write:
+                    started_at_first_write.append(bucket.started)
+                return io.BytesIO.write(self, data)
+
+        fp = Output()
+        qds_sdk.commands._download_parallel(bucket, bucket.list("res/"), fp, concurrency=2)
+        self.assertEqual(fp.getvalue(), b"".join(b"%d\n" % i for i in range(20)))
+        self.assertLessEqual(started_at_first_write[0], 4)
+
+    def test_reorder_buffer_is_bounded_by_bytes(self):
+        files = dict(("res/%06d_0" % i, b"%09d\n" % i) for i in range(20))
+        bucket = FakeBucket(files)
+        bucket.delays = {"res/000000_0": 0.2}
+        started_at_first_write = []
+
+        class Output(io.BytesIO):
+            def write(self, data):
+                if not started_at_first_write:
+                    started_at_first_write.append(bucket.started)
+                return io.BytesIO.write(self, data)
+
+        fp = Output()
+        qds_sdk.commands._download_parallel(bucket, bucket.list("res/"), fp, concurrency=8,
+                                            max_buffer_bytes=30)
+        self.assertEqual(fp.getvalue(), b"".join(b"%09d\n" % i for i in range(20)))
+        self.assertLessEqual(started_at_first_write[0], 3)
+
+
+class TestIterResults(unittest.TestCase):
+
+    def setUp(self):
+        qds_sdk.qubole.Qubole.configure(api_token='dummy_token')
+        self.cmd = qds_sdk.commands.HiveCommand({"id": 123, "status": "done",
+                                                 "meta_data": {"results_resource": "commands/123/results"}})
+
+    def iter_results(self, body, **kwargs):
+        conn = stub_connection([StubResponse(body=body)])
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            return list(self.cmd.iter_results(**kwargs))
+
+    def test_inline(self):
+        batches = self.iter_results({"inline": True, "results": u"a\tb\r\nc\u00e9\td\r\ne\tf\r\n"},
+                                    batch_size=2)
+        self.assertEqual(batches, [[[u"a", u"b"], [u"c\u00e9", u"d"]], [[u"e", u"f"]]])
+
+    def test_s3(self):
+        row = u"caf\u00e9\x01na\u00efve\x01%d\n"
+        files = {"res/000000_0": "".join(row % i for i in range(2000)).encode('utf8'),
+                 "res/000001_0": "".join(row % i for i in range(2000, 2500)).encode('utf8'),
+                 "res/_tmp_$folder$": b"junk"}
+        boto_conn = Mock()
+        boto_conn.get_bucket.return_value = FakeBucket(files)
+        with patch("qds_sdk.commands._connect_s3", return_value=boto_conn):
+            with patch.object(qds_sdk.commands.Command, "find",
+                              return_value=qds_sdk.commands.Command({"num_result_dir": -1})):
+                batches = self.iter_results({"inline": False, "result_location": ["s3://bucket/res/"]},
+                                            batch_size=1000)
+        self.assertEqual([len(batch) for batch in batches], [1000, 1000, 500])
+        rows = [row for batch in batches for row in batch]
+        self.assertEqual(rows[0], [u"caf\u00e9", u"na\u00efve", u"0"])
+        self.assertEqual([int(row[2]) for row in rows], list(range(2500)))
+
+    def test_named_columns(self):
+        qlog = json.dumps({"QBOL-QUERY-SCHEMA": {"-1": [{"ColumnName": "t.a"}, {"ColumnName": "t.b"}]}})
+        batches = self.iter_results({"inline": True, "results": "1\t2\n"}, qlog=qlog)
+        self.assertEqual(batches, [[{"t.a": "1", "t.b": "2"}]])
+
+    def test_empty(self):
+        self.assertEqual(self.iter_results({"inline": True, "results": ""}), [])
+
+
+class TestWriteHeaders(unittest.TestCase):
+
+    def test_default_schema(self):
+        fp = io.StringIO()
+        qlog = json.dumps({"QBOL-QUERY-SCHEMA": {"-1": [{"ColumnName": "a"}, {"ColumnName": "b"}]}})
+        qds_sdk.commands.write_headers(qlog, fp)
+        self.assertEqual(fp.getvalue(), u"a\tb\n")
+
+    def test_statement_schema(self):
+        fp = io.StringIO()
+        qlog = json.dumps({"QBOL-QUERY-SCHEMA": {"2": [{"ColumnName": "x"}]}})
+        qds_sdk.commands.write_headers(qlog, fp)
+        self.assertEqual(fp.getvalue(), u"x\n")
+
+    def test_no_schema(self):
+        fp = io.StringIO()
+        qds_sdk.commands.write_headers(json.dumps({"QBOL-QUERY-SCHEMA": None}), fp)
+        self.assertEqual(fp.getvalue(), u"")
+
+
+class TestDownloadResumable(unittest.TestCase):
+
+    def setUp(self):
+        self.files = {"res/000000_0": u"caf\u00e9\x01%d\n".encode('utf8') * 500,
+                      "res/000001_0": b"",
+                      "res/000002_0": b"x\x01y\n" * 1000}
+        self.bucket = FakeBucket(self.files)
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "result.tsv")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def expected(self, delim=b"\t"):
+        return b"".join(self.files[name] for name in sorted(self.files)).replace(b"\x01", delim)
+
+    def download(self, delim="\t"):
+        qds_sdk.commands._download_resumable(self.bucket.list("res/"), self.path, delim=delim,
+                                             buffer_size=100, checkpoint_bytes=300)
+
+    def output(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_complete_download(self):
+        self.download()
+        self.assertEqual(self.output(), self.expected())
+        self.assertFalse(os.path.exists(self.path + ".manifest"))
+        self.assertEqual(self.bucket.requests, [])
+
+    def test_resume_partial_part(self):
+        self.bucket.fail_after = {"res/000002_0": 25}
+        self.assertRaises(IOError, self.download, "||")
+        with open(self.path + ".manifest") as f:
+            manifest = json.load(f)
+        self.assertEqual([part["done"] for part in manifest["parts"]], [True, True, False])
+        self.assertEqual(manifest["parts"][2]["read"], 2400)
+        # Bytes past the last checkpoint are fetched again
+        self.assertGreater(len(self.output()), manifest["output_size"])
+
+        self.download("||")
+        self.assertEqual(self.output(), self.expected(b"||"))
+        self.assertEqual(self.bucket.requests, [("res/000002_0", {'Range': 'bytes=2400-',
+                                                                  'If-Match': self.bucket.get_key("res/000002_0").etag})])
+        self.assertFalse(os.path.exists(self.path + ".manifest"))
+
+    def test_completed_parts_are_skipped(self):
+        self.bucket.fail_after = {"res/000002_0": 0}
+        self.assertRaises(IOError, self.download)
+        reads = []
+        original = FakeKey.read
+
+        def read(key, size):
+            reads.append(key.name)
+            return original(key, size)
+
+        with patch.object(FakeKey, "read", read):
+            self.download()
+        self.assertEqual(set(reads), set(["res/000002_0"]))
+        self.assertEqual(self.output(), self.expected())
+
+    def test_changed_results_start_over(self):
+        self.bucket.fail_after = {"res/000002_0": 3}
+        self.assertRaises(IOError, self.download)
+        self.files["res/000000_0"] = b"new\x01data\n"
+        self.download()
+        self.assertEqual(self.output(), self.expected())
+        self.assertEqual(self.bucket.requests, [])
+
+    def test_download_results(self):
+        cmd = qds_sdk.commands.HiveCommand({"id": 123, "status": "done",
+                                            "meta_data": {"results_resource": "commands/123/results"}})
+        conn = stub_connection([StubResponse(body={"inline": False, "result_location": ["s3://bucket/res/"]})])
+        boto_conn = Mock()
+        boto_conn.get_bucket.return_value = self.bucket
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            with patch("qds_sdk.commands._connect_s3", return_value=boto_conn):
+                with patch.object(qds_sdk.commands.Command, "find",
+                                  return_value=qds_sdk.commands.Command({"num_result_dir": -1})):
+                    cmd.download_results(self.path, delim=",")
+        self.assertEqual(self.output(), self.expected(b","))
+        self.assertEqual(conn.session.calls[0][2]['params'], {'inline': False})
+
+
 if __name__ == '__main__':
     unittest.main()
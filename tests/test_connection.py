@@ -0,0 +1,95 @@
+from __future__ import print_function
+import sys
+import json
+import logging
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.connection import Connection
+
+
+class StubResponse(object):
+    def __init__(self, status_code=200, body=None, headers=None, text=None):
+        self.status_code = status_code
+        if text is None:
+            text = json.dumps(body) if body is not None else '{}'
+        self.text = text
+        self.content = self.text.encode('utf8')
+        self.headers = headers or {}
+        self.url = "https://api.qubole.com/api/v1.2/commands"
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class StubSession(object):
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.calls = []
+
+    def _respond(self, method, url, kwargs):
+        self.calls.append((method, url, kwargs))
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return StubResponse()
+
+    def get(self, url, **kwargs):
+        return self._respond("GET", url, kwargs)
+
+    def post(self, url, **kwargs):
+        return self._respond("POST", url, kwargs)
+
+    def put(self, url, **kwargs):
+        return self._respond("PUT", url, kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._respond("DELETE", url, kwargs)
+
+
+class StubConnection(Connection):
+    # Other test modules replace Connection._api_call and _api_call_raw with
+    # mocks; pin the real implementations as they were at import time.
+    _api_call = Connection._api_call
+    _api_call_raw = Connection._api_call_raw
+
+
+def stub_connection(responses=None):
+    conn = StubConnection(None, "https://api.qubole.com/api/v1.2", False)
+    conn.session = StubSession(responses)
+    return conn
+
+
+class TestPayloadLogging(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("qds_connection")
+        self.level = self.logger.level
+
+    def tearDown(self):
+        self.logger.setLevel(self.level)
+
+    def test_body_serialized_once_when_logging_disabled(self):
+        self.logger.setLevel(logging.WARN)
+        conn = stub_connection()
+        with patch('qds_sdk.connection.json.dumps', wraps=json.dumps) as dumps:
+            conn.post("commands", data={"query": "show tables"})
+        self.assertEqual(dumps.call_count, 1)
+        method, url, kwargs = conn.session.calls[0]
+        self.assertEqual(kwargs['data'], '{"query": "show tables"}')
+
+    def test_body_serialized_once_when_logging_enabled(self):
+        self.logger.setLevel(logging.INFO)
+        conn = stub_connection()
+        with patch('qds_sdk.connection.json.dumps', wraps=json.dumps) as dumps:
+            with patch.object(self.logger, 'info') as info:
+                conn.post("commands", data={"query": "show tables"})
+        self.assertEqual(dumps.call_count, 1)
+        info.assert_any_call("Payload: %s", '{"query": "show tables"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+from __future__ import print_function
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import HiveCommand, ShellCommand, SparkCommand
+from qds_sdk.dag import CommandDag
+from qds_sdk.polling import FixedPollStrategy
+
+
+class FakeQds(object):
+    """Commands finish after `polls` status fetches with the status of `outcome`"""
+
+    def __init__(self, polls=2):
+        self.polls = polls
+        self.commands = {}
+        self.created = []
+        self.max_running = {}
+        self.lock = threading.Lock()
+
+    def patch(self, command_class):
+        return [patch.object(command_class, "create", side_effect=self.creator(command_class)),
+                patch.object(command_class, "find", side_effect=self.finder(command_class))]
+
+    def running(self, label):
+        return len([state for state in self.commands.values()
+                    if state["label"] == label and state["status"] == "running"])
+
+    def creator(self, command_class):
+        def create(**kwargs):
+            with self.lock:
+                id = len(self.commands) + 1
+                label = kwargs.get("label") or "default"
+                self.commands[id] = {"polls": self.polls, "status": "running", "label": label,
+                                     "outcome": kwargs.pop("outcome", "done")}
+                self.created.append((command_class.__name__, kwargs))
+                self.max_running[label] = max(self.max_running.get(label, 0), self.running(label))
+            return command_class({"id": id, "status": "waiting"})
+        return create
+
+    def finder(self, command_class):
+        def find(id):
+            with self.lock:
+                state = self.commands[id]
+                state["polls"] -= 1
+                if state["polls"] <= 0:
+                    state["status"] = state["outcome"]
+                return command_class({"id": id, "status": state["status"]})
+        return find
+
+
+class TestCommandDag(unittest.TestCase):
+
+    def setUp(self):
+        Qubole.configure(api_token="dummy_token")
+        self.qds = FakeQds()
+        self.patches = []
+        for command_class in (HiveCommand, ShellCommand, SparkCommand):
+            self.patches.extend(self.qds.patch(command_class))
+        for p in self.patches:
+            p.start()
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmp)
+
+    def dag(self, **kwargs):
+        dag = CommandDag(poll_strategy=FixedPollStrategy(0), **kwargs)
+        dag.sleep = lambda seconds: None
+        return dag
+
+    def test_dependencies_run_in_order(self):
+        dag = self.dag()
+        dag.add("extract", HiveCommand, query="extract")
+        dag.add("clean", SparkCommand, depends_on=["extract"], sql="clean")
+        dag.add("stats", HiveCommand, depends_on=["extract"], query="stats")
+        dag.add("publish", ShellCommand, depends_on=["clean", "stats"], inline="publish")
+        results = dag.run()
+        self.assertEqual(sorted(results), ["clean", "extract", "publish", "stats"])
+        self.assertTrue(all(cmd.status == "done" for cmd in results.values()))
+        self.assertEqual(self.qds.created[0], ("HiveCommand", {"query": "extract"}))
+        self.assertEqual(self.qds.created[-1], ("ShellCommand", {"inline": "publish"}))
+        self.assertEqual(list(results)[0], "extract")
+        self.assertEqual(list(results)[-1], "publish")
+
+    def test_independent_branches_run_in_parallel(self):
+        dag = self.dag()
+        for i in range(3):
+            dag.add("n%d" % i, HiveCommand, query="q%d" % i)
+        dag.run()
+        self.assertEqual(self.qds.max_running["default"], 3)
+
+    def test_concurrency_per_label(self):
+        dag = self.dag(concurrency={"etl": 2})
+        for i in range(5):
+            dag.add("etl%d" % i, HiveCommand, query="q%d" % i, label="etl")
+        for i in range(3):
+            dag.add("adhoc%d" % i, HiveCommand, query="q%d" % i, label="adhoc")
+        results = dag.run()
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.qds.max_running["etl"], 2)
+        self.assertEqual(self.qds.max_running["adhoc"], 3)
+
+    def test_callable_arguments_see_upstream(self):
+        dag = self.dag()
+        dag.add("extract", HiveCommand, query="extract")
+        dag.add("load", HiveCommand, depends_on=["extract"],
+                query=lambda upstream: "load after %s" % upstream["extract"].id)
+        dag.run()
+        self.assertEqual(self.qds.created[1], ("HiveCommand", {"query": "load after 1"}))
+
+    def test_failure_skips_dependents(self):
+        dag = self.dag()
+        dag.add("extract", HiveCommand, query="extract", outcome="error")
+        dag.add("load", HiveCommand, depends_on=["extract"], query="load")
+        dag.add("report", HiveCommand, depends_on=["load"], query="report")
+        dag.add("other", HiveCommand, query="other")
+        results = dag.run()
+        self.assertEqual(results["extract"].status, "error")
+        self.assertEqual(results["other"].status, "done")
+        self.assertEqual(dag.skipped, ["load", "report"])
+        self.assertEqual(len(self.qds.created), 2)
+
+    def test_add_validates_graph(self):
+        dag = self.dag()
+        dag.add("a", HiveCommand, query="a")
+        self.assertRaises(ValueError, dag.add, "a", HiveCommand, query="a")
+        self.assertRaises(ValueError, dag.add, "b", HiveCommand, depends_on=["c"], query="b")
+        self.assertRaises(ValueError, dag.add, "b", dict)
+
+    def test_checkpoint_resume(self):
+        path = os.path.join(self.tmp, "dag.json")
+        with open(path, "w") as f:
+            json.dump({"nodes": {
+                "extract": {"id": 101, "status": "done", "label": None},
+                "clean": {"id": 102, "status": "running", "label": None},
+                "stats": {"id": 103, "status": "error", "label": None},
+            }}, f)
+        self.qds.commands[101] = {"polls": 0, "status": "done", "label": "default", "outcome": "done"}
+        self.qds.commands[102] = {"polls": 1, "status": "running", "label": "default", "outcome": "done"}
+
+        dag = self.dag(checkpoint=path)
+        dag.add("extract", HiveCommand, query="extract")
+        dag.add("clean", HiveCommand, depends_on=["extract"], query="clean")
+        dag.add("stats", HiveCommand, depends_on=["extract"], query="stats")
+        dag.add("publish", HiveCommand, depends_on=["clean", "stats"], query="publish")
+        results = dag.run()
+
+        self.assertEqual(results["extract"].id, 101)
+        self.assertEqual(results["clean"].id, 102)
+        self.assertEqual([kwargs["query"] for name, kwargs in self.qds.created], ["stats", "publish"])
+        with open(path) as f:
+            saved = json.load(f)["nodes"]
+        self.assertEqual(sorted(saved), ["clean", "extract", "publish", "stats"])
+        self.assertTrue(all(entry["status"] == "done" for entry in saved.values()))
+
+    def test_checkpoint_records_progress(self):
+        path = os.path.join(self.tmp, "dag.json")
+        dag = self.dag(checkpoint=path)
+        dag.add("extract", HiveCommand, query="extract")
+        dag.add("load", HiveCommand, depends_on=["extract"], query="load")
+        runner = dag.iter_run()
+        name, cmd = next(runner)
+        self.assertEqual(name, "extract")
+        with open(path) as f:
+            saved = json.load(f)["nodes"]
+        self.assertEqual(saved, {"extract": {"id": 1, "status": "done", "label": None}})
+        self.assertEqual([name for name, cmd in runner], ["load"])
+        self.assertFalse(os.path.exists(path + ".tmp"))
+
+
+if __name__ == '__main__':
+    unittest.main()
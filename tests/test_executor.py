@@ -0,0 +1,137 @@
+from __future__ import print_function
+import sys
+import threading
+import time
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from concurrent.futures import as_completed
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import HiveCommand
+from qds_sdk.exception import BadRequest
+from qds_sdk.executor import CommandExecutor
+from qds_sdk.polling import FixedPollStrategy
+
+
+class FakeQds(object):
+    """Commands finish after `polls` status fetches, or when killed"""
+
+    def __init__(self, polls=2):
+        self.polls = polls
+        self.commands = {}
+        self.cancelled = []
+        self.lock = threading.Lock()
+        self.created = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def create(self, **kwargs):
+        self.release.wait(5)
+        if kwargs.get("query") == "bad":
+            raise BadRequest(Mock(text="bad query"))
+        with self.lock:
+            id = len(self.commands) + 1
+            self.commands[id] = [self.polls, "waiting"]
+        self.created.set()
+        return HiveCommand({"id": id, "status": "waiting", "query": kwargs["query"]})
+
+    def find(self, id):
+        with self.lock:
+            state = self.commands[id]
+            state[0] -= 1
+            if state[1] != "cancelled":
+                state[1] = "done" if state[0] <= 0 else "running"
+            return HiveCommand({"id": id, "status": state[1]})
+
+    def cancel_id(self, id):
+        with self.lock:
+            self.cancelled.append(id)
+            self.commands[id][1] = "cancelled"
+
+
+class TestCommandExecutor(unittest.TestCase):
+
+    def setUp(self):
+        Qubole.configure(api_token="dummy_token")
+        self.qds = FakeQds()
+        self.patches = [patch.object(HiveCommand, name, side_effect=getattr(self.qds, name))
+                        for name in ("create", "find", "cancel_id")]
+        for p in self.patches:
+            p.start()
+        self.executor = CommandExecutor(poll_strategy=FixedPollStrategy(0.01))
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True, cancel_commands=True)
+        for p in self.patches:
+            p.stop()
+
+    def test_submit(self):
+        callbacks = []
+        futures = [self.executor.submit(HiveCommand, query="select %d" % i) for i in range(10)]
+        futures[0].add_done_callback(callbacks.append)
+        done = [f.result(5) for f in as_completed(futures, timeout=5)]
+        self.assertEqual(sorted(cmd.id for cmd in done), list(range(1, 11)))
+        self.assertTrue(all(cmd.status == "done" for cmd in done))
+        self.assertEqual(callbacks, [futures[0]])
+        self.assertEqual(self.executor.by_id, {})
+        self.assertTrue(self.executor.poller.is_alive())
+
+    def test_create_error(self):
+        future = self.executor.submit(HiveCommand, query="bad")
+        self.assertIsInstance(future.exception(5), BadRequest)
+
+    def test_cancel_running_command(self):
+        self.qds.polls = 1000
+        future = self.executor.submit(HiveCommand, query="select 1")
+        self.qds.created.wait(5)
+        for _ in range(500):
+            if future.command_id is not None:
+                break
+            time.sleep(0.01)
+        self.assertTrue(future.cancel())
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.qds.cancelled, [1])
+        self.executor.shutdown(wait=True)
+        self.assertEqual(self.executor.futures, set())
+
+    def test_cancel_before_created(self):
+        self.qds.release.clear()
+        future = self.executor.submit(HiveCommand, query="select 1")
+        self.assertTrue(future.cancel())
+        self.qds.release.set()
+        self.executor.shutdown(wait=True)
+        self.assertEqual(self.qds.cancelled, [1])
+
+    def test_shutdown(self):
+        future = self.executor.submit(HiveCommand, query="select 1")
+        self.executor.shutdown(wait=True)
+        self.assertEqual(future.result(0).status, "done")
+        self.assertFalse(self.executor.poller.is_alive())
+        self.assertIsNone(self.executor.watcher.pool)
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(HiveCommand, query="select 1")
+
+    def test_failed_status_request(self):
+        failures = [2]
+        find = self.qds.find
+
+        def failing_find(id):
+            with self.qds.lock:
+                if id in failures:
+                    failures.remove(id)
+                    raise RuntimeError("server error")
+            return find(id)
+        self.patches[1].stop()
+        self.patches[1] = patch.object(HiveCommand, "find", side_effect=failing_find)
+        self.patches[1].start()
+        futures = [self.executor.submit(HiveCommand, query="select %d" % i) for i in range(3)]
+        with patch.object(Qubole, "poll_interval", 0.01):
+            self.executor.shutdown(wait=True)
+        self.assertEqual([f.done() for f in futures], [True, True, True])
+        self.assertEqual(failures, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import print_function
+import io
+import json
+import sys
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.commands import HiveCommand
+from qds_sdk.exception import ConfigError
+from qds_sdk import export
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+QLOG = json.dumps({"QBOL-QUERY-SCHEMA": {"-1": [
+    {"ColumnName": "id", "ColumnType": "bigint"},
+    {"ColumnName": "name", "ColumnType": "string"},
+    {"ColumnName": "price", "ColumnType": "decimal(10,2)"},
+    {"ColumnName": "ratio", "ColumnType": "double"},
+    {"ColumnName": "active", "ColumnType": "boolean"},
+    {"ColumnName": "day", "ColumnType": "date"},
+    {"ColumnName": "tags", "ColumnType": "array<string>"},
+    {"ColumnName": "seen", "ColumnType": "timestamp"},
+]}})
+
+ROWS = [[u"1", u"caf\u00e9, \"latte\"", u"3.50", u"0.25", u"true", u"2017-01-01", u"[\"a\"]",
+         u"2017-01-01 10:00:00.123456789"],
+        [u"2", u"\\N", u"\\N", u"\\N", u"false", u"2017-01-02", u"[]", u"2017-01-02 00:00:00"],
+        [u"3", u"tea", u"1.00", u"1e3", u"\\N", u"\\N", u"\\N", u"\\N"]]
+
+
+class TestExport(unittest.TestCase):
+
+    def command(self, rows=ROWS):
+        cmd = HiveCommand({"id": 1, "status": "done"})
+
+        def iter_results(batch_size):
+            for i in range(0, len(rows), 2):
+                yield rows[i:i + 2]
+
+        cmd.iter_results = iter_results
+        return cmd
+
+    def test_parse_schema(self):
+        schema = export.parse_schema(QLOG)
+        self.assertEqual(schema[0], ("id", "bigint"))
+        self.assertEqual(schema[2], ("price", "decimal(10,2)"))
+        qlog = json.dumps({"QBOL-QUERY-SCHEMA": {"3": [{"ColumnName": "x"}]}})
+        self.assertEqual(export.parse_schema(qlog), [("x", "string")])
+        self.assertIsNone(export.parse_schema(json.dumps({"QBOL-QUERY-SCHEMA": None})))
+
+    def test_csv_text(self):
+        fp = io.StringIO()
+        self.command().get_results(fp, format="csv", qlog=QLOG)
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(lines[0], u"id,name,price,ratio,active,day,tags,seen")
+        self.assertEqual(lines[1], u'1,"caf\u00e9, ""latte""",3.50,0.25,true,2017-01-01,"[""a""]",2017-01-01 10:00:00.123456789')
+        self.assertEqual(len(lines), 4)
+
+    def test_csv_binary(self):
+        fp = io.BytesIO()
+        self.command().get_results(fp, format="csv")
+        self.assertEqual(fp.getvalue().decode('utf8').splitlines()[2], u"3,tea,1.00,1e3,\\N,\\N,\\N,\\N")
+        self.assertFalse(fp.closed)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, self.command().get_results, io.BytesIO(), format="xml")
+
+    def test_missing_pyarrow(self):
+        with patch.dict(sys.modules, {"pyarrow": None}):
+            self.assertRaises(ConfigError, self.command().get_results, io.BytesIO(), format="arrow")
+
+    @unittest.skipIf(pyarrow is None, "requires pyarrow")
+    def test_parquet(self):
+        fp = io.BytesIO()
+        self.command().get_results(fp, format="parquet", qlog=QLOG)
+        parquet = pyarrow.parquet.ParquetFile(io.BytesIO(fp.getvalue()))
+        self.assertEqual(parquet.num_row_groups, 2)
+        table = parquet.read()
+        self.assertEqual(str(table.schema.field("id").type), "int64")
+        self.assertEqual(str(table.schema.field("price").type), "decimal128(10, 2)")
+        self.assertEqual(str(table.schema.field("day").type), "date32[day]")
+        self.assertEqual(str(table.schema.field("tags").type), "string")
+        self.assertEqual(table.column("id").to_pylist(), [1, 2, 3])
+        self.assertEqual(table.column("name").to_pylist(), [u"caf\u00e9, \"latte\"", None, u"tea"])
+        self.assertEqual(table.column("ratio").to_pylist(), [0.25, None, 1000.0])
+        self.assertEqual(table.column("active").to_pylist(), [True, False, None])
+        self.assertEqual(str(table.schema.field("seen").type), "timestamp[ns]")
+        self.assertEqual(table.column("seen").cast(pyarrow.int64()).to_pylist(),
+                         [1483264800123456789, 1483315200000000000, None])
+
+    @unittest.skipIf(pyarrow is None, "requires pyarrow")
+    def test_arrow_stream_without_schema(self):
+        fp = io.BytesIO()
+        self.command().get_results(fp, format="arrow")
+        table = pyarrow.ipc.open_stream(fp.getvalue()).read_all()
+        self.assertEqual(table.column_names, ["_c0", "_c1", "_c2", "_c3", "_c4", "_c5", "_c6", "_c7"])
+        self.assertEqual(table.column("_c0").to_pylist(), [u"1", u"2", u"3"])
+        self.assertEqual(table.column("_c2").to_pylist(), [u"3.50", None, u"1.00"])
+
+    @unittest.skipIf(pyarrow is None, "requires pyarrow")
+    def test_empty_result(self):
+        fp = io.BytesIO()
+        self.command(rows=[]).get_results(fp, format="parquet", qlog=QLOG)
+        table = pyarrow.parquet.read_table(io.BytesIO(fp.getvalue()))
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.column_names[0], "id")
+
+
+if __name__ == '__main__':
+    unittest.main()
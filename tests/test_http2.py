@@ -0,0 +1,117 @@
+from __future__ import print_function
+import sys
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+import requests
+from mock import *
+from qds_sdk.connection import Connection
+from qds_sdk.exception import ConfigError
+from qds_sdk.exception import ResourceNotFound
+from qds_sdk.qubole import Qubole
+from qds_sdk.qubole import QuboleAuth
+from test_connection import StubConnection
+
+
+class FakeTimeoutException(Exception):
+    pass
+
+
+class FakeTransportError(Exception):
+    pass
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf8")
+        self.headers = {}
+        self.url = "https://api.qubole.com/api/v1.2/commands/1"
+        self.encoding = "utf-8"
+        self.http_version = "HTTP/2"
+
+
+def fake_httpx():
+    httpx = MagicMock()
+    httpx.TimeoutException = FakeTimeoutException
+    httpx.TransportError = FakeTransportError
+    httpx.Timeout = lambda read, connect=None: ("Timeout", connect, read)
+    client = httpx.Client.return_value
+    client.build_request.side_effect = lambda method, url, **kwargs: (method, url, kwargs)
+    client.send.return_value = FakeResponse(200, '{"id": 1, "status": "done"}')
+    return httpx
+
+
+class TestHttp2Transport(unittest.TestCase):
+
+    def setUp(self):
+        self.httpx = fake_httpx()
+        self.modules = patch.dict("sys.modules", {"httpx": self.httpx})
+        self.modules.start()
+
+    def tearDown(self):
+        self.modules.stop()
+
+    def connection(self):
+        return StubConnection(QuboleAuth("dummy_token"), "https://api.qubole.com/api/v1.2", False,
+                              pool_maxsize=4, transport="http2")
+
+    def test_client_settings(self):
+        self.connection()
+        kwargs = self.httpx.Client.call_args[1]
+        self.assertTrue(kwargs["http2"])
+        self.assertTrue(kwargs["http1"])
+        self.assertTrue(kwargs["verify"])
+        self.httpx.Limits.assert_called_with(max_connections=4, max_keepalive_connections=4)
+
+    def test_get(self):
+        conn = self.connection()
+        self.assertEqual(conn.get("commands/1", params={"a": 1}), {"id": 1, "status": "done"})
+        method, url, kwargs = self.httpx.Client.return_value.send.call_args[0][0]
+        self.assertEqual((method, url), ("GET", "https://api.qubole.com/api/v1.2/commands/1"))
+        self.assertEqual(kwargs["headers"]["X-AUTH-TOKEN"], "dummy_token")
+        self.assertEqual(kwargs["params"], {"a": 1})
+        self.assertEqual(kwargs["timeout"], ("Timeout", 10, 60))
+        self.assertNotIn("X-AUTH-TOKEN", conn._headers)
+
+    def test_errors(self):
+        conn = self.connection()
+        send = self.httpx.Client.return_value.send
+        send.return_value = FakeResponse(404, '{}')
+        with self.assertRaises(ResourceNotFound):
+            conn.put("commands/1", {"status": "kill"})
+        send.side_effect = FakeTimeoutException("read timed out")
+        with self.assertRaises(requests.Timeout):
+            conn.put("commands/1", {"status": "kill"})
+        send.side_effect = FakeTransportError("connection reset")
+        with self.assertRaises(requests.ConnectionError):
+            conn.put("commands/1", {"status": "kill"})
+
+    def test_configured(self):
+        Qubole.configure(api_token="dummy_token", transport="http2")
+        try:
+            self.assertEqual(Qubole.agent().session.__class__.__name__, "Http2Session")
+        finally:
+            Qubole.configure(api_token="dummy_token")
+
+
+class TestTransportOption(unittest.TestCase):
+
+    def test_httpx_missing(self):
+        with patch.dict("sys.modules", {"httpx": None}):
+            with self.assertRaises(ConfigError):
+                Connection(None, "https://api.qubole.com/api/v1.2", False, transport="http2")
+
+    def test_custom_session(self):
+        session = Mock(spec=requests.Session)
+        conn = Connection(None, "https://api.qubole.com/api/v1.2", False, reuse=False, transport=session)
+        self.assertIs(conn.session, session)
+        self.assertTrue(conn.reuse)
+        with self.assertRaises(ConfigError):
+            Connection(None, "https://api.qubole.com/api/v1.2", False, transport="spdy")
+
+
+if __name__ == '__main__':
+    unittest.main()
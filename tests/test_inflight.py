@@ -0,0 +1,187 @@
+from __future__ import print_function
+import signal
+import sys
+import threading
+import time
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk import inflight
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import Command, HiveCommand
+from qds_sdk.polling import FixedPollStrategy
+
+
+class TestInFlightRegistry(unittest.TestCase):
+
+    def setUp(self):
+        Qubole.configure(api_token="dummy_token")
+        self.registry = inflight.InFlightRegistry()
+
+    def test_cancel_all(self):
+        for id in range(1, 6):
+            self.registry.add(HiveCommand, id)
+        with patch.object(HiveCommand, "cancel_id") as cancel_id:
+            cancelled = self.registry.cancel_all(timeout=5, concurrency=2)
+        self.assertEqual(sorted(cancelled), [1, 2, 3, 4, 5])
+        self.assertEqual(sorted(call[0][0] for call in cancel_id.call_args_list), [1, 2, 3, 4, 5])
+        self.assertEqual(len(self.registry), 0)
+
+    def test_cancel_all_runs_in_parallel(self):
+        barrier = threading.Event()
+        started = []
+
+        def cancel_id(id):
+            started.append(id)
+            if len(started) == 3:
+                barrier.set()
+            barrier.wait(5)
+
+        for id in range(1, 4):
+            self.registry.add(HiveCommand, id)
+        with patch.object(HiveCommand, "cancel_id", side_effect=cancel_id):
+            cancelled = self.registry.cancel_all(timeout=5, concurrency=3)
+        self.assertEqual(sorted(cancelled), [1, 2, 3])
+
+    def test_failed_cancellation_stays_registered(self):
+        self.registry.add(HiveCommand, 1)
+        self.registry.add(HiveCommand, 2)
+
+        def cancel_id(id):
+            if id == 1:
+                raise IOError("connection reset")
+
+        with patch.object(HiveCommand, "cancel_id", side_effect=cancel_id):
+            cancelled = self.registry.cancel_all(timeout=5)
+        self.assertEqual(cancelled, [2])
+        self.assertEqual(self.registry.ids(), [1])
+
+    def test_cancel_all_deadline(self):
+        release = threading.Event()
+        self.registry.add(HiveCommand, 1)
+        with patch.object(HiveCommand, "cancel_id", side_effect=lambda id: release.wait(5)):
+            started = time.time()
+            cancelled = self.registry.cancel_all(timeout=0.1)
+            elapsed = time.time() - started
+            release.set()
+        self.assertEqual(cancelled, [])
+        self.assertLess(elapsed, 2)
+
+    def test_cancel_uses_registered_config(self):
+        config = Mock()
+        self.registry.add(HiveCommand, 1, config)
+        with patch.object(HiveCommand, "cancel_id"):
+            self.registry.cancel_all(timeout=5)
+        config.activate.assert_called_once_with()
+
+    def test_cancel_all_empty(self):
+        self.assertEqual(self.registry.cancel_all(), [])
+
+
+class TestTracked(unittest.TestCase):
+
+    def setUp(self):
+        Qubole.configure(api_token="dummy_token")
+        self.conn = Mock()
+        self.conn.post.return_value = {"id": 7, "status": "waiting"}
+        self.agent = patch.object(Qubole, "agent", return_value=self.conn)
+        self.agent.start()
+
+    def tearDown(self):
+        self.agent.stop()
+
+    def test_cancels_on_exception(self):
+        with self.assertRaises(KeyboardInterrupt):
+            with Command.tracked():
+                HiveCommand.create(query="show tables")
+                self.assertEqual(inflight.registry.ids(), [7])
+                raise KeyboardInterrupt()
+        self.conn.put.assert_called_once_with("commands/7", {"status": "kill"})
+        self.assertEqual(inflight.registry.ids(), [])
+
+    def test_normal_exit_leaves_commands_running(self):
+        with Command.tracked() as scope:
+            HiveCommand.create(query="show tables")
+            self.assertEqual(scope.ids(), [7])
+        self.assertFalse(self.conn.put.called)
+        self.assertEqual(inflight.registry.ids(), [])
+
+    def test_finished_commands_are_not_tracked(self):
+        self.conn.post.return_value = {"id": 7, "status": "done"}
+        with self.assertRaises(ValueError):
+            with Command.tracked() as scope:
+                HiveCommand.create(query="show tables")
+                self.assertEqual(scope.ids(), [])
+                raise ValueError()
+        self.assertFalse(self.conn.put.called)
+
+    def test_untracked_create(self):
+        HiveCommand.create(query="show tables")
+        self.assertEqual(inflight.registry.ids(), [])
+
+    def test_run_registers_while_waiting(self):
+        seen = []
+
+        def find(id):
+            seen.append(inflight.registry.ids())
+            return HiveCommand({"id": id, "status": "done"})
+
+        with patch.object(HiveCommand, "find", side_effect=find):
+            cmd = HiveCommand.run(query="show tables", poll_strategy=FixedPollStrategy(0))
+        self.assertEqual(cmd.status, "done")
+        self.assertEqual(seen, [[7]])
+        self.assertEqual(inflight.registry.ids(), [])
+
+    def test_run_interrupted_inside_tracked(self):
+        with patch.object(HiveCommand, "find", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                with Command.tracked():
+                    HiveCommand.run(query="show tables", poll_strategy=FixedPollStrategy(0))
+        self.conn.put.assert_called_once_with("commands/7", {"status": "kill"})
+
+
+@unittest.skipUnless(hasattr(signal, "SIGUSR1"), "requires SIGUSR1")
+class TestSignalHandlers(unittest.TestCase):
+
+    def setUp(self):
+        Qubole.configure(api_token="dummy_token")
+        self.saved = signal.getsignal(signal.SIGUSR1)
+        inflight.registry.add(HiveCommand, 3)
+        self.cancel_id = patch.object(HiveCommand, "cancel_id")
+        self.cancel_id.start()
+
+    def tearDown(self):
+        self.cancel_id.stop()
+        signal.signal(signal.SIGUSR1, self.saved)
+        inflight.registry.discard(3)
+
+    def test_exits_after_cancelling(self):
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        inflight.install_signal_handlers([signal.SIGUSR1], timeout=5)
+        handler = signal.getsignal(signal.SIGUSR1)
+        with self.assertRaises(SystemExit) as context:
+            handler(signal.SIGUSR1, None)
+        self.assertEqual(context.exception.code, 128 + signal.SIGUSR1)
+        HiveCommand.cancel_id.assert_called_once_with(3)
+        self.assertEqual(inflight.registry.ids(), [])
+
+    def test_chains_previous_handler(self):
+        previous = Mock()
+        signal.signal(signal.SIGUSR1, previous)
+        handlers = inflight.install_signal_handlers([signal.SIGUSR1], timeout=5)
+        self.assertIs(handlers[signal.SIGUSR1], previous)
+        signal.getsignal(signal.SIGUSR1)(signal.SIGUSR1, None)
+        previous.assert_called_once_with(signal.SIGUSR1, None)
+        HiveCommand.cancel_id.assert_called_once_with(3)
+
+    def test_ignored_signal(self):
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        inflight.install_signal_handlers([signal.SIGUSR1], timeout=5)
+        signal.getsignal(signal.SIGUSR1)(signal.SIGUSR1, None)
+        HiveCommand.cancel_id.assert_called_once_with(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
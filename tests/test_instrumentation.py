@@ -0,0 +1,138 @@
+from __future__ import print_function
+import sys
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.exception import ResourceNotFound
+from qds_sdk.exception import RetryWithDelay
+from qds_sdk.instrumentation import EventBus
+from qds_sdk.instrumentation import LatencyHistogram
+from qds_sdk.instrumentation import LatencyStats
+from qds_sdk.instrumentation import RequestEvent
+from qds_sdk.instrumentation import path_template
+from qds_sdk.retry import RetryPolicy
+from test_connection import StubResponse
+from test_connection import stub_connection
+
+
+class TestPathTemplate(unittest.TestCase):
+
+    def test_ids_replaced(self):
+        self.assertEqual(path_template("commands/123/logs"), "commands/:id/logs")
+        self.assertEqual(path_template("commands/123?include_headers=true"), "commands/:id")
+        self.assertEqual(path_template("clusters/my-label/state"), "clusters/:id/state")
+        self.assertEqual(path_template("clusters"), "clusters")
+        self.assertEqual(path_template("scheduler/7/instances"), "scheduler/:id/instances")
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_subscribe_and_emit(self):
+        bus = EventBus()
+        self.assertFalse(bus.enabled())
+        seen = []
+        bus.on("after_response", seen.append)
+        self.assertTrue(bus.enabled())
+        event = RequestEvent("GET", "commands/1")
+        bus.emit("after_response", event)
+        bus.off("after_response", seen.append)
+        bus.emit("after_response", event)
+        self.assertEqual(seen, [event])
+        self.assertFalse(bus.enabled())
+
+    def test_unknown_event(self):
+        with self.assertRaises(ValueError):
+            EventBus().on("after_request", print)
+
+    def test_failing_handler_swallowed(self):
+        bus = EventBus()
+        seen = []
+        bus.on("on_error", Mock(side_effect=RuntimeError()))
+        bus.on("on_error", seen.append)
+        bus.emit("on_error", RequestEvent("GET", "commands/1"))
+        self.assertEqual(len(seen), 1)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for _ in range(99):
+            histogram.record(0.010)
+        histogram.record(3.0)
+        self.assertEqual(histogram.percentile(50), 0.016)
+        self.assertEqual(histogram.percentile(100), 3.0)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max, 3.0)
+
+
+class TestConnectionEvents(unittest.TestCase):
+
+    def connection(self, responses):
+        conn = stub_connection(responses)
+        conn.hooks = EventBus()
+        conn.retry_policy = RetryPolicy(tries=3, delay=1, jitter=None)
+        conn.retry_policy.sleep = lambda seconds: None
+        self.events = []
+        for name in EventBus.EVENTS:
+            conn.hooks.on(name, lambda event, name=name: self.events.append((name, event)))
+        return conn
+
+    def test_successful_request(self):
+        conn = self.connection([StubResponse(body={"id": 1})])
+        conn.get("commands/1")
+        self.assertEqual([name for name, _ in self.events], ["before_request", "after_response"])
+        event = self.events[1][1]
+        self.assertEqual(event.endpoint, "GET commands/:id")
+        self.assertEqual(event.status, 200)
+        self.assertEqual(event.bytes, len('{"id": 1}'))
+        self.assertIsNotNone(event.duration)
+
+    def test_error_and_retry(self):
+        conn = self.connection([StubResponse(503), StubResponse(404)])
+        with self.assertRaises(ResourceNotFound):
+            conn.get("commands/1")
+        self.assertEqual([name for name, _ in self.events],
+                         ["before_request", "after_response", "on_error", "on_retry",
+                          "before_request", "after_response", "on_error"])
+        retry = self.events[3][1]
+        self.assertIsInstance(retry.error, RetryWithDelay)
+        self.assertEqual((retry.attempt, retry.delay), (1, 1))
+
+    def test_no_handlers(self):
+        conn = stub_connection()
+        conn.hooks = EventBus()
+        with patch("qds_sdk.connection.RequestEvent") as event:
+            conn.get("commands/1")
+        self.assertFalse(event.called)
+
+
+class TestLatencyStats(unittest.TestCase):
+
+    def test_report(self):
+        bus = EventBus()
+        stats = LatencyStats()
+        stats.attach(bus)
+        conn = stub_connection([StubResponse(), StubResponse(), StubResponse(500)])
+        conn.hooks = bus
+        conn.retry_policy = RetryPolicy(retry_methods=())
+        conn.get("commands/1")
+        conn.get("commands/2")
+        with self.assertRaises(Exception):
+            conn.get("clusters/default")
+        stats.detach(bus)
+        self.assertFalse(bus.enabled())
+
+        self.assertEqual(stats.histograms["GET commands/:id"].count, 2)
+        self.assertEqual(stats.errors, {"GET clusters/:id": 1})
+        lines = stats.report().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("endpoint"))
+        self.assertTrue(lines[2].startswith("GET commands/:id"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+from __future__ import print_function
+import sys
+import threading
+import time
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+import requests
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import HiveCommand
+from qds_sdk.notify import SleepNotifier, LongPollNotifier, CallbackReceiver
+from qds_sdk.polling import FixedPollStrategy
+
+
+class TestSleepNotifier(unittest.TestCase):
+
+    def test_sleeps_for_delay(self):
+        notifier = SleepNotifier()
+        notifier.sleep = Mock()
+        self.assertFalse(notifier.wait(1, 2.5))
+        notifier.sleep.assert_called_once_with(2.5)
+
+
+class TestLongPollNotifier(unittest.TestCase):
+
+    def notifier(self, status_code=200, side_effect=None):
+        session = Mock()
+        session.get.return_value = Mock(status_code=status_code)
+        session.get.side_effect = side_effect
+        notifier = LongPollNotifier("https://relay/wait", fallback_interval=60,
+                                    headers={"X-Token": "t"}, session=session)
+        notifier.sleep = Mock()
+        return notifier
+
+    def test_notified(self):
+        notifier = self.notifier(200)
+        self.assertTrue(notifier.wait(42, 5))
+        notifier.session.get.assert_called_once_with(
+            "https://relay/wait", params={"command_id": 42, "timeout": 60},
+            headers={"X-Token": "t"}, timeout=70)
+        self.assertFalse(notifier.sleep.called)
+
+    def test_timed_out(self):
+        notifier = self.notifier(204)
+        self.assertFalse(notifier.wait(42, 5))
+        self.assertFalse(notifier.sleep.called)
+
+    def test_relay_error_falls_back_to_polling(self):
+        notifier = self.notifier(side_effect=requests.ConnectionError("refused"))
+        self.assertFalse(notifier.wait(42, 5))
+        notifier.sleep.assert_called_once_with(5)
+
+    def test_unexpected_status_falls_back_to_polling(self):
+        notifier = self.notifier(503)
+        self.assertFalse(notifier.wait(42, 5))
+        notifier.sleep.assert_called_once_with(5)
+
+
+class TestCallbackReceiver(unittest.TestCase):
+
+    def setUp(self):
+        self.receiver = CallbackReceiver(path="/qds", fallback_interval=5)
+
+    def tearDown(self):
+        self.receiver.close()
+
+    def test_json_notification_wakes_waiter(self):
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(self.receiver.wait(42, 0)))
+        waiter.start()
+        r = requests.post(self.receiver.url, json={"id": 42, "status": "done"})
+        waiter.join(5)
+        self.assertEqual(r.status_code, 204)
+        self.assertEqual(result, [True])
+
+    def test_query_parameter_notification(self):
+        r = requests.post(self.receiver.url + "?id=42")
+        self.assertEqual(r.status_code, 204)
+        self.assertTrue(self.receiver.wait("42", 0))
+
+    def test_notification_before_wait(self):
+        self.receiver.notify(7)
+        self.assertTrue(self.receiver.wait(7, 0))
+
+    def test_timeout(self):
+        self.receiver.fallback_interval = 0
+        started = time.time()
+        self.assertFalse(self.receiver.wait(7, 0.05))
+        self.assertGreaterEqual(time.time() - started, 0.04)
+
+    def test_bad_requests(self):
+        self.assertEqual(requests.post(self.receiver.url, data="not json").status_code, 400)
+        other = self.receiver.url.replace("/qds", "/other")
+        self.assertEqual(requests.post(other, json={"id": 1}).status_code, 404)
+        self.assertEqual(len(self.receiver.notified), 0)
+
+    def test_pending_notifications_are_bounded(self):
+        self.receiver.max_pending = 2
+        for id in range(5):
+            self.receiver.notify(id)
+        self.assertEqual(list(self.receiver.notified), ["3", "4"])
+
+    def test_public_url(self):
+        receiver = CallbackReceiver(public_url="https://worker.example.com/qds")
+        try:
+            self.assertEqual(receiver.url, "https://worker.example.com/qds")
+        finally:
+            receiver.close()
+
+
+class TestRunWithNotifier(unittest.TestCase):
+
+    def setUp(self):
+        self.statuses = ["running", "done"]
+
+    def find(self, id):
+        return HiveCommand({"id": id, "status": self.statuses.pop(0)})
+
+    def run_command(self, **kwargs):
+        with patch.object(HiveCommand, "create",
+                          return_value=HiveCommand({"id": 9, "status": "waiting"})):
+            with patch.object(HiveCommand, "find", side_effect=self.find):
+                return HiveCommand.run(query="show tables", poll_strategy=FixedPollStrategy(3),
+                                       **kwargs)
+
+    def test_run_waits_on_notifier(self):
+        Qubole.configure(api_token="dummy_token")
+        notifier = Mock()
+        cmd = self.run_command(notifier=notifier)
+        self.assertEqual(cmd.status, "done")
+        self.assertEqual(notifier.wait.call_args_list, [call(9, 3), call(9, 3)])
+
+    def test_configured_notifier(self):
+        notifier = Mock()
+        Qubole.configure(api_token="dummy_token", notifier=notifier)
+        try:
+            self.run_command()
+        finally:
+            Qubole.configure(api_token="dummy_token")
+        self.assertEqual(notifier.wait.call_count, 2)
+
+    def test_defaults_to_polling(self):
+        Qubole.configure(api_token="dummy_token")
+        with patch("time.sleep") as sleep:
+            self.run_command()
+        self.assertEqual(sleep.call_args_list, [call(3), call(3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
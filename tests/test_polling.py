@@ -0,0 +1,123 @@
+from __future__ import print_function
+import sys
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import HiveCommand
+from qds_sdk.polling import AdaptivePollStrategy
+from qds_sdk.polling import FixedPollStrategy
+from qds_sdk.polling import query_key
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueryKey(unittest.TestCase):
+
+    def test_normalized(self):
+        self.assertEqual(query_key("HiveCommand", {"query": "select 1\n  from t"}),
+                         ("HiveCommand", "select 1 from t"))
+        self.assertEqual(query_key("HiveCommand", {"query": "select 1", "command_type": "PrestoCommand"}),
+                         ("PrestoCommand", "select 1"))
+        self.assertIsNone(query_key("ShellCommand", {"inline": "ls"}))
+
+    def test_quoted_whitespace_kept(self):
+        self.assertEqual(query_key("HiveCommand", {"query": "select 'a  b'  from t;"}),
+                         ("HiveCommand", "select 'a  b' from t"))
+        self.assertNotEqual(query_key("HiveCommand", {"query": "select 'a  b'"}),
+                            query_key("HiveCommand", {"query": "select 'a b'"}))
+
+
+class TestFixedPollStrategy(unittest.TestCase):
+
+    def test_interval(self):
+        Qubole.configure(api_token="dummy_token", poll_interval=7)
+        self.assertEqual(FixedPollStrategy().start().next_delay("running"), 7)
+        self.assertEqual(FixedPollStrategy(2).start().next_delay("running"), 2)
+
+
+class TestAdaptivePollStrategy(unittest.TestCase):
+
+    def strategy(self, **kwargs):
+        strategy = AdaptivePollStrategy(**kwargs)
+        strategy.clock = FakeClock()
+        return strategy
+
+    def test_growth_cap_and_reset(self):
+        schedule = self.strategy(initial=0.5, factor=2, max_interval=3).start()
+        delays = [schedule.next_delay(status) for status in
+                  ["waiting", "waiting", "waiting", "waiting", "running", "running"]]
+        self.assertEqual(delays, [0.5, 1, 2, 3, 0.5, 1])
+
+    def test_seeded_by_history(self):
+        strategy = self.strategy(initial=1, factor=2, max_interval=60)
+        schedule = strategy.start("q")
+        strategy.clock.now = 50
+        schedule.finish()
+        self.assertEqual(strategy.expected_runtime("q"), 50)
+
+        strategy.clock.now = 100
+        schedule = strategy.start("q")
+        self.assertEqual(schedule.next_delay("running"), 40)
+        strategy.clock.now = 140
+        self.assertEqual(schedule.next_delay("running"), 2)
+
+        strategy.clock.now = 160
+        schedule.finish()
+        self.assertEqual(strategy.expected_runtime("q"), 50 + 0.3 * (60 - 50))
+
+    def test_history_bounded(self):
+        strategy = self.strategy(history_size=2)
+        for key in ["a", "b", "c"]:
+            strategy.record(key, 1)
+        self.assertEqual(list(strategy.runtimes), ["b", "c"])
+        strategy = self.strategy(history_size=0)
+        strategy.record("a", 1)
+        self.assertIsNone(strategy.expected_runtime("a"))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            AdaptivePollStrategy(initial=0)
+
+
+class TestCommandRun(unittest.TestCase):
+
+    def setUp(self):
+        Qubole.configure(api_token="dummy_token")
+
+    def run_command(self, statuses, **kwargs):
+        commands = [HiveCommand({"id": 1, "status": status}) for status in statuses]
+        with patch.object(HiveCommand, "create", return_value=commands[0]):
+            with patch.object(HiveCommand, "find", side_effect=commands[1:]):
+                with patch("qds_sdk.commands.time.sleep") as sleep:
+                    cmd = HiveCommand.run(query="select 1", **kwargs)
+        self.assertEqual(cmd.status, statuses[-1])
+        return [c[0][0] for c in sleep.call_args_list]
+
+    def test_default_fixed_interval(self):
+        self.assertEqual(self.run_command(["waiting", "running", "done"]), [5, 5])
+
+    def test_poll_strategy_argument(self):
+        strategy = AdaptivePollStrategy(initial=0.5, factor=2)
+        delays = self.run_command(["waiting", "waiting", "running", "running", "done"],
+                                  poll_strategy=strategy)
+        self.assertEqual(delays, [0.5, 1, 0.5, 1])
+        self.assertIsNotNone(strategy.expected_runtime(("HiveCommand", "select 1")))
+
+    def test_configured_strategy(self):
+        strategy = AdaptivePollStrategy(initial=0.5)
+        Qubole.configure(api_token="dummy_token", poll_strategy=strategy)
+        self.assertEqual(self.run_command(["waiting", "error"]), [0.5])
+        self.assertIsNone(strategy.expected_runtime(("HiveCommand", "select 1")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+from __future__ import print_function
+import sys
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+import threading
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.qubole import QuboleClient
+from qds_sdk.commands import HiveCommand
+from qds_sdk.resource import SingletonResource
+from qds_sdk.exception import ConfigError
+from test_connection import StubResponse
+from test_connection import stub_connection
+
+
+class TestQuboleAgent(unittest.TestCase):
+    def setUp(self):
+        Qubole.configure(api_token='dummy_token')
+
+    def test_agent_cached_per_version(self):
+        self.assertIs(Qubole.agent(), Qubole.agent())
+        self.assertIs(Qubole.agent(version="v2"), Qubole.agent(version="v2"))
+        self.assertIsNot(Qubole.agent(), Qubole.agent(version="v2"))
+        self.assertEqual(Qubole.agent(version="v1.3").rest_url, "https://api.qubole.com/api/v1.3")
+        self.assertEqual(Qubole.agent().rest_url, "https://api.qubole.com/api/v1.2")
+
+    def test_configure_resets_cache(self):
+        agent = Qubole.agent()
+        Qubole.configure(api_token='other_token')
+        self.assertIsNot(agent, Qubole.agent())
+        self.assertEqual(Qubole.agent().auth.api_token, 'other_token')
+
+    def test_pool_settings(self):
+        Qubole.configure(api_token='dummy_token', pool_connections=4, pool_maxsize=32, pool_block=True)
+        for prefix in ('https://', 'http://'):
+            adapter = Qubole.agent(version="v2").session.get_adapter(prefix + 'api.qubole.com')
+            self.assertEqual(adapter._pool_connections, 4)
+            self.assertEqual(adapter._pool_maxsize, 32)
+            self.assertTrue(adapter._pool_block)
+
+    def test_missing_token(self):
+        Qubole.api_token = None
+        with self.assertRaises(ConfigError):
+            Qubole.agent()
+
+
+class TestQuboleClient(unittest.TestCase):
+    def setUp(self):
+        Qubole.configure(api_token='default_token')
+
+    def test_independent_settings(self):
+        client = QuboleClient(api_token='tenant_token', api_url="https://eu.qubole.com/api",
+                              version="v2", cloud_name="AZURE", poll_interval=0)
+        self.assertEqual(client.agent().rest_url, "https://eu.qubole.com/api/v2")
+        self.assertEqual(client.agent().auth.api_token, 'tenant_token')
+        self.assertIs(client.agent(), client.agent("v2"))
+        self.assertIsNot(client.agent(), Qubole.agent("v2"))
+        self.assertEqual(client.get_cloud().__class__.__name__, "AzureCloud")
+        self.assertEqual(client.poll_interval, Qubole.MIN_POLL_INTERVAL)
+        self.assertIs(client.hooks, Qubole.hooks)
+
+    def test_activate(self):
+        client = QuboleClient(api_token='tenant_token')
+        self.assertIs(Qubole.current(), Qubole)
+        with client.activate():
+            self.assertIs(Qubole.agent(), client.agent())
+            other = QuboleClient(api_token='other_token')
+            with other.activate():
+                self.assertIs(Qubole.current(), other)
+            self.assertIs(Qubole.current(), client)
+        self.assertEqual(Qubole.agent().auth.api_token, 'default_token')
+
+    def test_activation_is_per_thread(self):
+        client = QuboleClient(api_token='tenant_token')
+        seen = []
+        with client.activate():
+            thread = threading.Thread(target=lambda: seen.append(Qubole.agent().auth.api_token))
+            thread.start()
+            thread.join()
+        self.assertEqual(seen, ['default_token'])
+
+    def test_bind(self):
+        client = QuboleClient(api_token='tenant_token')
+        conn = stub_connection([StubResponse(body={"id": 1, "status": "waiting"})])
+        client.cached_agents["v1.2"] = conn
+        TenantHiveCommand = client.bind(HiveCommand)
+        self.assertEqual(TenantHiveCommand.__name__, "HiveCommand")
+        cmd = TenantHiveCommand.create(query="show tables")
+        self.assertIsInstance(cmd, TenantHiveCommand)
+        self.assertIs(Qubole.current(), Qubole)
+        self.assertEqual(conn.session.calls[0][2]["data"],
+                         '{"query": "show tables", "command_type": "HiveCommand"}')
+        cmd.cancel()
+        method, url, kwargs = conn.session.calls[1]
+        self.assertEqual((method, url), ("PUT", "https://api.qubole.com/api/v1.2/commands/1"))
+
+    def test_bind_generators(self):
+        client = QuboleClient(api_token='tenant_token')
+        conn = stub_connection([
+            StubResponse(headers={'err_length': '0', 'tmp_length': '5'}, text=u"line\n"),
+            StubResponse(body={"inline": True, "results": u"a\tb\r\nc\td\r\n"})])
+        client.cached_agents["v1.2"] = conn
+        cmd = client.bind(HiveCommand)({"id": 1, "status": "done", "meta_data": {
+            "logs_resource": "commands/1/logs", "results_resource": "commands/1/results"}})
+        for chunk in cmd.stream_logs():
+            self.assertIs(Qubole.current(), Qubole)
+            self.assertEqual(chunk, u"line\n")
+        self.assertEqual(list(cmd.iter_results()), [[[u"a", u"b"], [u"c", u"d"]]])
+        self.assertEqual([url for method, url, kwargs in conn.session.calls],
+                         ["https://api.qubole.com/api/v1.2/commands/1/logs",
+                          "https://api.qubole.com/api/v1.2/commands/1/results"])
+
+    def test_bind_singleton_resource(self):
+        class Settings(SingletonResource):
+            rest_entity_path = "accounts/settings"
+
+        client = QuboleClient(api_token='tenant_token')
+        client.cached_agents["v1.2"] = stub_connection([StubResponse(body={"name": "tenant"})])
+        TenantSettings = client.bind(Settings)
+        self.assertEqual(TenantSettings.rest_entity_path, "accounts/settings")
+        self.assertEqual(TenantSettings.find().name, "tenant")
+        self.assertIsNone(Settings.cached_resource)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+from __future__ import print_function
+import sys
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+import requests
+from qds_sdk.retry import RetryPolicy
+from qds_sdk.exception import RetryWithDelay
+from qds_sdk.exception import ServerError
+from test_connection import StubResponse
+from test_connection import stub_connection
+
+
+def throttled(headers=None):
+    return RetryWithDelay(StubResponse(503, {"error": "busy"}, headers))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_geometric_schedule_without_jitter(self):
+        policy = RetryPolicy(jitter=None)
+        delays = [policy.next_delay("GET", throttled(), attempt, 0) for attempt in range(1, 7)]
+        self.assertEqual(delays, [30, 60, 120, 240, 480, None])
+
+    def test_max_delay(self):
+        policy = RetryPolicy(tries=10, jitter=None, max_delay=100)
+        self.assertEqual(policy.next_delay("GET", throttled(), 5, 0), 100)
+
+    def test_full_jitter_bounds(self):
+        policy = RetryPolicy(jitter="full")
+        for attempt in range(1, 6):
+            wait = policy.next_delay("GET", throttled(), attempt, 0)
+            self.assertTrue(0 <= wait <= 30 * 2 ** (attempt - 1))
+
+    def test_decorrelated_jitter_bounds(self):
+        policy = RetryPolicy(jitter="decorrelated", max_delay=200)
+        wait = None
+        for attempt in range(1, 6):
+            previous = wait or 30
+            wait = policy.next_delay("GET", throttled(), attempt, 0, wait)
+            self.assertTrue(30 <= wait <= min(200, previous * 3))
+
+    def test_invalid_jitter(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(jitter="random")
+
+    def test_only_idempotent_verbs(self):
+        policy = RetryPolicy()
+        self.assertIsNotNone(policy.next_delay("GET", throttled(), 1, 0))
+        self.assertIsNone(policy.next_delay("PUT", throttled(), 1, 0))
+        self.assertIsNone(policy.next_delay("POST", throttled(), 1, 0))
+        policy = RetryPolicy(retry_methods=("GET", "PUT", "DELETE"))
+        self.assertIsNotNone(policy.next_delay("PUT", throttled(), 1, 0))
+        self.assertIsNotNone(policy.next_delay("DELETE", throttled(), 1, 0))
+
+    def test_only_retryable_exceptions(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.next_delay("GET", ServerError(StubResponse(500)), 1, 0))
+        self.assertIsNotNone(policy.next_delay("GET", requests.Timeout(), 1, 0))
+
+    def test_retry_after_seconds(self):
+        policy = RetryPolicy()
+        self.assertEqual(policy.next_delay("GET", throttled({"Retry-After": "7"}), 1, 0), 7)
+        policy = RetryPolicy(honor_retry_after=False, jitter=None)
+        self.assertEqual(policy.next_delay("GET", throttled({"Retry-After": "7"}), 1, 0), 30)
+
+    def test_retry_after_http_date(self):
+        self.assertEqual(RetryPolicy.retry_after(throttled({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})), 0)
+        self.assertIsNone(RetryPolicy.retry_after(throttled({"Retry-After": "soon"})))
+
+    def test_elapsed_budget(self):
+        policy = RetryPolicy(jitter=None, max_elapsed=100)
+        self.assertEqual(policy.next_delay("GET", throttled(), 1, 50), 30)
+        self.assertIsNone(policy.next_delay("GET", throttled(), 2, 50))
+
+
+class TestConnectionRetries(unittest.TestCase):
+
+    def test_get_retried(self):
+        conn = stub_connection([StubResponse(503), StubResponse(200, {"status": "done"})])
+        conn.retry_policy.sleep = Mock()
+        self.assertEqual(conn.get("commands/123"), {"status": "done"})
+        self.assertEqual(len(conn.session.calls), 2)
+        self.assertEqual(conn.retry_policy.sleep.call_count, 1)
+
+    def test_timeout_retried(self):
+        conn = stub_connection([requests.Timeout(), StubResponse(200, {"status": "done"})])
+        conn.retry_policy.sleep = Mock()
+        self.assertEqual(conn.get_raw("commands/123").json(), {"status": "done"})
+
+    def test_put_not_retried_by_default(self):
+        conn = stub_connection([StubResponse(503), StubResponse(200)])
+        conn.retry_policy.sleep = Mock()
+        with self.assertRaises(RetryWithDelay):
+            conn.put("commands/123", {"status": "kill"})
+        self.assertEqual(len(conn.session.calls), 1)
+
+    def test_put_retried_when_allowed(self):
+        conn = stub_connection([StubResponse(503, headers={"Retry-After": "2"}), StubResponse(200)])
+        conn.retry_policy = RetryPolicy(retry_methods=("GET", "PUT"))
+        conn.retry_policy.sleep = Mock()
+        conn.put("commands/123", {"status": "kill"})
+        conn.retry_policy.sleep.assert_called_once_with(2)
+
+    def test_gives_up_after_tries(self):
+        conn = stub_connection([StubResponse(503)] * 3)
+        conn.retry_policy = RetryPolicy(tries=3)
+        conn.retry_policy.sleep = Mock()
+        with self.assertRaises(RetryWithDelay):
+            conn.get("commands/123")
+        self.assertEqual(len(conn.session.calls), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
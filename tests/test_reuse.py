@@ -0,0 +1,116 @@
+from __future__ import print_function
+import sys
+import threading
+import time
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.commands import HiveCommand
+from qds_sdk.reuse import ResultReuse
+from qds_sdk.reuse import fingerprint
+from qds_sdk.reuse import normalize_query
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  select a,\n\tb  from t ;\n"), "select a, b from t")
+        self.assertEqual(normalize_query("select 'a  b', \"c\\\"  d\"  from t"),
+                         "select 'a  b', \"c\\\"  d\" from t")
+
+    def test_fingerprint(self):
+        fp = fingerprint("HiveCommand", {"query": "select 1", "macros": [{"a": "1"}]})
+        self.assertEqual(fp, fingerprint("HiveCommand", {"query": "select  1;", "macros": '[{"a": "1"}]',
+                                                         "label": "default", "name": "other"}))
+        self.assertNotEqual(fp, fingerprint("PrestoCommand", {"query": "select 1", "macros": [{"a": "1"}]}))
+        self.assertNotEqual(fp, fingerprint("HiveCommand", {"query": "select 1", "macros": [{"a": "2"}]}))
+        self.assertNotEqual(fp, fingerprint("HiveCommand", {"query": "select 1", "macros": [{"a": "1"}],
+                                                            "label": "etl"}))
+        self.assertIsNone(fingerprint("HiveCommand", {"script_location": "s3://bucket/q.sql"}))
+
+    def test_fingerprint_options(self):
+        fp = fingerprint("HiveCommand", {"query": "select 1", "sample_size": None,
+                                         "tags": ["a"], "print_logs_live": True})
+        self.assertEqual(fp, fingerprint("HiveCommand", {"query": "select 1", "retry": 2}))
+        self.assertNotEqual(fp, fingerprint("HiveCommand", {"query": "select 1", "sample_size": "1024"}))
+        self.assertNotEqual(fingerprint("HiveCommand", {"query": "select 1", "hive_version": "2.1.1"}),
+                            fingerprint("HiveCommand", {"query": "select 1", "hive_version": "1.2"}))
+
+    def test_fingerprint_db_tap(self):
+        self.assertNotEqual(fingerprint("DbTapQueryCommand", {"query": "select 1", "db_tap_id": 1}),
+                            fingerprint("DbTapQueryCommand", {"query": "select 1", "db_tap_id": 2}))
+
+
+class TestResultReuse(unittest.TestCase):
+
+    def setUp(self):
+        self.reuse = ResultReuse(ttl=60)
+        self.now = 1000.0
+        self.reuse.clock = lambda: self.now
+        Qubole.configure(api_token="dummy_token", result_reuse=self.reuse)
+        self.created = []
+        self.statuses = {}
+        patches = [patch.object(HiveCommand, "create", side_effect=self.create),
+                   patch.object(HiveCommand, "find", side_effect=self.find),
+                   patch("qds_sdk.commands.time.sleep")]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(Qubole.configure, api_token="dummy_token")
+
+    def create(self, **kwargs):
+        id = len(self.created) + 1
+        self.created.append(kwargs)
+        self.statuses[id] = kwargs.get("status", "done")
+        return HiveCommand({"id": id, "status": "waiting"})
+
+    def find(self, id):
+        return HiveCommand({"id": id, "status": self.statuses[id]})
+
+    def test_reused_within_ttl(self):
+        first = HiveCommand.run(query="select 1")
+        second = HiveCommand.run(query="select   1")
+        self.assertEqual((first.id, second.id), (1, 1))
+        self.assertEqual(len(self.created), 1)
+        self.now += 61
+        self.assertEqual(HiveCommand.run(query="select 1").id, 2)
+
+    def test_opt_out_and_failures(self):
+        HiveCommand.run(query="select 1")
+        self.assertEqual(HiveCommand.run(query="select 1", reuse=False).id, 2)
+        self.assertNotIn("reuse", self.created[1])
+        HiveCommand.run(query="select 2", status="error")
+        self.assertEqual(HiveCommand.run(query="select 2").id, 4)
+
+    def test_concurrent_duplicates_run_once(self):
+        release = threading.Event()
+        original = self.find
+
+        def slow_find(id):
+            release.wait(5)
+            return original(id)
+        HiveCommand.find.side_effect = slow_find
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(HiveCommand.run(query="select 3").id))
+                   for _ in range(3)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [1, 1, 1])
+        self.assertEqual(len(self.created), 1)
+
+    def test_bounded(self):
+        reuse = ResultReuse(max_entries=2)
+        for id in range(3):
+            reuse.record(str(id), HiveCommand({"id": id}))
+        self.assertEqual(list(reuse.entries), ["1", "2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+from __future__ import print_function
+import sys
+import io
+import json
+import gzip
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+import requests
+from mock import *
+try:
+    from requests.packages.urllib3.response import HTTPResponse
+except ImportError:
+    from urllib3.response import HTTPResponse
+from qds_sdk.streaming import JsonStreamReader
+from qds_sdk.commands import Command
+from test_connection import stub_connection
+
+
+def splits(document):
+    """Every way of cutting the document in two, plus one char at a time"""
+    for i in range(len(document) + 1):
+        yield [document[:i], document[i:]]
+    yield list(document)
+
+
+def gzipped_response(document):
+    buf = io.BytesIO()
+    f = gzip.GzipFile(fileobj=buf, mode="wb")
+    f.write(document.encode("utf8"))
+    f.close()
+    r = requests.models.Response()
+    r.status_code = 200
+    r.encoding = "utf-8"
+    r.raw = HTTPResponse(body=io.BytesIO(buf.getvalue()), headers={"content-encoding": "gzip"},
+                         status=200, preload_content=False, decode_content=True)
+    return r
+
+
+class TestJsonStreamReader(unittest.TestCase):
+
+    def test_top_level_array(self):
+        document = '[{"cluster": {"id": 1, "state": "UP"}}, 12345, "a\\"b", [1, 2], null, true]'
+        expected = json.loads(document)
+        for chunks in splits(document):
+            self.assertEqual(list(JsonStreamReader(chunks).items()), expected)
+
+    def test_keyed_array(self):
+        document = ' {"paging_info": {"next_page": 2}, "clusters": [{"id": 1}, {"id": 2}], "after": 1} '
+        for chunks in splits(document):
+            self.assertEqual(list(JsonStreamReader(chunks).items("clusters")), [{"id": 1}, {"id": 2}])
+
+    def test_empty_and_missing(self):
+        self.assertEqual(list(JsonStreamReader(["[ ]"]).items()), [])
+        self.assertEqual(list(JsonStreamReader(['{"clusters": []}']).items("clusters")), [])
+        self.assertEqual(list(JsonStreamReader(['{"clusters": null}']).items("clusters")), [])
+        self.assertEqual(list(JsonStreamReader(['{"other": [1]}']).items("clusters")), [])
+
+    def test_malformed(self):
+        with self.assertRaises(ValueError):
+            list(JsonStreamReader(["[1, 2"]).items())
+        with self.assertRaises(ValueError):
+            list(JsonStreamReader(['{"a": 1}']).items())
+        with self.assertRaises(ValueError):
+            list(JsonStreamReader(['[1 2]']).items())
+
+    def test_read_object_streams_strings(self):
+        results = u"a\tb\r\né\\\"x\" \U0001F600 \\u00e9 end"
+        document = json.dumps({"inline": True, "results": results, "qlog": None})
+        for chunks in splits(document):
+            pieces = []
+            rest = JsonStreamReader(chunks).read_object({"results": pieces.append})
+            self.assertEqual(u"".join(pieces), results)
+            self.assertEqual(rest, {"inline": True, "qlog": None})
+
+    def test_read_object_non_string_sink(self):
+        pieces = []
+        rest = JsonStreamReader(['{"results": null}']).read_object({"results": pieces.append})
+        self.assertEqual(rest, {"results": None})
+        self.assertEqual(pieces, [])
+
+    def test_gzip_response(self):
+        document = json.dumps({"clusters": [{"id": i} for i in range(1000)]})
+        reader = JsonStreamReader.from_response(gzipped_response(document), chunk_size=64)
+        self.assertEqual([c["id"] for c in reader.items("clusters")], list(range(1000)))
+
+
+class TestStreamingConnection(unittest.TestCase):
+
+    def test_get_stream(self):
+        conn = stub_connection([gzipped_response('[{"id": 1}, {"id": 2}]')])
+        self.assertEqual(list(conn.get_stream("clusters")), [{"id": 1}, {"id": 2}])
+        method, url, kwargs = conn.session.calls[0]
+        self.assertTrue(kwargs["stream"])
+        self.assertEqual(kwargs["headers"]["Accept-Encoding"], "gzip, deflate")
+        self.assertNotIn("Accept-Encoding", conn._headers)
+
+    def test_get_results_stream(self):
+        results = u"col1\tcol2\r\né\t2\r\n" * 100
+        conn = stub_connection([gzipped_response(json.dumps({"inline": True, "results": results}))])
+        cmd = Command({"id": 123, "meta_data": {"results_resource": "commands/123/results"}})
+        fp = io.BytesIO()
+        with patch("qds_sdk.commands.Qubole.agent", return_value=conn):
+            cmd.get_results(fp, stream=True)
+        self.assertEqual(fp.getvalue(), results.encode("utf8"))
+        self.assertEqual(conn.session.calls[0][2]["params"], {"inline": True, "include_headers": "false"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+from __future__ import print_function
+import sys
+import threading
+import time
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.throttle import Throttle
+from qds_sdk.throttle import ThrottleRegistry
+from qds_sdk.throttle import TokenBucket
+from test_connection import stub_connection
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def bucket(self, rate, burst=None):
+        clock = FakeClock()
+        bucket = TokenBucket(rate, burst)
+        bucket.clock, bucket.sleep, bucket.updated = clock, clock.sleep, 0.0
+        return bucket, clock
+
+    def test_burst_then_rate(self):
+        bucket, clock = self.bucket(rate=2, burst=3)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(clock.slept, [])
+        bucket.acquire()
+        self.assertEqual(clock.slept, [0.5])
+        bucket.acquire()
+        self.assertEqual(clock.now, 1.0)
+
+    def test_refill_capped_at_burst(self):
+        bucket, clock = self.bucket(rate=10, burst=2)
+        clock.now = 100.0
+        for _ in range(2):
+            bucket.acquire()
+        self.assertEqual(clock.slept, [])
+        bucket.acquire()
+        self.assertEqual(len(clock.slept), 1)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+
+class TestThrottle(unittest.TestCase):
+
+    def test_max_in_flight(self):
+        throttle = Throttle(max_in_flight=2)
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def work():
+            with throttle:
+                with lock:
+                    state["active"] += 1
+                    state["peak"] = max(state["peak"], state["active"])
+                time.sleep(0.01)
+                with lock:
+                    state["active"] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(state["peak"], 2)
+
+    def test_slot_released_on_error(self):
+        throttle = Throttle(max_in_flight=1)
+        try:
+            with throttle:
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertTrue(throttle.slots.acquire(False))
+
+
+class TestThrottleRegistry(unittest.TestCase):
+
+    def test_family(self):
+        self.assertEqual(ThrottleRegistry.family("commands/123/logs"), "commands")
+        self.assertEqual(ThrottleRegistry.family("clusters?page=2"), "clusters")
+        self.assertEqual(ThrottleRegistry.family("scheduler"), "scheduler")
+
+    def test_limits_per_family(self):
+        registry = ThrottleRegistry({"commands": {"max_in_flight": 4}, "default": {"rate": 5}})
+        commands = registry.for_path("commands/1")
+        self.assertIs(commands, registry.for_path("commands/2/logs"))
+        self.assertIsNone(commands.bucket)
+        clusters = registry.for_path("clusters/1")
+        self.assertIsNot(clusters, registry.for_path("scheduler"))
+        self.assertEqual(clusters.bucket.rate, 5)
+
+    def test_unlimited(self):
+        self.assertIsNone(ThrottleRegistry({"commands": {"rate": 1}}).for_path("clusters"))
+
+    def test_connection_uses_registry(self):
+        conn = stub_connection()
+        throttle = MagicMock(spec=Throttle)
+        conn.throttles = ThrottleRegistry({"commands": throttle})
+        conn.get("commands/123")
+        conn.get("clusters/1")
+        self.assertEqual(throttle.__enter__.call_count, 1)
+        self.assertEqual(throttle.__exit__.call_count, 1)
+
+    def test_configured_process_wide(self):
+        Qubole.configure(api_token="dummy_token", rate_limits={"commands": {"rate": 10}})
+        self.assertIs(Qubole.agent().throttles, Qubole.agent(version="v2").throttles)
+        Qubole.configure(api_token="dummy_token")
+        self.assertIsNone(Qubole.agent().throttles)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+from __future__ import print_function
+import sys
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from qds_sdk.timeouts import TimeoutPolicy
+from test_connection import stub_connection
+
+
+class TestTimeoutPolicy(unittest.TestCase):
+
+    def test_call_types(self):
+        call_type = TimeoutPolicy.call_type
+        self.assertEqual(call_type("GET", "commands/123"), "status")
+        self.assertEqual(call_type("GET", "clusters/label/state"), "status")
+        self.assertEqual(call_type("GET", "commands/123/logs"), "logs")
+        self.assertEqual(call_type("GET", "commands/123/results"), "results")
+        self.assertEqual(call_type("PUT", "clusters/123"), "cluster_mutation")
+        self.assertEqual(call_type("POST", "clusters"), "cluster_mutation")
+        self.assertEqual(call_type("PUT", "clusters/123/state"), "cluster_mutation")
+        self.assertEqual(call_type("POST", "commands"), "default")
+        self.assertEqual(call_type("GET", "commands?page=2"), "default")
+
+    def test_static_timeouts(self):
+        policy = TimeoutPolicy(connect_timeout=3, read_timeouts={"logs": 900})
+        self.assertEqual(policy.timeout("status"), (3, 60))
+        self.assertEqual(policy.timeout("logs"), (3, 900))
+        self.assertEqual(policy.timeout("default"), (3, 300))
+
+    def test_unknown_call_type(self):
+        with self.assertRaises(ValueError):
+            TimeoutPolicy(read_timeouts={"polls": 5})
+
+    def test_adaptive(self):
+        policy = TimeoutPolicy(adaptive=True, min_samples=10, multiplier=4, min_read_timeout=1, window=50)
+        for i in range(9):
+            policy.observe("status", 0.5)
+        self.assertEqual(policy.timeout("status"), (10, 60))
+        policy.observe("status", 2.0)
+        self.assertEqual(policy.timeout("status"), (10, 8.0))
+        for i in range(100):
+            policy.observe("status", 0.01)
+        self.assertEqual(policy.timeout("status"), (10, 1))
+        self.assertEqual(policy.timeout("logs"), (10, 300))
+
+    def test_adaptive_capped_by_configured_timeout(self):
+        policy = TimeoutPolicy(adaptive=True, min_samples=1)
+        policy.observe("status", 100)
+        self.assertEqual(policy.timeout("status"), (10, 60))
+
+    def test_not_recorded_unless_adaptive(self):
+        policy = TimeoutPolicy(min_samples=1)
+        policy.observe("status", 1)
+        self.assertIsNone(policy.percentile("status", 99))
+
+    def test_connection_passes_timeouts(self):
+        conn = stub_connection()
+        conn.timeouts = TimeoutPolicy(adaptive=True, min_samples=1)
+        conn.get("commands/123")
+        conn.put("clusters/1", {"state": "start"})
+        self.assertEqual(conn.session.calls[0][2]['timeout'], (10, 60))
+        self.assertEqual(conn.session.calls[1][2]['timeout'], (10, 300))
+        self.assertIsNotNone(conn.timeouts.percentile("status", 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
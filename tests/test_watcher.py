@@ -0,0 +1,161 @@
+from __future__ import print_function
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+if sys.version_info > (2, 7, 0):
+    import unittest
+else:
+    import unittest2 as unittest
+from mock import *
+from qds_sdk.qubole import Qubole
+from qds_sdk.qubole import QuboleClient
+from qds_sdk.commands import HiveCommand
+from qds_sdk.watcher import CommandWatcher
+from qds_sdk.polling import AdaptivePollStrategy
+from qds_sdk.polling import FixedPollStrategy
+
+
+class FakeCommands(object):
+    """Replaces HiveCommand.find; each command finishes after `polls` fetches"""
+
+    def __init__(self, polls):
+        self.polls = dict(polls)
+        self.fetched = []
+        self.clients = []
+        self.lock = threading.Lock()
+
+    def find(self, id):
+        with self.lock:
+            self.fetched.append(id)
+            self.clients.append(Qubole.current())
+            self.polls[id] -= 1
+            status = "done" if self.polls[id] <= 0 else "running"
+        return HiveCommand({"id": id, "status": status})
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def watcher_with_clock(*args, **kwargs):
+    clock = FakeClock()
+    watcher = CommandWatcher(*args, **kwargs)
+    watcher.clock, watcher.sleep = clock, clock.sleep
+    watcher.due = dict((id, 0.0) for id in watcher.due)
+    return watcher, clock
+
+
+class TestCommandWatcher(unittest.TestCase):
+
+    def setUp(self):
+        Qubole.configure(api_token='dummy_token', poll_interval=1)
+        self.commands = FakeCommands({1: 1, 2: 3, 3: 2})
+        self.find = patch.object(HiveCommand, "find", side_effect=self.commands.find)
+        self.find.start()
+
+    def tearDown(self):
+        self.find.stop()
+
+    def test_yields_in_completion_order(self):
+        watcher, clock = watcher_with_clock([1, 2, 3], command_class=HiveCommand, concurrency=2)
+        self.assertEqual([cmd.id for cmd in watcher.watch()], [1, 3, 2])
+        self.assertEqual(len(self.commands.fetched), 3 + 2 + 1)
+        self.assertEqual(clock.slept, [1, 1])
+        self.assertEqual(watcher.pending, [])
+
+    def test_poll_once_and_add(self):
+        watcher = CommandWatcher(command_class=HiveCommand)
+        watcher.add(1)
+        watcher.add(1)
+        watcher.add(HiveCommand({"id": 9, "status": "error"}))
+        self.assertEqual(sorted(cmd.id for cmd in watcher.poll_once()), [1, 9])
+        self.assertEqual(self.commands.fetched, [1])
+        self.assertEqual(watcher.poll_once(), [])
+
+    def test_pool_kept_across_rounds(self):
+        watcher, clock = watcher_with_clock([1, 2, 3], command_class=HiveCommand, concurrency=2)
+        with patch("qds_sdk.watcher.ThreadPool", wraps=ThreadPool) as pool:
+            watcher.poll_once()
+            clock.now += 1
+            watcher.poll_once()
+            self.assertEqual(pool.call_count, 1)
+            self.assertIsNotNone(watcher.pool)
+            list(watcher.watch())
+            self.assertIsNone(watcher.pool)
+            self.assertEqual(pool.call_count, 1)
+
+    def test_timeout(self):
+        watcher, clock = watcher_with_clock([2], command_class=HiveCommand, poll_interval=10)
+        self.assertEqual(list(watcher.watch(timeout=15)), [])
+        self.assertEqual(watcher.pending, [2])
+        self.assertEqual(clock.slept, [10, 5])
+
+    def test_poll_strategy_per_command(self):
+        strategy = AdaptivePollStrategy(initial=1, factor=2, max_interval=4)
+        self.commands.polls.update({4: 4, 5: 2})
+        watcher, clock = watcher_with_clock([4, 5], command_class=HiveCommand, poll_strategy=strategy)
+        done = [(cmd.id, clock.now) for cmd in watcher.watch()]
+        # Command 5 is polled at 0 and 1 seconds, command 4 at 0, 1, 3 and 7
+        self.assertEqual(done, [(5, 1.0), (4, 7.0)])
+        self.assertEqual(self.commands.fetched.count(4), 4)
+
+    def test_wait_all(self):
+        done = list(HiveCommand.wait_all([HiveCommand({"id": 2, "status": "waiting"}), 3],
+                                         poll_strategy=FixedPollStrategy(0)))
+        self.assertEqual([cmd.id for cmd in done], [3, 2])
+
+    def test_client_carried_to_workers(self):
+        client = QuboleClient(api_token='tenant_token')
+        with client.activate():
+            watcher = CommandWatcher([1, 3], command_class=HiveCommand, poll_interval=0)
+        list(watcher.watch())
+        self.assertEqual(set(self.commands.clients), set([client]))
+
+    def test_errors_propagate(self):
+        self.find.stop()
+        self.find = patch.object(HiveCommand, "find", side_effect=RuntimeError("gone"))
+        self.find.start()
+        watcher = CommandWatcher([1], command_class=HiveCommand)
+        with self.assertRaises(RuntimeError):
+            watcher.poll_once()
+        self.assertEqual(watcher.pending, [1])
+
+    def test_failed_fetch_keeps_other_completions(self):
+        self.commands.polls.update({2: 1})
+        failures = [2]
+
+        def find(id):
+            if id in failures:
+                failures.remove(id)
+                raise RuntimeError("server error")
+            return self.commands.find(id)
+        self.find.stop()
+        self.find = patch.object(HiveCommand, "find", side_effect=find)
+        self.find.start()
+        watcher = CommandWatcher([1, 2, 3], command_class=HiveCommand, poll_interval=0)
+        with self.assertRaises(RuntimeError):
+            watcher.poll_once()
+        self.assertEqual(watcher.pending, [2, 3])
+        self.assertEqual(sorted(cmd.id for cmd in watcher.poll_once()), [1, 2, 3])
+
+        failures.append(3)
+        watcher = CommandWatcher([1, 3], command_class=HiveCommand, poll_interval=0)
+        done = []
+        with self.assertRaises(RuntimeError):
+            for cmd in watcher.watch():
+                done.append(cmd.id)
+        self.assertEqual(done, [1])
+        self.assertEqual(watcher.pending, [3])
+
+
+if __name__ == '__main__':
+    unittest.main()